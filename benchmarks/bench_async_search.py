@@ -0,0 +1,109 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Load test of the sync and asyncio search pipelines against a fake SAM server that takes
+`delay` seconds to answer, like a slow api.sam.gov.
+
+The sync pipeline is given a pool of threads, like one gunicorn worker with --threads. The async
+pipeline runs every search on a single event loop thread.
+
+Usage:
+    python -m benchmarks.bench_async_search [number_of_searches] [sync_threads] [delay]
+"""
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+
+from benchmarks.fake_sam_server import start_fake_sam_server
+from samtools.sam_api import async_entity_information, entity_information
+
+
+def _create_benchmark_app(number_of_searches):
+    app = Flask(__name__)
+    app.config.update(
+        SAM_API_KEY="benchmark",
+        SAM_API_POOL_CONNECTIONS=1,
+        SAM_API_POOL_MAXSIZE=number_of_searches,
+        SAM_API_KEEP_ALIVE=True,
+        SAM_API_CONNECT_TIMEOUT=5,
+        SAM_API_READ_TIMEOUT=20,
+    )
+    return app
+
+
+def _search_args(index):
+    return {"ueiSAM": f"BENCH{index:06d}1", "entityEFTIndicator": ""}
+
+
+def _run_sync(app, url, number_of_searches, sync_threads):
+    def search(index):
+        with app.app_context():
+            return entity_information._search_sam(
+                _search_args(index), "http://host/", url
+            )
+
+    with ThreadPoolExecutor(max_workers=sync_threads) as executor:
+        return list(executor.map(search, range(number_of_searches)))
+
+
+async def _run_async(url, number_of_searches):
+    async with async_entity_information.create_client_session() as client_session:
+        return await asyncio.gather(
+            *[
+                async_entity_information._search_sam_async(
+                    _search_args(index), "http://host/", url, client_session
+                )
+                for index in range(number_of_searches)
+            ]
+        )
+
+
+def main(number_of_searches=200, sync_threads=4, delay=0.1):
+    server, url = start_fake_sam_server(entities_per_page=1, delay=delay)
+    app = _create_benchmark_app(number_of_searches)
+    try:
+        with app.app_context():
+            start = time.perf_counter()
+            sync_responses = _run_sync(app, url, number_of_searches, sync_threads)
+            sync_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            async_responses = asyncio.run(_run_async(url, number_of_searches))
+            async_seconds = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    assert all(response["success"] for response in sync_responses + async_responses)
+    print(f"{number_of_searches} searches, SAM delay {delay * 1000:.0f} ms")
+    print(
+        f" sync ({sync_threads} threads): {sync_seconds:.2f} s  "
+        f"{number_of_searches / sync_seconds:.1f} searches/s"
+    )
+    print(
+        f"async (1 thread):   {async_seconds:.2f} s  "
+        f"{number_of_searches / async_seconds:.1f} searches/s"
+    )
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:4]
+    converters = (int, int, float)
+    main(*[convert(value) for convert, value in zip(converters, arguments)])
@@ -0,0 +1,158 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compare preparing business names from long pasted search inputs by splitting them with shlex
+before every step, as the search preprocessor did, against splitting them once and transforming
+the words in one pass, and check that both prepare the same names.
+
+The inputs mix words, LLC suffixes, trailing periods, commas, forbidden characters, quotes
+(sometimes unbalanced) and unusual whitespace.
+
+Usage:
+    python -m benchmarks.bench_business_name_pipeline [number_of_inputs] [words_per_input]
+"""
+
+import random
+import shlex
+import sys
+import time
+
+from samtools.sam_api.search_preprocessor import (
+    _get_cleaned_and_prepared_business_name,
+    _split_and_preserve_quotes,
+)
+
+_WORDS = [
+    "thermo",
+    "fisher",
+    "scientific",
+    "company",
+    "inc.",
+    "L.L.C.",
+    "llc",
+    "co,",
+    "w.",
+    "&",
+    "a-b",
+    "n+1",
+    "lowe's",
+    '"national instruments"',
+    '"priority worldwide"',
+    "...",
+    "{x}",
+    "c:\\\\path",
+    "x|y^z",
+]
+# Words whose quotes a later split can pair differently
+_UNBALANCED_WORDS = ['"priority', 'worldwide"', 'ab"cd', '"a-b']
+_SEPARATORS = [" "] * 20 + ["  ", "\t", "\n", "\r\n", "\x0c", "\xa0", ", "]
+
+
+def _make_input(rng, words_per_input, words=_WORDS):
+    words = rng.choices(words, k=words_per_input)
+    separators = rng.choices(_SEPARATORS, k=words_per_input)
+    return "".join(word + separator for word, separator in zip(words, separators))
+
+
+def _legacy_split_and_preserve_quotes(search_input):
+    try:
+        lex = shlex.shlex(search_input, posix=False)
+        lex.quotes = '"'
+        lex.whitespace_split = True
+        lex.commenters = ""
+        return list(lex)
+    except ValueError:
+        return search_input.split()
+
+
+def _legacy_get_cleaned_and_prepared_business_name(search_input):
+    forbidden_characters = r"-&|{}^\\"
+    search_input = search_input.translate(
+        str.maketrans(forbidden_characters, " " * len(forbidden_characters))
+    )
+    search_input = search_input.replace(",", "")
+    search_input = " ".join(
+        word
+        for word in _legacy_split_and_preserve_quotes(search_input)
+        if word.upper() not in ("L.L.C", "L.L.C.", "LLC")
+    )
+    search_input = " ".join(
+        word.rstrip(".") for word in _legacy_split_and_preserve_quotes(search_input)
+    )
+    sentence = []
+    for word in _legacy_split_and_preserve_quotes(search_input):
+        if word[0] == '"' and word[-1] == '"':
+            sentence.append(word)
+        elif len(word) <= 2:
+            sentence.append(word)
+        else:
+            sentence.append(f"{word}*")
+    return " ".join(sentence)
+
+
+def _prepare_with_shlex(search_input):
+    search_input = " ".join(_legacy_split_and_preserve_quotes(search_input))
+    return _legacy_get_cleaned_and_prepared_business_name(search_input)
+
+
+def _prepare_in_one_pass(search_input):
+    search_input = " ".join(_split_and_preserve_quotes(search_input))
+    return _get_cleaned_and_prepared_business_name(search_input)
+
+
+def _measure(prepare, inputs):
+    start = time.perf_counter()
+    names = list(map(prepare, inputs))
+    return time.perf_counter() - start, names
+
+
+def main(number_of_inputs=2000, words_per_input=300):
+    rng = random.Random(889)
+    pasted_inputs = [_make_input(rng, words_per_input) for _ in range(number_of_inputs)]
+    unbalanced_inputs = [
+        _make_input(rng, rng.randint(1, 6), _WORDS + _UNBALANCED_WORDS)
+        for _ in range(number_of_inputs)
+    ]
+    for title, inputs in (
+        (f"{words_per_input} word inputs", pasted_inputs),
+        ("short inputs with unbalanced quotes", unbalanced_inputs),
+    ):
+        print(f"{title} ({len(inputs)})")
+        _compare(inputs)
+
+
+def _compare(inputs):
+    shlex_elapsed, shlex_names = _measure(_prepare_with_shlex, inputs)
+    one_pass_elapsed, one_pass_names = _measure(_prepare_in_one_pass, inputs)
+    mismatches = [
+        (search_input, shlex_name, one_pass_name)
+        for search_input, shlex_name, one_pass_name in zip(
+            inputs, shlex_names, one_pass_names
+        )
+        if shlex_name != one_pass_name
+    ]
+    assert not mismatches, mismatches[:3]
+
+    for name, elapsed in (("shlex", shlex_elapsed), ("one pass", one_pass_elapsed)):
+        print(
+            f"{name:>10}: {elapsed:.3f} s  "
+            f"{elapsed / len(inputs) * 1e3:.3f} ms per input"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
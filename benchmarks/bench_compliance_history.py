@@ -0,0 +1,128 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Fill a compliance history with many entities and status changes, then time recording searches,
+per-entity timelines and "changes since" queries.
+
+Usage:
+    python -m benchmarks.bench_compliance_history [number_of_entities]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from samtools.sam_api.compliance_history import ComplianceHistory
+
+_STATUSES = [
+    (True, "COMPLIANT", "N", "Active"),
+    (False, "USES COVERED TELECOMMUNICATIONS", "N", "Active"),
+    (True, "COMPLIANT", "Y", "Active"),
+    (True, "COMPLIANT", "N", "Expired"),
+]
+_ROUNDS = 10
+_BATCH_SIZE = 10
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1664800000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _make_entity(number, status):
+    is_compliant, status_text, exclusion_flag, registration_status = status
+    has_exclusions = exclusion_flag != "N"
+    is_active = registration_status == "Active"
+    return {
+        "entityRegistration": {
+            "ueiSAM": f"U{number:010d}1",
+            "entityEFTIndicator": None,
+        },
+        "samToolsData": {
+            "isSelectable": is_compliant and not has_exclusions and is_active,
+            "eightEightNine": {
+                "isCompliant": is_compliant,
+                "statusText": status_text,
+                "farProvisionDate": "OCT 2020",
+            },
+            "exclusions": {
+                "hasExclusions": has_exclusions,
+                "statusText": "Yes" if has_exclusions else "No",
+            },
+            "registration": {
+                "isActive": is_active,
+                "statusText": registration_status,
+            },
+        },
+    }
+
+
+def _time_per_call(function, arguments):
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start) / len(arguments)
+
+
+def main(number_of_entities=100000):
+    rng = random.Random(889)
+    statuses = [0] * number_of_entities
+    clock = Clock()
+    with tempfile.TemporaryDirectory() as directory:
+        history = ComplianceHistory(
+            os.path.join(directory, "compliance_history.sqlite3"), clock=clock
+        )
+        start = time.perf_counter()
+        searches = 0
+        for _ in range(_ROUNDS):
+            for number in rng.sample(
+                range(number_of_entities), number_of_entities // 5
+            ):
+                statuses[number] = rng.randrange(len(_STATUSES))
+            for first in range(0, number_of_entities, _BATCH_SIZE):
+                history.record(
+                    _make_entity(number, _STATUSES[statuses[number]])
+                    for number in range(
+                        first, min(first + _BATCH_SIZE, number_of_entities)
+                    )
+                )
+                searches += 1
+            clock.now += 86400
+        elapsed = time.perf_counter() - start
+        stats = history.stats()
+        print(
+            f"recorded {searches} searches of {_BATCH_SIZE} entities in {elapsed:.1f} s  "
+            f"{elapsed / searches * 1e3:.2f} ms per search  {stats['rows']} rows"
+        )
+
+        ueis = [f"U{rng.randrange(number_of_entities):010d}1" for _ in range(1000)]
+        timeline = _time_per_call(history.get_timeline, ueis)
+        print(f"timeline: {timeline * 1e6:.0f} us per entity")
+        changes = _time_per_call(
+            lambda since: history.get_changes(since, limit=1000),
+            [clock.now - 86400 * rng.randrange(1, _ROUNDS) for _ in range(100)],
+        )
+        print(f" changes: {changes * 1e3:.2f} ms per page of 1000")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,90 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Time and memory of building the 889 compliance object of each entity and reading what
+_adapt_sam_entities reads from it, on synthetic entities covering every answer combination.
+
+Retained is the memory held by one compliance object, allocated is the memory allocated per
+entity while building and reading it.
+
+Usage:
+    python -m benchmarks.bench_compliance_objects [number_of_entities]
+"""
+
+import itertools
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fake_sam_server import make_fake_entity
+from samtools.sam_api.entity_information import DataAdaptors
+
+_ANSWERS = [("No", "No"), ("Yes", "No"), ("No", "Yes"), ("Yes", "Yes")]
+
+
+def _evaluate(data_adaptors, entity):
+    eight_eight_nine = data_adaptors.adapt_sam_response_to_889_compliance(entity)
+    far = eight_eight_nine.far
+    return (
+        eight_eight_nine.is_compliant,
+        eight_eight_nine.status_text,
+        eight_eight_nine.elaborated_status_text,
+        eight_eight_nine.far_provision_date,
+        far["52.204-26.c.1"]["text"],
+        far["52.204-26.c.2"]["text"],
+    )
+
+
+def main(number_of_entities=10000):
+    entities = [
+        make_fake_entity(f"U{number:010d}1", answers=answers)
+        for number, answers in zip(range(number_of_entities), itertools.cycle(_ANSWERS))
+    ]
+    data_adaptors = DataAdaptors()
+    for entity in entities:
+        _evaluate(data_adaptors, entity)
+
+    start = time.perf_counter()
+    for entity in entities:
+        _evaluate(data_adaptors, entity)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    allocated = 0
+    for entity in entities:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        _evaluate(data_adaptors, entity)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [
+        data_adaptors.adapt_sam_response_to_889_compliance(entity)
+        for entity in entities
+    ]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(
+        f"{number_of_entities} entities: "
+        f"{elapsed / number_of_entities * 1e6:.2f} us per entity  "
+        f"allocated {allocated / number_of_entities:.0f} B per entity  "
+        f"retained {retained / len(kept):.0f} B per object"
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
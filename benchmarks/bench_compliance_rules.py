@@ -0,0 +1,125 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compare the compiled compliance rules against the hard-coded if-chains they replaced, and check
+that both give the same verdicts. Also times compiling the rules file, the cost of a reload.
+
+Usage:
+    python -m benchmarks.bench_compliance_rules [number_of_verdicts]
+"""
+
+import itertools
+import sys
+import time
+
+from samtools.compliance import compliance_rules
+
+_ANSWERS = [None, "No", "Yes"]
+_TO_PROVISION_TEXT = {None: None, "No": "DOES NOT", "Yes": "DOES"}
+
+
+def _hard_coded_verdict(c1_answer, c2_answer):
+    """The status_text, far_provision_date and is_compliant if-chains of EightEightNine"""
+    has_c1, has_c2 = c1_answer is not None, c2_answer is not None
+    is_compliant = has_c1 and has_c2 and c1_answer == c2_answer == "DOES NOT"
+    if is_compliant:
+        status_text = "COMPLIANT"
+    elif not has_c1 and not has_c2:
+        status_text = "NO REPS & CERTS"
+    elif not has_c2:
+        status_text = "OUTDATED FAR (No part (C)(2))"
+    elif c1_answer == "DOES" and c2_answer == "DOES":
+        status_text = "PROVIDES AND USES COVERED TELECOMMUNICATIONS"
+    elif c1_answer == "DOES":
+        status_text = "PROVIDES COVERED TELECOMMUNICATIONS"
+    elif c2_answer == "DOES":
+        status_text = "USES COVERED TELECOMMUNICATIONS"
+    else:
+        status_text = "UNSPECIFIED"
+    if has_c1 and not has_c2:
+        far_provision_date = "DEC 2019"
+    elif has_c1 and has_c2:
+        far_provision_date = "OCT 2020"
+    else:
+        far_provision_date = None
+    elaborated = status_text if is_compliant else f"NONCOMPLIANT - {status_text}"
+    return is_compliant, status_text, elaborated, far_provision_date
+
+
+def _hard_coded_selectable(is_compliant, has_exclusions, is_active):
+    if is_compliant and not has_exclusions and is_active:
+        return True
+    return False
+
+
+def _evaluate_hard_coded(cases):
+    results = []
+    for (c1_answer, c2_answer), has_exclusions, is_active in cases:
+        verdict = _hard_coded_verdict(
+            _TO_PROVISION_TEXT[c1_answer], _TO_PROVISION_TEXT[c2_answer]
+        )
+        selectable = _hard_coded_selectable(verdict[0], has_exclusions, is_active)
+        results.append((*verdict, selectable))
+    return results
+
+
+def _evaluate_compiled(cases):
+    results = []
+    rules = compliance_rules.get_rules()
+    for (c1_answer, c2_answer), has_exclusions, is_active in cases:
+        verdict = rules.verdicts[
+            _TO_PROVISION_TEXT[c1_answer], _TO_PROVISION_TEXT[c2_answer]
+        ]
+        selectable = rules.is_selectable(verdict[0], has_exclusions, is_active)
+        results.append((*verdict, selectable))
+    return results
+
+
+def _measure(evaluate, cases):
+    start = time.perf_counter()
+    results = evaluate(cases)
+    return time.perf_counter() - start, results
+
+
+def main(number_of_verdicts=500000):
+    combinations = list(
+        itertools.product(
+            itertools.product(_ANSWERS, repeat=2), [False, True], [False, True]
+        )
+    )
+    cases = list(itertools.islice(itertools.cycle(combinations), number_of_verdicts))
+    hard_coded_elapsed, hard_coded_results = _measure(_evaluate_hard_coded, cases)
+    compiled_elapsed, compiled_results = _measure(_evaluate_compiled, cases)
+    assert hard_coded_results == compiled_results
+
+    for name, elapsed in (
+        ("hard-coded", hard_coded_elapsed),
+        ("compiled", compiled_elapsed),
+    ):
+        print(
+            f"{name:>10}: {elapsed:.3f} s  "
+            f"{elapsed / number_of_verdicts * 1e9:.0f} ns per verdict"
+        )
+
+    start = time.perf_counter()
+    for _ in range(100):
+        compliance_rules.load_rules()
+    print(f"    reload: {(time.perf_counter() - start) * 10:.2f} ms per rules file")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
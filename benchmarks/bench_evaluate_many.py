@@ -0,0 +1,100 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compare scoring entities one at a time with the DataAdaptors compliance objects against
+evaluate_many, and check that both give the same verdicts.
+
+Usage:
+    python -m benchmarks.bench_evaluate_many [number_of_entities]
+"""
+
+import itertools
+import sys
+import time
+
+from benchmarks.fake_sam_server import make_fake_entity
+from samtools.sam_api.compliance_batch import evaluate_many
+from samtools.sam_api.entity_information import DataAdaptors, _is_entity_selectable
+
+_ANSWERS = [("No", "No"), ("Yes", "No"), ("No", "Yes"), ("Yes", "Yes")]
+
+
+def _evaluate_each(entities):
+    data_adaptors = DataAdaptors()
+    columns = {
+        "isCompliant": [],
+        "statusText": [],
+        "farProvisionDate": [],
+        "hasExclusions": [],
+        "isActive": [],
+        "isSelectable": [],
+        "answers": [],
+    }
+    for entity in entities:
+        eight_eight_nine = data_adaptors.adapt_sam_response_to_889_compliance(entity)
+        exclusions = data_adaptors.adapt_sam_response_to_exclusions(entity)
+        registration = data_adaptors.adapt_sam_response_to_registration_status(entity)
+        columns["isCompliant"].append(eight_eight_nine.is_compliant)
+        columns["statusText"].append(eight_eight_nine.status_text)
+        columns["farProvisionDate"].append(eight_eight_nine.far_provision_date)
+        columns["hasExclusions"].append(exclusions.has_exclusions)
+        columns["isActive"].append(registration.is_active)
+        columns["isSelectable"].append(
+            _is_entity_selectable(
+                eight_eight_nine.is_compliant,
+                exclusions.has_exclusions,
+                registration.is_active,
+            )
+        )
+        far = eight_eight_nine.far
+        columns["answers"].append(
+            (far["52.204-26.c.1"]["answer"], far["52.204-26.c.2"]["answer"])
+        )
+    return columns
+
+
+def _measure(evaluate, entities):
+    start = time.perf_counter()
+    columns = evaluate(entities)
+    return time.perf_counter() - start, columns
+
+
+def main(number_of_entities=100000):
+    entities = [
+        make_fake_entity(f"U{number:010d}1", answers=answers, exclusion_flag=flag)
+        for number, answers, flag in zip(
+            range(number_of_entities),
+            itertools.cycle(_ANSWERS),
+            itertools.cycle("NNNY"),
+        )
+    ]
+    each_elapsed, each_columns = _measure(_evaluate_each, entities)
+    many_elapsed, many_columns = _measure(evaluate_many, entities)
+    assert each_columns == many_columns
+
+    for name, elapsed in (
+        ("per entity", each_elapsed),
+        ("evaluate_many", many_elapsed),
+    ):
+        print(
+            f"{name:>13}: {elapsed:.3f} s  "
+            f"{elapsed / number_of_entities * 1e6:.2f} us per entity"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,111 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compare reading the Section 889 answers of entities with long certification lists by scanning
+the FAR responses once per provision and section, as the adaptors did, against indexing them in
+one pass with DataAdaptors.index_far_responses, and check that both read the same answers.
+
+Usage:
+    python -m benchmarks.bench_far_index [number_of_entities]
+"""
+
+import sys
+import time
+
+from benchmarks.fake_sam_server import make_fake_entity
+from samtools.sam_api.entity_information import DataAdaptors
+
+_SECTIONS = [
+    ("FAR 52.204-24", "52.204-24.d.1"),
+    ("FAR 52.204-24", "52.204-24.d.2"),
+    ("FAR 52.204-25", "52.204-25.b"),
+    ("FAR 52.204-26", "52.204-26.c.1"),
+    ("FAR 52.204-26", "52.204-26.c.2"),
+]
+
+
+def _make_entity(uei_sam):
+    """A full entity with its 889 provisions at the end of the FAR responses"""
+    entity = make_fake_entity(uei_sam, full_sections=True)
+    far_responses = entity["repsAndCerts"]["certifications"]["fARResponses"]
+    far_responses.append(far_responses.pop(0))
+    far_responses[-1:-1] = [
+        {
+            "provisionId": provision_id,
+            "listOfAnswers": [
+                {"section": section, "answerText": "No"}
+                for section_provision_id, section in _SECTIONS
+                if section_provision_id == provision_id
+            ],
+        }
+        for provision_id in ("FAR 52.204-24", "FAR 52.204-25")
+    ]
+    return entity
+
+
+def _get_dict_from_list_of_dicts(list_of_dicts, key_name, value):
+    return next((dict_i for dict_i in list_of_dicts if dict_i[key_name] == value), None)
+
+
+def _read_by_scanning(entities):
+    answers = []
+    for entity in entities:
+        far_responses = entity["repsAndCerts"]["certifications"]["fARResponses"]
+        for provision_id, section in _SECTIONS:
+            far_response = _get_dict_from_list_of_dicts(
+                far_responses, "provisionId", provision_id
+            )
+            answers.append(
+                _get_dict_from_list_of_dicts(
+                    far_response["listOfAnswers"], "section", section
+                )["answerText"]
+            )
+    return answers
+
+
+def _read_by_indexing(entities):
+    answers = []
+    for entity in entities:
+        far_index = DataAdaptors.index_far_responses(entity)
+        for provision_id, section in _SECTIONS:
+            answers.append(far_index[provision_id][section])
+    return answers
+
+
+def _measure(read, entities):
+    start = time.perf_counter()
+    answers = read(entities)
+    return time.perf_counter() - start, answers
+
+
+def main(number_of_entities=2000):
+    entities = [
+        _make_entity(f"U{number:010d}1") for number in range(number_of_entities)
+    ]
+    scan_elapsed, scan_answers = _measure(_read_by_scanning, entities)
+    index_elapsed, index_answers = _measure(_read_by_indexing, entities)
+    assert scan_answers == index_answers
+
+    for name, elapsed in (("scans", scan_elapsed), ("index", index_elapsed)):
+        print(
+            f"{name:>5}: {elapsed:.3f} s  "
+            f"{elapsed / number_of_entities * 1e6:.2f} us per entity"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
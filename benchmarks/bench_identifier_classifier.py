@@ -0,0 +1,141 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compare classifying random search inputs with the regular expression checks of the search
+preprocessor, one after the other as get_search_parameter did, against classify_search_input,
+and check that both give the same type for every input.
+
+The inputs are mostly 5 and 12 character codes built from digits, upper and lower case letters,
+I and O, the non-ASCII characters case folding maps to ASCII letters and a trailing newline,
+mixed with websites and business names.
+
+Usage:
+    python -m benchmarks.bench_identifier_classifier [number_of_inputs]
+"""
+
+import random
+import sys
+import time
+
+from samtools.sam_api.search_preprocessor import (
+    NCAGE_CODE,
+    UEI_SAM,
+    US_CAGE_CODE,
+    WEBSITE,
+    _is_potential_ncage_code,
+    _is_potential_website,
+    _is_sam_unique_entity_id,
+    _is_us_cage_code,
+    classify_search_input,
+)
+
+_CHARACTERS = (
+    "0123456789" * 3
+    + "ABCDEFGHIJKLMNOPQRSTUVWXYZ" * 2
+    + "abcdefghijklmnopqrstuvwxyz"
+    + "ıİſKßé .-"
+)
+_WORDS = ["apple", "grainger", "office", "depot", "inc.", "llc", "www", "shop"]
+_DOMAINS = ["com", "org", "net", "gov", "us", "io", "co.uk"]
+
+
+def _make_input(rng):
+    kind = rng.random()
+    if kind < 0.4:
+        text = "".join(rng.choices(_CHARACTERS, k=5))
+    elif kind < 0.7:
+        text = "".join(rng.choices(_CHARACTERS, k=12))
+    elif kind < 0.85:
+        text = f"{rng.choice(('', 'http://', 'https://'))}{rng.choice(_WORDS)}"
+        text += f".{rng.choice(_DOMAINS)}{rng.choice(('', '/', '/product'))}"
+    else:
+        text = " ".join(rng.choices(_WORDS, k=rng.randint(1, 4)))
+    if rng.random() < 0.05:
+        text += "\n"
+    return text
+
+
+def _classify_with_regular_expressions(search_input):
+    if _is_sam_unique_entity_id(search_input):
+        return UEI_SAM
+    if _is_us_cage_code(search_input):
+        return US_CAGE_CODE
+    if _is_potential_ncage_code(search_input):
+        return NCAGE_CODE
+    if _is_potential_website(search_input):
+        return WEBSITE
+    return None
+
+
+def _classify_with_tables(search_input):
+    return classify_search_input(search_input)[0]
+
+
+def _measure(classify, inputs):
+    start = time.perf_counter()
+    types = list(map(classify, inputs))
+    return time.perf_counter() - start, types
+
+
+def main(number_of_inputs=2000000):
+    rng = random.Random(889)
+    inputs = [_make_input(rng) for _ in range(number_of_inputs)]
+
+    regex_elapsed, regex_types = _measure(_classify_with_regular_expressions, inputs)
+    table_elapsed, table_types = _measure(_classify_with_tables, inputs)
+    mismatches = [
+        (search_input, regex_type, table_type)
+        for search_input, regex_type, table_type in zip(
+            inputs, regex_types, table_types
+        )
+        if regex_type != table_type
+    ]
+    assert not mismatches, mismatches[:10]
+
+    print(
+        "  ".join(
+            f"{identifier_type}: {regex_types.count(identifier_type)}"
+            for identifier_type in (UEI_SAM, US_CAGE_CODE, NCAGE_CODE, WEBSITE, None)
+        )
+    )
+    _print_throughput("all inputs", regex_elapsed, table_elapsed, len(inputs))
+
+    # Without the website check both share, which dominates inputs containing a period
+    codes = [
+        search_input
+        for search_input in inputs
+        if len(search_input.rstrip("\n")) in (5, 12) and "." not in search_input
+    ]
+    regex_elapsed, _ = _measure(_classify_with_regular_expressions, codes)
+    table_elapsed, _ = _measure(_classify_with_tables, codes)
+    _print_throughput(
+        "5 and 12 character inputs", regex_elapsed, table_elapsed, len(codes)
+    )
+
+
+def _print_throughput(title, regex_elapsed, table_elapsed, number_of_inputs):
+    print(f"{title} ({number_of_inputs})")
+    for name, elapsed in (("regex", regex_elapsed), ("table", table_elapsed)):
+        print(
+            f"{name:>7}: {elapsed:.3f} s  "
+            f"{elapsed / number_of_inputs * 1e6:.2f} us per input  "
+            f"{number_of_inputs / elapsed / 1e6:.2f} M inputs/s"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
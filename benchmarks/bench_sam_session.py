@@ -0,0 +1,72 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compare a fresh connection per call (module-level requests.post) against the pooled SAM session.
+
+The stub server speaks plain HTTP on localhost, so the difference shown is only the TCP setup.
+Against api.sam.gov the pooled session also skips the TLS handshake, so real savings are larger.
+
+Usage:
+    python -m benchmarks.bench_sam_session [number_of_calls]
+"""
+
+import sys
+import time
+
+import requests
+
+from benchmarks.fake_sam_server import start_fake_sam_server
+from samtools.sam_api.session import create_sam_session
+
+
+def _time_calls(post, url, number_of_calls):
+    latencies = []
+    for _ in range(number_of_calls):
+        start = time.perf_counter()
+        post(url, params={"ueiSAM": "K3B5JE3ZS915"}, timeout=(5, 20)).json()
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def _percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+def main(number_of_calls=2000):
+    server, url = start_fake_sam_server()
+    try:
+        results = {
+            "requests.post": _time_calls(requests.post, url, number_of_calls),
+            "pooled session": _time_calls(
+                create_sam_session(pool_connections=1, pool_maxsize=4).post,
+                url,
+                number_of_calls,
+            ),
+        }
+    finally:
+        server.shutdown()
+
+    for name, latencies in results.items():
+        print(
+            f"{name:>15}: p50 {_percentile(latencies, 50) * 1000:.3f} ms  "
+            f"p99 {_percentile(latencies, 99) * 1000:.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
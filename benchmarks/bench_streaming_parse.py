@@ -0,0 +1,95 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compare loading a whole SAM response with response.json() against the streaming entity decoder,
+as is and with SAM_TRIM_REPS_AND_CERTS, on a page of 10 entities requested with every section.
+
+Peak is the most memory allocated while reading one page, retained is what the parsed page
+still holds afterwards.
+
+Usage:
+    python -m benchmarks.bench_streaming_parse [number_of_calls]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fake_sam_server import start_fake_sam_server
+from samtools.sam_api.entity_information import (
+    SAM_RESPONSE_CHUNK_SIZE,
+    _read_sam_entities_data,
+    _trim_sam_entity,
+)
+from samtools.sam_api.session import create_sam_session
+
+
+def _read_whole_body(session, url):
+    return session.post(url, timeout=(5, 20)).json()
+
+
+def _read_streamed_body(session, url, transform=None):
+    with session.post(url, timeout=(5, 20), stream=True) as sam_response:
+        return _read_sam_entities_data(
+            sam_response.iter_content(chunk_size=SAM_RESPONSE_CHUNK_SIZE), transform
+        )
+
+
+def _read_trimmed_body(session, url):
+    return _read_streamed_body(session, url, transform=_trim_sam_entity)
+
+
+def _measure(read, session, url, number_of_calls):
+    read(session, url)
+    start = time.perf_counter()
+    for _ in range(number_of_calls):
+        read(session, url)
+    elapsed = (time.perf_counter() - start) / number_of_calls
+
+    tracemalloc.start()
+    data = read(session, url)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(data["entityData"]) == 10
+    return elapsed, peak, retained
+
+
+def main(number_of_calls=50):
+    server, url = start_fake_sam_server(entities_per_page=10, full_sections=True)
+    session = create_sam_session(pool_connections=1, pool_maxsize=1)
+    try:
+        results = {
+            "response.json()": _measure(
+                _read_whole_body, session, url, number_of_calls
+            ),
+            "streaming": _measure(_read_streamed_body, session, url, number_of_calls),
+            "streaming+trim": _measure(
+                _read_trimmed_body, session, url, number_of_calls
+            ),
+        }
+    finally:
+        server.shutdown()
+
+    for name, (elapsed, peak, retained) in results.items():
+        print(
+            f"{name:>15}: {elapsed * 1000:.2f} ms per page  "
+            f"peak {peak / 2**20:.2f} MiB  retained {retained / 2**20:.2f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
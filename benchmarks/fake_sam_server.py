@@ -0,0 +1,159 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+A local stand-in for the SAM Entities API used by the benchmarks. It answers every GET or POST
+with a page of synthetic entities shaped like the real v3 response.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_fake_entity(
+    uei_sam, answers=("No", "No"), exclusion_flag="N", full_sections=False
+):
+    """Build a synthetic entity shaped like a SAM Entities API v3 record.
+
+    Args:
+        uei_sam (str): SAM UEI of the entity
+        answers (tuple, optional): 52.204-26 (c)(1) and (c)(2) answers. Defaults to ("No", "No").
+        exclusion_flag (str, optional): exclusionStatusFlag. Defaults to "N".
+        full_sections (bool, optional): pad coreData and repsAndCerts to roughly the size of a
+            real record requested with every section. Defaults to False.
+
+    Returns:
+        dict: a single entity
+    """
+    list_of_answers = [
+        {"section": f"52.204-26.c.{part}", "answerText": answer}
+        for part, answer in enumerate(answers, start=1)
+    ]
+    entity = {
+        "entityRegistration": {
+            "ueiSAM": uei_sam,
+            "cageCode": uei_sam[:5],
+            "legalBusinessName": f"Synthetic Vendor {uei_sam}",
+            "dbaName": None,
+            "registrationStatus": "Active",
+            "exclusionStatusFlag": exclusion_flag,
+        },
+        "coreData": {"entityInformation": {"entityURL": None}},
+        "repsAndCerts": {
+            "certifications": {
+                "fARResponses": [
+                    {"provisionId": "FAR 52.204-26", "listOfAnswers": list_of_answers}
+                ]
+            }
+        },
+    }
+    if full_sections:
+        _add_full_sections(entity)
+    return entity
+
+
+def _add_full_sections(entity):
+    """About 200 KB of FAR and DFARS responses, qualifications and core data per entity"""
+    entity["repsAndCerts"]["certifications"]["fARResponses"].extend(
+        {
+            "provisionId": f"FAR 52.2{index:02d}-{index % 9 + 1}",
+            "listOfAnswers": [
+                {
+                    "section": f"52.2{index:02d}-{index % 9 + 1}.{part}",
+                    "questionText": "The Offeror represents that it is not a "
+                    "business concern owned or controlled by one or more entities "
+                    "that are subject to the provision. " * 3,
+                    "answerId": str(part),
+                    "answerText": "No",
+                    "country": None,
+                    "company": None,
+                }
+                for part in range(6)
+            ],
+        }
+        for index in range(60)
+    )
+    entity["repsAndCerts"]["certifications"]["dFARResponses"] = [
+        {
+            "provisionId": f"DFARS 252.2{index:02d}-7000",
+            "listOfAnswers": [{"section": "a", "answerText": "Yes"}] * 4,
+        }
+        for index in range(20)
+    ]
+    entity["repsAndCerts"]["qualifications"] = {
+        "architectEngineerResponses": {
+            "provisionId": "FAR 52.236",
+            "listOfAnswers": [{"section": str(index)} for index in range(40)],
+        }
+    }
+    entity["coreData"]["naicsList"] = [
+        {"naicsCode": f"{index:06d}", "naicsDescription": "Synthetic industry " * 4}
+        for index in range(150)
+    ]
+
+
+def start_fake_sam_server(entities_per_page=1, delay=0.0, full_sections=False):
+    """Start the fake SAM server on a free localhost port in a background thread.
+
+    Args:
+        entities_per_page (int, optional): entities in every response. Defaults to 1.
+        delay (float, optional): seconds to sleep before answering. Defaults to 0.0.
+        full_sections (bool, optional): answer with full size records. Defaults to False.
+
+    Returns:
+        tuple: (server, url). Call server.shutdown() when done.
+    """
+    body = json.dumps(
+        {
+            "totalRecords": entities_per_page,
+            "entityData": [
+                make_fake_entity(f"FAKE{index:07d}1", full_sections=full_sections)
+                for index in range(entities_per_page)
+            ],
+        }
+    ).encode("utf-8")
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length", 0))
+            if length:
+                self.rfile.read(length)
+            if delay:
+                time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = _respond
+        do_POST = _respond
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return (
+        server,
+        f"http://127.0.0.1:{server.server_address[1]}/entity-information/v3/entities",
+    )
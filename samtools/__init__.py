@@ -21,14 +21,45 @@ Returns:
     flask app: Application factory pattern. Returns a flask application.
 """
 import datetime
+import json
 from logging.config import dictConfig
 
 import os
 
 from flask_weasyprint import HTML, render_pdf
-from flask import Flask, render_template, request
+from flask import Flask, Response, current_app, render_template, request
+from flask import stream_with_context
 
-from samtools.sam_api.entity_information import search_sam_v3
+from samtools import json_responses
+from samtools.compliance import rules_reloader
+from samtools.json_responses import json_response
+from samtools.sam_api import (
+    circuit_breaker,
+    compliance_history,
+    compliance_table,
+    entity_cache,
+    entity_index,
+    prefetch,
+    quota,
+    response_cache,
+    single_flight,
+    watchlist,
+)
+from samtools.sam_api.async_entity_information import search_sam_v3_async
+from samtools.sam_api.bulk_search import search_sam_v3_bulk
+from samtools.sam_api.entity_information import find_cached_entity, search_sam_v3
+from samtools.sam_api.extract_ingestion import (
+    apply_entity_deltas_command,
+    build_compliance_table_command,
+    ingest_entity_extract_command,
+)
+from samtools.sam_api.search_preprocessor import get_search_parameter_cache_stats
+from samtools.sam_api.watchlist import (
+    monitor_watchlist_command,
+    watchlist_add_command,
+    watchlist_notifications_command,
+    watchlist_remove_command,
+)
 
 
 def create_app(name=__name__):
@@ -51,6 +82,26 @@ def create_app(name=__name__):
     if app.config["SAM_API_KEY"] is None:
         raise Exception("SAM_API_KEY has not been set")
 
+    rules_reloader.init_app(app)
+    response_cache.init_app(app)
+    entity_cache.init_app(app)
+    entity_index.init_app(app)
+    compliance_table.init_app(app)
+    compliance_history.init_app(app)
+    watchlist.init_app(app)
+    single_flight.init_app(app)
+    prefetch.init_app(app)
+    quota.init_app(app)
+    circuit_breaker.init_app(app)
+    json_responses.init_app(app)
+    app.cli.add_command(ingest_entity_extract_command)
+    app.cli.add_command(apply_entity_deltas_command)
+    app.cli.add_command(build_compliance_table_command)
+    app.cli.add_command(watchlist_add_command)
+    app.cli.add_command(watchlist_remove_command)
+    app.cli.add_command(monitor_watchlist_command)
+    app.cli.add_command(watchlist_notifications_command)
+
     @app.route("/")
     def welcome():
         app.logger.info(request)
@@ -68,34 +119,150 @@ def create_app(name=__name__):
     def search_v3():
         app.logger.info(request)
         try:
-            return search_sam_v3(request.args, host_url=request.host_url)
+            return _with_age_header(
+                search_sam_v3(request.args, host_url=request.host_url)
+            )
         except Exception as exception:
             app.logger.error(exception)
             return {"success": False, "errors": ["400 Bad Request"]}
 
+    @app.route("/api/entity-information/v3/entities/bulk", methods=["POST"])
+    def search_v3_bulk():
+        app.logger.info(request)
+        search_args = request.get_json(silent=True)
+        if not isinstance(search_args, dict):
+            return {"success": False, "errors": ["400 Bad Request"]}, 400
+        identifiers = search_args.pop("identifiers", None)
+        if not isinstance(identifiers, list) or not all(
+            isinstance(identifier, str) for identifier in identifiers
+        ):
+            return {"success": False, "errors": ["400 Bad Request"]}, 400
+        if len(identifiers) > app.config["SAM_BULK_MAX_IDENTIFIERS"]:
+            return {"success": False, "errors": ["413 Too Many Identifiers"]}, 413
+
+        results = search_sam_v3_bulk(
+            identifiers, search_args, host_url=request.host_url
+        )
+        return Response(
+            stream_with_context(json.dumps(result) + "\n" for result in results),
+            mimetype="application/x-ndjson",
+        )
+
     @app.route("/api/file-download/summary", methods=["GET"])
     def get_compliance_summary_pdf():
         app.logger.info(request)
         try:
-            response = search_sam_v3(request.args, host_url=request.host_url)
+            entity = find_cached_entity(request.args)
+            if entity is None:
+                response = search_sam_v3(request.args, host_url=request.host_url)
         except Exception as exception:
             app.logger.error(exception)
             return {"success": False, "errors": ["400 Bad Request"]}
 
-        if not response["success"]:
-            app.logger.error(response)
+        if entity is None:
+            entity = _get_single_entity(response)
+            if entity is None:
+                return {"success": False, "errors": ["400 Bad Request"]}
+
+        return _get_summary_pdf_response(
+            entity,
+            host_url=request.host_url,
+            external_links=app.config["EXTERNAL_LINKS"],
+        )
+
+    @app.route("/api/async/entity-information/v3/entities", methods=["GET"])
+    async def search_v3_async():
+        app.logger.info(request)
+        try:
+            return _with_age_header(
+                await search_sam_v3_async(request.args, host_url=request.host_url)
+            )
+        except Exception as exception:
+            app.logger.error(exception)
             return {"success": False, "errors": ["400 Bad Request"]}
 
-        if len(response["entityData"]) != 1:
-            app.logger.error(response)
+    @app.route("/api/async/file-download/summary", methods=["GET"])
+    async def get_compliance_summary_pdf_async():
+        app.logger.info(request)
+        try:
+            entity = find_cached_entity(request.args)
+            if entity is None:
+                response = await search_sam_v3_async(
+                    request.args, host_url=request.host_url
+                )
+        except Exception as exception:
+            app.logger.error(exception)
             return {"success": False, "errors": ["400 Bad Request"]}
 
+        if entity is None:
+            entity = _get_single_entity(response)
+            if entity is None:
+                return {"success": False, "errors": ["400 Bad Request"]}
+
         return _get_summary_pdf_response(
-            response["entityData"][0],
+            entity,
             host_url=request.host_url,
             external_links=app.config["EXTERNAL_LINKS"],
         )
 
+    @app.route("/api/compliance/<uei_sam>", methods=["GET"])
+    def compliance(uei_sam):
+        status = compliance_table.get_compliance_table().find(uei_sam)
+        if status is None:
+            # Not cached, as the next extract or delta may add the entity
+            return (
+                {"success": False, "errors": ["404 Not Found"]},
+                404,
+                {"Cache-Control": "no-store"},
+            )
+        return {**status, "success": True}
+
+    @app.route("/api/compliance/<uei_sam>/history", methods=["GET"])
+    def compliance_history_timeline(uei_sam):
+        history = compliance_history.get_compliance_history()
+        if history is None:
+            return {"success": False, "errors": ["404 Not Found"]}, 404
+        timeline = history.get_timeline(uei_sam, request.args.get("entityEFTIndicator"))
+        return {"history": timeline, "success": True}
+
+    @app.route("/api/compliance-changes", methods=["GET"])
+    def compliance_changes():
+        history = compliance_history.get_compliance_history()
+        if history is None:
+            return {"success": False, "errors": ["404 Not Found"]}, 404
+        try:
+            since = compliance_history.parse_time(request.args.get("since", ""))
+            limit = min(int(request.args.get("limit", 1000)), 1000)
+            after_id = int(request.args.get("afterId", 0))
+        except ValueError:
+            return {"success": False, "errors": ["400 Bad Request"]}, 400
+        return {
+            "changes": history.get_changes(since, limit=limit, after_id=after_id),
+            "success": True,
+        }
+
+    @app.route("/api/metrics", methods=["GET"])
+    def metrics():
+        return {
+            "responseCache": _get_stats(response_cache.get_response_cache()),
+            "responseCacheRefresh": _get_stats(
+                response_cache.get_background_refresher()
+            ),
+            "entityCache": _get_stats(entity_cache.get_entity_cache()),
+            "singleFlight": _get_stats(single_flight.get_single_flight()),
+            "samQuota": _get_stats(quota.get_quota_scheduler()),
+            "circuitBreaker": _get_stats(circuit_breaker.get_circuit_breaker()),
+            "prefetch": _get_stats(prefetch.get_prefetcher()),
+            "entityIndex": _get_stats(entity_index.get_entity_index()),
+            "complianceTable": _get_stats(compliance_table.get_compliance_table()),
+            "complianceRules": _get_stats(rules_reloader.get_rules_reloader()),
+            "complianceHistory": _get_stats(
+                compliance_history.get_compliance_history()
+            ),
+            "watchlist": _get_stats(watchlist.get_watchlist()),
+            "searchParameterCache": get_search_parameter_cache_stats(),
+        }
+
     return app
 
 
@@ -160,6 +327,32 @@ def _setup_logging():
     )
 
 
+def _with_age_header(search_sam_response):
+    """Stale responses carry their age in samToolsData, repeated in the HTTP Age header"""
+    response = json_response(search_sam_response)
+    if "samToolsData" in search_sam_response:
+        response.headers["Age"] = str(search_sam_response["samToolsData"]["age"])
+    return response
+
+
+def _get_stats(component):
+    if component is None:
+        return None
+    return component.stats()
+
+
+def _get_single_entity(response):
+    if not response["success"]:
+        current_app.logger.error(response)
+        return None
+
+    if len(response["entityData"]) != 1:
+        current_app.logger.error(response)
+        return None
+
+    return response["entityData"][0]
+
+
 def _get_summary_pdf_response(entity, host_url, external_links):
     html = render_template(
         "sam_summary_pdf_template.html",
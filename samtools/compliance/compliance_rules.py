@@ -16,31 +16,213 @@
 
 """
 This module contains all of the compliance objects
+
+The verdicts of the 52.204-26 answers and the selectability of an entity are defined in
+compliance_rules.json and compiled into lookup tables when the module is imported. A changed rules
+file can be compiled and swapped in with use_rules without restarting, see rules_reloader.
 """
-from collections import defaultdict
+import itertools
+import json
+import os
+from types import MappingProxyType
+
+_FAR_PROVISION = {
+    "52.204-26.c.1": "(1) The Offeror represents that it {answer} "
+    "provide covered telecommunications equipment or services as "
+    "a part of its offered products or services to the Government "
+    "in the performance of any contract, subcontract, or other "
+    "contractual instrument.",
+    "52.204-26.c.2": "(2) After conducting a reasonable inquiry for "
+    "purposes of this representation, the offeror represents that "
+    "it {answer} use covered telecommunications equipment or "
+    "services, or any equipment, system, or service that uses "
+    "covered telecommunications equipment or services.",
+}
+_ANSWER_TO_PROVISION_TEXT_MAPPING = {"No": "DOES NOT", "Yes": "DOES"}
+_PROVISION_ANSWERS = (None, *_ANSWER_TO_PROVISION_TEXT_MAPPING.values())
+_SELECTABLE_FLAGS = ("isCompliant", "hasExclusions", "isActive")
+RULES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "compliance_rules.json"
+)
+
+
+class CompiledRules:
+    """Compliance rules compiled into lookup tables. A rule change replaces the whole object,
+    so a verdict never mixes two versions of the rules."""
+
+    __slots__ = ("verdicts", "selectable")
+
+    def __init__(self, verdicts, selectable):
+        # (is_compliant, status_text, elaborated_status_text, far_provision_date) by answers
+        self.verdicts = MappingProxyType(verdicts)
+        # selectability by (is_compliant, has_exclusions, is_active)
+        self.selectable = MappingProxyType(selectable)
+
+    def is_selectable(self, is_compliant, has_exclusions, is_active):
+        """Can the entity be selected as a vendor
+
+        Args:
+            is_compliant (bool):
+            has_exclusions (bool):
+            is_active (bool):
+
+        Returns:
+            bool:
+        """
+        return self.selectable[is_compliant, has_exclusions, is_active]
+
+
+def compile_rules(definition):
+    """Compile a rules definition, laid out like compliance_rules.json, into lookup tables.
+
+    The statusText and farProvisionDate rules are tried in order, and the first rule whose "when"
+    conditions all hold applies. A condition maps a 52.204-26 section to an answer ("DOES NOT" or
+    "DOES"), to null for no answer, or to a list of those. Sections left out match any answer.
+
+    Args:
+        definition (dict): the parsed rules file
+
+    Raises:
+        ValueError: if the definition is malformed or no rule applies to some answers
+
+    Returns:
+        CompiledRules:
+    """
+    try:
+        status_rules = _compile_rule_list(definition["statusText"])
+        date_rules = _compile_rule_list(definition["farProvisionDate"])
+        elaborated_status_text = definition["elaboratedStatusText"]
+        verdicts = {}
+        for answers in itertools.product(_PROVISION_ANSWERS, repeat=2):
+            status_rule = _get_first_match(status_rules, answers)
+            is_compliant = status_rule.get("isCompliant", False) is True
+            status_text = status_rule["statusText"]
+            template = elaborated_status_text[
+                "compliant" if is_compliant else "noncompliant"
+            ]
+            verdicts[answers] = (
+                is_compliant,
+                status_text,
+                _format_status_text(template, status_text),
+                _get_first_match(date_rules, answers)["farProvisionDate"],
+            )
+
+        selectable_when = definition["isSelectable"]
+        if not set(selectable_when) <= set(_SELECTABLE_FLAGS):
+            raise ValueError(f"isSelectable only accepts {_SELECTABLE_FLAGS}")
+        selectable = {
+            flags: all(
+                selectable_when.get(name, flag) == flag
+                for name, flag in zip(_SELECTABLE_FLAGS, flags)
+            )
+            for flags in itertools.product((False, True), repeat=3)
+        }
+    except (LookupError, TypeError, AttributeError) as error:
+        raise ValueError(f"Malformed compliance rules: {error!r}") from error
+    return CompiledRules(verdicts, selectable)
+
+
+def _format_status_text(template, status_text):
+    """Fill an elaboratedStatusText template, which may only refer to {statusText}"""
+    try:
+        return template.format(statusText=status_text)
+    except Exception as error:
+        raise ValueError(
+            f"Malformed elaboratedStatusText template {template!r}: {error!r}"
+        ) from error
+
+
+def _compile_rule_list(rules):
+    """(the answers a rule applies to, rule) of each rule"""
+    return [(_compile_condition(rule["when"]), rule) for rule in rules]
+
+
+def _compile_condition(when):
+    if not set(when) <= set(_FAR_PROVISION):
+        raise ValueError(f"Conditions only accept {list(_FAR_PROVISION)}")
+    allowed_answers = []
+    for provision_id in _FAR_PROVISION:
+        answers = when.get(provision_id, list(_PROVISION_ANSWERS))
+        if not isinstance(answers, list):
+            answers = [answers]
+        if not set(answers) <= set(_PROVISION_ANSWERS):
+            raise ValueError(f"{provision_id} answers must be in {_PROVISION_ANSWERS}")
+        allowed_answers.append(answers)
+    return frozenset(itertools.product(*allowed_answers))
+
+
+def _get_first_match(rules, answers):
+    for matching_answers, rule in rules:
+        if answers in matching_answers:
+            return rule
+    raise ValueError(f"No compliance rule applies to the answers {answers}")
+
+
+def load_rules(path=RULES_FILE):
+    """Read and compile a rules file
+
+    Args:
+        path (str, optional): Defaults to the compliance_rules.json of this package.
+
+    Raises:
+        OSError: if the file cannot be read
+        ValueError: if it is not valid JSON or not valid rules
+
+    Returns:
+        CompiledRules:
+    """
+    with open(path, encoding="utf-8") as rules_file:
+        return compile_rules(json.load(rules_file))
+
+
+_rules = load_rules()
+
+
+def get_rules():
+    """The compliance rules in use
+
+    Returns:
+        CompiledRules:
+    """
+    return _rules
+
+
+def use_rules(rules):
+    """Use new compliance rules. Compliance objects created before keep the rules they were
+    created with.
+
+    Args:
+        rules (CompiledRules):
+    """
+    global _rules  # pylint: disable=global-statement
+    _rules = rules
 
 
 class EightEightNine:
-    """An object that contains the vendor 889 compliance information."""
+    """An object that contains the vendor 889 compliance information.
+
+    The object only holds the two 52.204-26 answers and the compliance rules in use when it was
+    created. The FAR texts are computed once for the class and the verdict of every combination of
+    answers once per version of the rules, and both are shared, read-only, by all objects.
+    """
+
+    __slots__ = ("_answers", "_rules")
+
+    # {"text", "answer"} of each provision and answer
+    _far_entries = {
+        (provision_id, answer): MappingProxyType(
+            {
+                "text": None if answer is None else template.format(answer=answer),
+                "answer": answer,
+            }
+        )
+        for provision_id, template in _FAR_PROVISION.items()
+        for answer in _PROVISION_ANSWERS
+    }
 
     def __init__(self):
-        self._far_provision = {
-            "52.204-26.c.1": "(1) The Offeror represents that it {answer} "
-            "provide covered telecommunications equipment or services as "
-            "a part of its offered products or services to the Government "
-            "in the performance of any contract, subcontract, or other "
-            "contractual instrument.",
-            "52.204-26.c.2": "(2) After conducting a reasonable inquiry for "
-            "purposes of this representation, the offeror represents that "
-            "it {answer} use covered telecommunications equipment or "
-            "services, or any equipment, system, or service that uses "
-            "covered telecommunications equipment or services.",
-        }
-        self._answer_to_provision_text_mapping = {
-            "No".title(): "DOES NOT",
-            "Yes".title(): "DOES",
-        }
-        self._far = defaultdict(lambda: {"text": None, "answer": None})
+        self._answers = (None, None)
+        self._rules = _rules
 
     def set_far(self, provision_id, provision_answer):
         """Set a far provision in the EightEightNine object
@@ -52,15 +234,38 @@ class EightEightNine:
         Raises:
             ValueError:
         """
-        if provision_id not in self._far_provision:
-            raise ValueError(f"{provision_id} not in {self._far_provision.keys()}")
+        if provision_id not in _FAR_PROVISION:
+            raise ValueError(f"{provision_id} not in {_FAR_PROVISION.keys()}")
 
-        answer = self._answer_to_provision_text_mapping[provision_answer.title()]
+        answer = _ANSWER_TO_PROVISION_TEXT_MAPPING[provision_answer.title()]
 
-        self._far[provision_id]["answer"] = answer
-        self._far[provision_id]["text"] = self._far_provision[provision_id].format(
-            answer=answer
-        )
+        if provision_id == "52.204-26.c.1":
+            self._answers = (answer, self._answers[1])
+        else:
+            self._answers = (self._answers[0], answer)
+
+    @classmethod
+    def from_far_index(cls, far_index):
+        """An EightEightNine object of the 52.204-26 answers in a FAR response index.
+        Sections missing from the index are left unanswered.
+
+        Args:
+            far_index (dict): {provisionId: {section: answerText}}, as built by
+                DataAdaptors.index_far_responses
+
+        Raises:
+            KeyError: for answers other than 'Yes' or 'No'
+
+        Returns:
+            EightEightNine:
+        """
+        compliance = cls()
+        answers = far_index.get("FAR 52.204-26", {})
+        for provision_id in _FAR_PROVISION:
+            provision_answer = answers.get(provision_id)
+            if provision_answer is not None:
+                compliance.set_far(provision_id, provision_answer)
+        return compliance
 
     @property
     def is_compliant(self):
@@ -69,13 +274,7 @@ class EightEightNine:
         Returns:
             Bool:
         """
-        if self._has_far_part_c1 and self._has_far_part_c2:
-            if (
-                self.far["52.204-26.c.1"]["answer"] == "DOES NOT"
-                and self.far["52.204-26.c.2"]["answer"] == "DOES NOT"
-            ):
-                return True
-        return False
+        return self._rules.verdicts[self._answers][0]
 
     @property
     def far(self):
@@ -84,7 +283,11 @@ class EightEightNine:
         Returns:
             str: Complete FAR text with answers
         """
-        return self._far.copy()
+        c1_answer, c2_answer = self._answers
+        return {
+            "52.204-26.c.1": self._far_entries["52.204-26.c.1", c1_answer],
+            "52.204-26.c.2": self._far_entries["52.204-26.c.2", c2_answer],
+        }
 
     @property
     def status_text(self):
@@ -93,22 +296,7 @@ class EightEightNine:
         Returns:
             str: Brief description of the entity compliance status
         """
-        if self.is_compliant:
-            return "COMPLIANT"
-        if not self._has_far_response:
-            return "NO REPS & CERTS"
-        if not self._has_far_part_c2:
-            return "OUTDATED FAR (No part (C)(2))"
-        if (
-            self.far["52.204-26.c.1"]["answer"] == "DOES"
-            and self.far["52.204-26.c.2"]["answer"] == "DOES"
-        ):
-            return "PROVIDES AND USES COVERED TELECOMMUNICATIONS"
-        if self.far["52.204-26.c.1"]["answer"] == "DOES":
-            return "PROVIDES COVERED TELECOMMUNICATIONS"
-        if self.far["52.204-26.c.2"]["answer"] == "DOES":
-            return "USES COVERED TELECOMMUNICATIONS"
-        return "UNSPECIFIED"
+        return self._rules.verdicts[self._answers][1]
 
     @property
     def elaborated_status_text(self):
@@ -117,9 +305,7 @@ class EightEightNine:
         Returns:
             str: if noncompliant adds NONCOMPLIANT to return string
         """
-        if self.is_compliant:
-            return self.status_text
-        return f"NONCOMPLIANT - {self.status_text}"
+        return self._rules.verdicts[self._answers][2]
 
     @property
     def far_provision_date(self):
@@ -129,35 +315,26 @@ class EightEightNine:
         Returns:
             _type_: _description_
         """
-        if self._has_far_part_c1 and not self._has_far_part_c2:
-            return "DEC 2019"
-        if self._has_far_part_c1 and self._has_far_part_c2:
-            return "OCT 2020"
-        return None
+        return self._rules.verdicts[self._answers][3]
 
     @property
     def _has_far_response(self):
-        if self._has_far_part_c1 or self._has_far_part_c2:
-            return True
-        return False
+        return self._answers != (None, None)
 
     @property
     def _has_far_part_c1(self):
-        return self._far_has("52.204-26.c.1")
+        return self._answers[0] is not None
 
     @property
     def _has_far_part_c2(self):
-        return self._far_has("52.204-26.c.2")
-
-    def _far_has(self, provision_id):
-        if self._far[provision_id]["answer"] is not None:
-            return True
-        return False
+        return self._answers[1] is not None
 
 
 class Exclusions:
     """An object that contains the entity exclusion status information"""
 
+    __slots__ = ("_sam_exclusion_status_flag",)
+
     def __init__(self, sam_exclusion_status_flag=""):
         self._sam_exclusion_status_flag = sam_exclusion_status_flag
 
@@ -188,6 +365,8 @@ class Exclusions:
 class RegistrationStatus:
     """An object that contains the registration status information"""
 
+    __slots__ = ("registration_status",)
+
     def __init__(self, registration_status="Unspecified"):
         self.registration_status = registration_status
 
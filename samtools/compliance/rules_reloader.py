@@ -0,0 +1,150 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Reload the compliance rules when their file changes, without restarting the workers.
+
+Before a request, each worker checks the rules file for changes at most every
+COMPLIANCE_RULES_CHECK_INTERVAL seconds. A changed file is compiled first and only then swapped
+in, so requests in flight keep a complete set of rules. A file that does not compile is counted
+in the metrics and the rules in use are kept.
+
+The compliance table is not rebuilt on a rule change; run `flask build-compliance-table`.
+"""
+
+import os
+import threading
+import time
+
+from flask import current_app
+
+from samtools.compliance import compliance_rules
+
+_EXTENSION_NAME = "samtools.rules_reloader"
+
+
+class RulesReloader:
+    """Puts the rules of a file in use and reloads them when the file is replaced or modified"""
+
+    def __init__(self, path, check_interval=1.0, clock=time.monotonic):
+        self.path = str(path)
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._file_id = None
+        self._checked_at = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+
+    def load(self):
+        """Compile the rules file and use it
+
+        Raises:
+            OSError: if the file cannot be read
+            ValueError: if the file does not hold valid rules
+        """
+        with self._lock:
+            self._checked_at = self._clock()
+            self._load(self._get_file_id())
+
+    def check(self):
+        """Compile and use the rules file if it changed since it was last loaded
+
+        Returns:
+            bool: True if new rules were put in use
+        """
+        now = self._clock()
+        with self._lock:
+            if (
+                self._checked_at is not None
+                and now - self._checked_at < self.check_interval
+            ):
+                return False
+            self._checked_at = now
+            file_id = self._get_file_id()
+            if file_id == self._file_id:
+                return False
+            try:
+                self._load(file_id)
+            except (OSError, ValueError) as error:
+                # Keep the rules in use, and only retry once the file changes again
+                self._file_id = file_id
+                self.failures += 1
+                self.last_error = str(error)
+                return False
+            self.reloads += 1
+            return True
+
+    def stats(self):
+        """Reload counters for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        with self._lock:
+            return {
+                "file": self.path,
+                "loadedAt": self.loaded_at,
+                "reloads": self.reloads,
+                "failures": self.failures,
+                "lastError": self.last_error,
+            }
+
+    def _get_file_id(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, file_id):
+        compliance_rules.use_rules(compliance_rules.load_rules(self.path))
+        self._file_id = file_id
+        self.loaded_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.last_error = None
+
+
+def init_app(app):
+    """Load the compliance rules of COMPLIANCE_RULES_FILE (the packaged compliance_rules.json
+    when None) and reload them before requests when the file changes.
+
+    Args:
+        app (flask app): the Sam Tool application
+
+    Raises:
+        OSError, ValueError: if the rules file cannot be loaded
+    """
+    path = app.config["COMPLIANCE_RULES_FILE"] or compliance_rules.RULES_FILE
+    reloader = RulesReloader(
+        path, check_interval=app.config["COMPLIANCE_RULES_CHECK_INTERVAL"]
+    )
+    reloader.load()
+    app.extensions[_EXTENSION_NAME] = reloader
+
+    @app.before_request
+    def check_compliance_rules():
+        reloader.check()
+
+
+def get_rules_reloader():
+    """The compliance rules reloader of the current application
+
+    Returns:
+        RulesReloader: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
@@ -101,3 +101,124 @@ class Default:
         "SAM_ENTITIES_API_DOCS": "https://open.gsa.gov/api/entity-api/",
         "NF1883": "https://forms.neacc.nasa.gov/documents/11002/305376/NF1883.pdf",
     }
+
+    # Cache-Control header of each endpoint. Search responses also carry an ETag, so the browser
+    # revalidates them with a 304 Not Modified once max-age has passed.
+    CACHE_CONTROL = {
+        "welcome": "no-cache",
+        "search_v3": "private, max-age=60",
+        "search_v3_async": "private, max-age=60",
+        "search_v3_bulk": "no-store",
+        "get_compliance_summary_pdf": "private, max-age=300",
+        "get_compliance_summary_pdf_async": "private, max-age=300",
+        "compliance": "private, max-age=300",
+        "compliance_history_timeline": "private, max-age=60",
+        "compliance_changes": "no-store",
+        "metrics": "no-store",
+    }
+    # JSON search responses smaller than this (bytes) are not compressed
+    COMPRESSION_MIN_SIZE = 1024
+
+    # Pooled connections to the SAM Entities API (one session per worker process)
+    SAM_API_POOL_CONNECTIONS = 4
+    SAM_API_POOL_MAXSIZE = 16
+    SAM_API_KEEP_ALIVE = True
+    SAM_API_CONNECT_TIMEOUT = 5
+    SAM_API_READ_TIMEOUT = 20
+
+    # Search response cache. Set the size to 0 to disable caching.
+    SAM_RESPONSE_CACHE_SIZE = 1024
+    SAM_RESPONSE_CACHE_TTL = 300
+    # Seconds past the TTL during which a cached response is served immediately and refreshed in
+    # the background, and during which it is served instead of an error while SAM is failing.
+    SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE = 60
+    SAM_RESPONSE_CACHE_STALE_IF_ERROR = 3600
+    SAM_RESPONSE_CACHE_REFRESH_WORKERS = 2
+
+    # The next page of a search is prefetched and held for SAM_PREFETCH_WINDOW seconds (0 to
+    # disable), only while more than SAM_PREFETCH_QUOTA_RESERVE calls are left in today's quota.
+    SAM_PREFETCH_WINDOW = 120
+    SAM_PREFETCH_WORKERS = 2
+    SAM_PREFETCH_QUOTA_RESERVE = 200
+
+    # Entities from recent searches, used to render PDF summaries without calling SAM again.
+    # Records older than the maximum age (seconds) are fetched from SAM.
+    SAM_ENTITY_CACHE_SIZE = 4096
+    SAM_ENTITY_CACHE_MAX_AGE = 600
+
+    # SAM responses are decoded one entity at a time. When SAM_TRIM_REPS_AND_CERTS is set,
+    # repsAndCerts is cut down to the Section 889 FAR responses as each entity is decoded (and as
+    # extracts are loaded), which saves memory but also trims the repsAndCerts of the responses.
+    SAM_TRIM_REPS_AND_CERTS = False
+
+    # Identical concurrent SAM calls share one upstream call. Set a directory (for example
+    # "/tmp/samtools-single-flight") to also share calls between gunicorn workers on this host.
+    # A worker waits at most SAM_SINGLE_FLIGHT_LOCK_TIMEOUT seconds for another worker's call.
+    SAM_SINGLE_FLIGHT_LOCK_DIRECTORY = None
+    SAM_SINGLE_FLIGHT_LOCK_TIMEOUT = 30
+
+    # Bulk vendor lookup. UEIs and CAGE codes are batched into one SAM query, fetched page by
+    # page; a batch size at or below the SAM Entities API page size of 10 usually takes one call.
+    SAM_BULK_MAX_IDENTIFIERS = 2000
+    SAM_BULK_BATCH_SIZE = 10
+    SAM_BULK_CONCURRENCY = 8
+
+    # Quota for calls made with SAM_API_KEY, shared by all workers through a SQLite file
+    # (instance/sam_quota.sqlite3 when SAM_QUOTA_DATABASE is None). Calls wait up to
+    # SAM_QUOTA_MAX_WAIT seconds for the rate limit before being refused. Set
+    # SAM_QUOTA_REQUESTS_PER_DAY to None to disable quota scheduling.
+    SAM_QUOTA_REQUESTS_PER_DAY = 1000
+    SAM_QUOTA_REQUESTS_PER_SECOND = 5
+    SAM_QUOTA_MAX_WAIT = 5
+    SAM_QUOTA_DATABASE = None
+
+    # Local index of SAM entity extract files, loaded with `flask ingest-entity-extract` into a
+    # SQLite file (instance/entity_index.sqlite3 when SAM_ENTITY_INDEX_DATABASE is None). With
+    # SAM_ENTITY_INDEX_LOCAL_FIRST, ueiSAM and cageCode searches are answered from the index and
+    # only go to the SAM Entities API for entities that are not in it.
+    SAM_ENTITY_INDEX_DATABASE = None
+    SAM_ENTITY_INDEX_LOCAL_FIRST = False
+
+    # Business name searches are matched against the names in the local entity index, and only
+    # the best SAM_ENTITY_INDEX_NAME_SEARCH_LIMIT UEIs found are fetched from SAM. Names with no
+    # local match are still searched in SAM with a wildcard query. Name search needs SQLite 3.34
+    # or later with FTS5, and is left off with a warning otherwise.
+    SAM_ENTITY_INDEX_NAME_SEARCH = False
+    SAM_ENTITY_INDEX_NAME_SEARCH_LIMIT = 100
+
+    # Compliance verdicts of the entities in the local index, served by /api/compliance/<uei>.
+    # The file (instance/compliance_table.bin when None) is rebuilt after every extract or delta.
+    SAM_COMPLIANCE_TABLE = None
+
+    # Record the compliance status of the entities returned by searches, one row per status
+    # change, in a SQLite file (instance/compliance_history.sqlite3 when None).
+    SAM_COMPLIANCE_HISTORY = False
+    SAM_COMPLIANCE_HISTORY_DATABASE = None
+
+    # Watched UEIs are re-checked by `flask --app samtools monitor-watchlist`, in batches of
+    # SAM_WATCHLIST_BATCH_SIZE (at most 10, one SAM page) per SAM call. Calls are spread over the
+    # day so that each UEI is checked every SAM_WATCHLIST_RECHECK_INTERVAL seconds, with at most
+    # SAM_WATCHLIST_DAILY_CALLS calls a day and only while more than SAM_WATCHLIST_QUOTA_RESERVE
+    # calls are left in today's quota. The monitor wakes every SAM_WATCHLIST_POLL_INTERVAL seconds
+    # to pick up added UEIs. Status changes go to an outbox in instance/watchlist.sqlite3 (when
+    # None).
+    SAM_WATCHLIST_DATABASE = None
+    SAM_WATCHLIST_BATCH_SIZE = 10
+    SAM_WATCHLIST_RECHECK_INTERVAL = 86400
+    SAM_WATCHLIST_DAILY_CALLS = 300
+    SAM_WATCHLIST_QUOTA_RESERVE = 200
+    SAM_WATCHLIST_POLL_INTERVAL = 60
+
+    # Compliance rules, compiled from the packaged compliance/compliance_rules.json when None.
+    # Workers check the file for changes at most every COMPLIANCE_RULES_CHECK_INTERVAL seconds
+    # and reload it without a restart.
+    COMPLIANCE_RULES_FILE = None
+    COMPLIANCE_RULES_CHECK_INTERVAL = 5
+
+    # Fail fast while SAM is down. The circuit opens after this many consecutive failures
+    # (errors, 5xx responses or calls slower than SAM_CIRCUIT_SLOW_CALL_SECONDS) and lets trial
+    # calls through again after SAM_CIRCUIT_RESET_TIMEOUT seconds.
+    SAM_CIRCUIT_FAILURE_THRESHOLD = 5
+    SAM_CIRCUIT_SLOW_CALL_SECONDS = 10
+    SAM_CIRCUIT_RESET_TIMEOUT = 30
+    SAM_CIRCUIT_HALF_OPEN_MAX_CALLS = 1
@@ -0,0 +1,152 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compressed and conditional JSON responses.
+
+Search responses are served with a strong ETag computed from the serialized JSON, and are
+compressed with brotli or gzip when the client accepts it. The serialized body, its ETag and its
+compressed forms are kept on the response cache entry of the search, so a repeated search is
+answered with a 304 Not Modified, or with the already compressed body, without serializing the
+response again. Responses that are not in the response cache are serialized for each request.
+
+Cache-Control headers are set per endpoint from the CACHE_CONTROL setting.
+"""
+
+import gzip
+import hashlib
+
+from flask import Response, current_app, request
+
+from samtools.sam_api.response_cache import CachedResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+
+
+class SerializedResponse:
+    """A JSON response body with its ETag and lazily compressed forms"""
+
+    def __init__(self, body):
+        self.body = body
+        self.etag_value = hashlib.sha256(body).hexdigest()[:32]
+        self._encoded_bodies = {None: body}
+
+    def etag(self, encoding):
+        """ETag of the body in the given content encoding. Each encoding is a different
+        representation, so each gets its own strong ETag.
+
+        Args:
+            encoding (str): "br", "gzip" or None
+
+        Returns:
+            str: the ETag without quotes
+        """
+        if encoding is None:
+            return self.etag_value
+        return f"{self.etag_value}-{encoding}"
+
+    def encoded_body(self, encoding):
+        """The body in the given content encoding, compressed on first use
+
+        Args:
+            encoding (str): "br", "gzip" or None
+
+        Returns:
+            bytes:
+        """
+        encoded_body = self._encoded_bodies.get(encoding)
+        if encoded_body is None:
+            if encoding == "br":
+                encoded_body = brotli.compress(self.body, quality=_BROTLI_QUALITY)
+            else:
+                encoded_body = gzip.compress(self.body, compresslevel=_GZIP_LEVEL)
+            self._encoded_bodies[encoding] = encoded_body
+        return encoded_body
+
+
+def json_response(data):
+    """Build a compressed, conditional JSON response for data
+
+    Args:
+        data (dict): the response data. The serialized forms of a CachedResponse are kept on
+            it, so it must not be modified afterwards.
+
+    Returns:
+        flask.Response: 304 Not Modified if the client already has this representation
+    """
+    serialized = _get_serialized_response(data)
+    encoding = _get_content_encoding(len(serialized.body))
+    etag = serialized.etag(encoding)
+
+    if any(
+        request.if_none_match.contains_weak(serialized.etag(candidate))
+        for candidate in (None, "gzip", "br")
+    ):
+        response = Response(status=304)
+    else:
+        response = Response(
+            serialized.encoded_body(encoding), mimetype="application/json"
+        )
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    if data.get("success") is False:
+        response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _get_serialized_response(data):
+    if not isinstance(data, CachedResponse):
+        return _serialize(data)
+    serialized = data.serialized
+    if serialized is None:
+        serialized = data.serialized = _serialize(data)
+    return serialized
+
+
+def _serialize(data):
+    body = f"{current_app.json.dumps(data)}\n".encode("utf-8")
+    return SerializedResponse(body)
+
+
+def _get_content_encoding(body_length):
+    if body_length < current_app.config["COMPRESSION_MIN_SIZE"]:
+        return None
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(encodings)
+
+
+def _set_cache_control(response):
+    policy = current_app.config["CACHE_CONTROL"].get(request.endpoint)
+    if policy is not None and "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = policy
+    return response
+
+
+def init_app(app):
+    """Set per endpoint Cache-Control headers
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    app.after_request(_set_cache_control)
@@ -0,0 +1,263 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+asyncio version of the search_sam_v3 pipeline. The SAM Entities API is called with aiohttp so
+a single thread can keep many searches in flight at once. Parameter adaptation, caching and the
+samToolsData adaptors are shared with entity_information. The steps that read or write the SQLite
+stores (entity index, compliance history) run on the loop's default executor, so they do not
+block the other searches of the loop.
+"""
+
+import asyncio
+import contextvars
+import time
+
+import aiohttp
+from flask import current_app
+
+from samtools.sam_api.entity_information import (
+    SAM_ENTITIES_API_ENDPOINT,
+    SAM_ERROR_MESSAGE,
+    SAM_QUOTA_ERROR_MESSAGE,
+    SAM_RESPONSE_CHUNK_SIZE,
+    DataAdaptors,
+    _adapt_sam_entities,
+    _cache_search_response,
+    _get_api_key_if_none_provided,
+    _get_cached_search_response,
+    _NameSearchPage,
+    _prefetch_next_page,
+    _search_local_entity_index,
+    _search_local_entity_names,
+    get_entity_transform,
+)
+from samtools.sam_api.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from samtools.sam_api.quota import QuotaExceededError, get_quota_scheduler
+from samtools.sam_api.streaming import EntityDataDecoder
+
+
+async def search_sam_v3_async(search_args, host_url, client_session=None):
+    """Async equivalent of entity_information.search_sam_v3.
+
+    Args:
+        search_args (dict): Sam Tools url search parameters
+        host_url (str): The url of the this tool which will be included in the PDF download link
+        client_session (aiohttp.ClientSession, optional): session to reuse across many searches
+            on the same event loop. A new session is created when None.
+
+    Returns:
+        dict: Contains the response data, otherwise returns the error messages
+    """
+    if client_session is None:
+        async with create_client_session() as client_session:
+            search_sam_response = await _search_sam_async(
+                search_args, host_url, SAM_ENTITIES_API_ENDPOINT, client_session
+            )
+    else:
+        search_sam_response = await _search_sam_async(
+            search_args, host_url, SAM_ENTITIES_API_ENDPOINT, client_session
+        )
+    _prefetch_next_page(
+        search_args, host_url, SAM_ENTITIES_API_ENDPOINT, search_sam_response
+    )
+    return search_sam_response
+
+
+def create_client_session():
+    """Create an aiohttp session with the SAM_API_* pool size and timeouts.
+
+    aiohttp sessions are bound to the event loop they are created on, so a session cannot be
+    kept between Flask async requests, which each run on their own loop.
+
+    Returns:
+        aiohttp.ClientSession:
+    """
+    config = current_app.config
+    connector = aiohttp.TCPConnector(
+        limit=config["SAM_API_POOL_MAXSIZE"],
+        force_close=not config["SAM_API_KEEP_ALIVE"],
+    )
+    timeout = aiohttp.ClientTimeout(
+        sock_connect=config["SAM_API_CONNECT_TIMEOUT"],
+        sock_read=config["SAM_API_READ_TIMEOUT"],
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def _search_sam_async(search_args, host_url, sam_api_endpoint, client_session):
+    data_adaptors = DataAdaptors()
+    search_parameters = data_adaptors.adapt_samtools_to_sam_parameters(search_args)
+
+    cached_response, stale_response = _get_cached_search_response(
+        search_args, search_parameters, host_url, sam_api_endpoint
+    )
+    if cached_response is not None:
+        return cached_response
+    ranked_entities = await _run_in_executor(
+        _search_local_entity_names, search_args, search_parameters
+    )
+    if ranked_entities is not None:
+        name_search_page = _NameSearchPage(search_args, ranked_entities)
+        page_search_args = name_search_page.get_next_search_args()
+        while page_search_args is not None:
+            name_search_page.add(
+                await _search_sam_async(
+                    page_search_args, host_url, sam_api_endpoint, client_session
+                )
+            )
+            page_search_args = name_search_page.get_next_search_args()
+        search_sam_response = name_search_page.get_response()
+        if "samToolsData" not in search_sam_response:
+            search_sam_response = _cache_search_response(
+                search_parameters, host_url, search_sam_response
+            )
+        return search_sam_response
+    local_response = await _run_in_executor(
+        _search_local_entity_index,
+        search_args,
+        search_parameters,
+        host_url,
+        data_adaptors,
+    )
+    if local_response is not None:
+        return local_response
+
+    try:
+        search_sam_response = await _request_sam_entities_async(
+            client_session, search_parameters, host_url, sam_api_endpoint, data_adaptors
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+        if stale_response is None:
+            raise
+        current_app.logger.error(exception)
+        return stale_response
+    if not search_sam_response["success"] and stale_response is not None:
+        return stale_response
+
+    return _cache_search_response(search_parameters, host_url, search_sam_response)
+
+
+async def _request_sam_entities_async(
+    client_session, search_parameters, host_url, sam_api_endpoint, data_adaptors
+):
+    try:
+        sam_response_ok, sam_response_data = await _call_through_circuit_breaker(
+            client_session, sam_api_endpoint, search_parameters
+        )
+    except QuotaExceededError as exception:
+        current_app.logger.error(exception)
+        return {"success": False, "errors": [f"{SAM_QUOTA_ERROR_MESSAGE}"]}
+    except CircuitOpenError as exception:
+        current_app.logger.error(exception)
+        return {"success": False, "errors": [f"{SAM_ERROR_MESSAGE}"]}
+    if not sam_response_ok:
+        return {"success": False, "errors": [f"{SAM_ERROR_MESSAGE}"]}
+
+    return await _run_in_executor(
+        _adapt_sam_entities,
+        sam_response_data,
+        search_parameters,
+        host_url,
+        data_adaptors,
+    )
+
+
+async def _run_in_executor(function, *args):
+    """Run a blocking call on the default executor, in the application context of the caller"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        None, context.run, function, *args
+    )
+
+
+async def _call_through_circuit_breaker(
+    client_session, sam_api_endpoint, search_parameters
+):
+    circuit_breaker = get_circuit_breaker()
+    if circuit_breaker is None:
+        sam_response = await _call_post_sam_entities_api_async(
+            client_session, sam_api_endpoint, search_parameters
+        )
+        return sam_response[:2]
+
+    circuit_breaker.before_call()
+    start = time.monotonic()
+    try:
+        sam_response = await _call_post_sam_entities_api_async(
+            client_session, sam_api_endpoint, search_parameters
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+        circuit_breaker.record(time.monotonic() - start, failed=True)
+        raise
+    except BaseException:
+        circuit_breaker.release()
+        raise
+    sam_response_ok, sam_response_data, status = sam_response
+    circuit_breaker.record(time.monotonic() - start, failed=status >= 500)
+    return sam_response_ok, sam_response_data
+
+
+async def _call_post_sam_entities_api_async(
+    client_session, sam_api_endpoint, search_parameters
+):
+    # A copy, as the caller's parameters, api_key included, also key the response cache
+    search_parameters = dict(search_parameters)
+    quota_scheduler = get_quota_scheduler()
+    if quota_scheduler is not None and "api_key" not in search_parameters:
+        # acquire() may sleep while waiting for a token, so keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, quota_scheduler.acquire)
+    header = {
+        "X-api-key": _get_api_key_if_none_provided(search_parameters),
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+    search_parameters.pop("api_key", None)
+    async with client_session.post(
+        sam_api_endpoint, headers=header, params=_to_query_items(search_parameters)
+    ) as sam_response:
+        current_app.logger.info(sam_response.url)
+        if not sam_response.ok:
+            # Only logged, and outages are often answered with HTML, so it is not decoded as JSON
+            sam_response_data = await sam_response.text(errors="replace")
+            current_app.logger.error(sam_response_data)
+            return False, sam_response_data, sam_response.status
+        sam_response_data = await _read_sam_entities_data_async(
+            sam_response.content.iter_chunked(SAM_RESPONSE_CHUNK_SIZE),
+            get_entity_transform(),
+        )
+        return True, sam_response_data, sam_response.status
+
+
+async def _read_sam_entities_data_async(chunks, transform=None):
+    """Async equivalent of entity_information._read_sam_entities_data"""
+    decoder = EntityDataDecoder(transform=transform)
+    entities = []
+    async for chunk in chunks:
+        entities.extend(decoder.feed(chunk))
+    entities.extend(decoder.close())
+    return {**decoder.fields, "entityData": entities}
+
+
+def _to_query_items(search_parameters):
+    """Expand set and list values into repeated parameters, as requests does"""
+    query_items = []
+    for name, value in search_parameters.items():
+        if isinstance(value, (set, frozenset, list, tuple)):
+            query_items.extend((name, str(item)) for item in sorted(value))
+        else:
+            query_items.append((name, str(value)))
+    return query_items
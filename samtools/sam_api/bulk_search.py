@@ -0,0 +1,209 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Bulk vendor lookup. A list of identifiers (SAM UEIs, CAGE codes, business names or websites) is
+classified with the search preprocessor. UEIs and CAGE codes are batched into multi-value SAM
+queries (ueiSAM=[A~B~C]), everything else is searched individually. A batch can match more
+entities than fit in one SAM page (child entities, CAGE codes shared by several entities), so
+every page of a batched query is fetched before its identifiers are reported found or not found.
+The SAM calls run on a bounded thread pool and one result per identifier is yielded as soon as it
+is ready.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import current_app
+
+from samtools.sam_api.entity_information import (
+    SAM_ENTITIES_API_ENDPOINT,
+    SAM_ENTITIES_API_PAGE_SIZE,
+    SAM_ERROR_MESSAGE,
+    DataAdaptors,
+    _search_sam,
+)
+from samtools.sam_api.search_preprocessor import get_search_parameter
+
+DEFAULT_SEARCH_ARGS = {
+    "includeSections": "samToolsData,entityRegistration,coreData",
+    "entityEFTIndicator": "",
+}
+_BATCHABLE_PARAMETERS = ("ueiSAM", "cageCode")
+
+
+def search_sam_v3_bulk(identifiers, search_args, host_url):
+    """Search SAM for every identifier, yielding results in completion order.
+
+    Args:
+        identifiers (list): user input search expressions, one per vendor
+        search_args (dict): Sam Tools url search parameters applied to every search
+        host_url (str): The url of the this tool which will be included in the PDF download link
+
+    Yields:
+        dict: {"identifier", "searchParameter", "success", "entityData" or "errors"}
+    """
+    config = current_app.config
+    if len(identifiers) > config["SAM_BULK_MAX_IDENTIFIERS"]:
+        raise ValueError(
+            f"At most {config['SAM_BULK_MAX_IDENTIFIERS']} identifiers can be searched at once"
+        )
+
+    search_args = _get_bulk_search_args(search_args)
+    batches = _get_batches(identifiers, config["SAM_BULK_BATCH_SIZE"])
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+
+    def run_batch(batch):
+        with app.app_context():
+            try:
+                return _search_batch(batch, search_args, host_url)
+            except Exception as exception:  # pylint: disable=broad-except
+                current_app.logger.error(exception)
+                error_response = {"success": False, "errors": [SAM_ERROR_MESSAGE]}
+                return [
+                    _get_result(identifier, search_parameter, error_response)
+                    for identifier, search_parameter in batch[1]
+                ]
+
+    with ThreadPoolExecutor(max_workers=config["SAM_BULK_CONCURRENCY"]) as executor:
+        futures = [executor.submit(run_batch, batch) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _get_bulk_search_args(search_args):
+    """Apply the defaults and make sure entityRegistration is returned, since batched results
+    are matched back to their identifiers by ueiSAM or cageCode."""
+    search_args = {**DEFAULT_SEARCH_ARGS, **search_args}
+    search_args.pop("samToolsSearch", None)
+    include_sections = set(
+        DataAdaptors._parse_include_sections(search_args["includeSections"])
+    )
+    include_sections.add("entityRegistration")
+    search_args["includeSections"] = ",".join(sorted(include_sections))
+    return search_args
+
+
+def _get_batches(identifiers, batch_size):
+    """Group identifiers into batches of (parameter_name, [(identifier, search_parameter)]).
+
+    UEIs and CAGE codes are grouped up to batch_size per batch. Other searches are their own
+    batch with parameter_name None.
+    """
+    grouped = {name: [] for name in _BATCHABLE_PARAMETERS}
+    batches = []
+    for identifier in identifiers:
+        search_parameter = get_search_parameter(identifier)
+        parameter_name = next(iter(search_parameter), None)
+        if parameter_name in grouped:
+            grouped[parameter_name].append((identifier, search_parameter))
+        else:
+            batches.append((None, [(identifier, search_parameter)]))
+
+    for parameter_name, members in grouped.items():
+        for start in range(0, len(members), batch_size):
+            batches.append((parameter_name, members[start : start + batch_size]))
+    return batches
+
+
+def _search_batch(batch, search_args, host_url):
+    parameter_name, members = batch
+    if parameter_name is None:
+        identifier, search_parameter = members[0]
+        if not search_parameter:
+            return [
+                _get_result(
+                    identifier,
+                    search_parameter,
+                    {"success": False, "errors": ["Empty search"]},
+                )
+            ]
+        response = _search_sam(
+            {**search_args, "samToolsSearch": identifier},
+            host_url,
+            SAM_ENTITIES_API_ENDPOINT,
+        )
+        return [_get_result(identifier, search_parameter, response)]
+
+    values = sorted(
+        {search_parameter[parameter_name].upper() for _, search_parameter in members}
+    )
+    response = _search_all_pages(
+        {**search_args, parameter_name: f"[{'~'.join(values)}]"}, host_url
+    )
+    return [
+        _get_result(
+            identifier,
+            search_parameter,
+            response,
+            parameter_name=parameter_name,
+            value=search_parameter[parameter_name].upper(),
+        )
+        for identifier, search_parameter in members
+    ]
+
+
+def _search_all_pages(search_args, host_url):
+    """Search SAM page by page until every matching entity is returned
+
+    Returns:
+        dict: the first page's response with the entities of every page, or the first
+            unsuccessful response
+    """
+    search_args = {**search_args, "size": SAM_ENTITIES_API_PAGE_SIZE}
+    response = _search_sam(search_args, host_url, SAM_ENTITIES_API_ENDPOINT)
+    if not response["success"]:
+        return response
+    entities = list(response["entityData"])
+    page = 1
+    while page * SAM_ENTITIES_API_PAGE_SIZE < response["totalRecords"]:
+        page_response = _search_sam(
+            {**search_args, "page": page}, host_url, SAM_ENTITIES_API_ENDPOINT
+        )
+        if not page_response["success"]:
+            return page_response
+        if not page_response["entityData"]:
+            break
+        entities.extend(page_response["entityData"])
+        page += 1
+    return {**response, "entityData": entities}
+
+
+def _get_result(
+    identifier, search_parameter, response, parameter_name=None, value=None
+):
+    result = {
+        "identifier": identifier,
+        "searchParameter": search_parameter,
+        "success": response["success"],
+    }
+    if not response["success"]:
+        result["errors"] = response["errors"]
+        return result
+
+    entities = response["entityData"]
+    if parameter_name is not None:
+        entities = [
+            entity
+            for entity in entities
+            if str(entity["entityRegistration"][parameter_name]).upper() == value
+        ]
+    result["entityData"] = entities
+    return result
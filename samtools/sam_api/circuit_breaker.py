@@ -0,0 +1,201 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Circuit breaker for the SAM Entities API.
+
+When api.sam.gov is down or very slow every search would otherwise hold a worker for the full
+read timeout. After SAM_CIRCUIT_FAILURE_THRESHOLD consecutive failures (errors, 5xx responses or
+calls slower than SAM_CIRCUIT_SLOW_CALL_SECONDS) the circuit opens and calls fail immediately.
+After SAM_CIRCUIT_RESET_TIMEOUT seconds it is half-open: a limited number of trial calls are let
+through, and the circuit closes again on success or reopens on failure.
+"""
+
+import threading
+import time
+
+import requests
+from flask import current_app
+
+_EXTENSION_NAME = "samtools.circuit_breaker"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling SAM while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive failure and slow call circuit breaker"""
+
+    def __init__(
+        self,
+        failure_threshold,
+        slow_call_seconds,
+        reset_timeout,
+        half_open_max_calls=1,
+        clock=time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = None
+        self._trial_calls = 0
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        """closed, open or half-open
+
+        Returns:
+            str:
+        """
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self):
+        """Reserve permission to call SAM.
+
+        Raises:
+            CircuitOpenError: the circuit is open, or half-open with all trial calls in use
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._trial_calls < self.half_open_max_calls:
+                self._trial_calls += 1
+                return
+            self.rejected += 1
+            raise CircuitOpenError("SAM Entities API circuit is open")
+
+    def record(self, elapsed, failed):
+        """Record the outcome of a call allowed by before_call
+
+        Args:
+            elapsed (float): seconds the call took
+            failed (bool): the call raised a transport error or SAM answered with a 5xx
+        """
+        failed = failed or elapsed > self.slow_call_seconds
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._trial_calls = max(0, self._trial_calls - 1)
+            if not failed:
+                self.consecutive_failures = 0
+                if state == HALF_OPEN:
+                    self._state = CLOSED
+                return
+
+            self.consecutive_failures += 1
+            if (
+                state == HALF_OPEN
+                or self.consecutive_failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def release(self):
+        """Give back a half-open trial slot for a call that ended without a SAM outcome"""
+        with self._lock:
+            if self._current_state() == HALF_OPEN:
+                self._trial_calls = max(0, self._trial_calls - 1)
+
+    def call(self, function, is_failure):
+        """Call function through the breaker
+
+        Args:
+            function (callable): the SAM call, taking no arguments
+            is_failure (callable): given the return value, True if it counts as a failure
+
+        Raises:
+            CircuitOpenError: the circuit is open
+
+        Returns:
+            object: the return value of function
+        """
+        self.before_call()
+        start = self._clock()
+        try:
+            result = function()
+        except (requests.RequestException, OSError):
+            self.record(self._clock() - start, failed=True)
+            raise
+        except Exception:
+            self.release()
+            raise
+        self.record(self._clock() - start, failed=is_failure(result))
+        return result
+
+    def stats(self):
+        """Breaker state for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutiveFailures": self.consecutive_failures,
+                "timesOpened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._trial_calls = 0
+        self.times_opened += 1
+
+    def _current_state(self):
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = HALF_OPEN
+            self._trial_calls = 0
+        return self._state
+
+
+def init_app(app):
+    """Attach a circuit breaker configured by the SAM_CIRCUIT_* settings
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    app.extensions[_EXTENSION_NAME] = CircuitBreaker(
+        failure_threshold=app.config["SAM_CIRCUIT_FAILURE_THRESHOLD"],
+        slow_call_seconds=app.config["SAM_CIRCUIT_SLOW_CALL_SECONDS"],
+        reset_timeout=app.config["SAM_CIRCUIT_RESET_TIMEOUT"],
+        half_open_max_calls=app.config["SAM_CIRCUIT_HALF_OPEN_MAX_CALLS"],
+    )
+
+
+def get_circuit_breaker():
+    """The circuit breaker of the current application
+
+    Returns:
+        CircuitBreaker: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
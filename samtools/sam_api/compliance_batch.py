@@ -0,0 +1,130 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Compliance verdicts of many entities at once, for bulk jobs and extract ingestion.
+
+The fields the verdicts depend on are read into one column of small integer codes, one code per
+entity combining the two 52.204-26 answers, the exclusion flag and the registration status.
+Every output column is then a lookup of those codes in a table of the 36 possible verdicts, which
+are computed once per version of the compliance rules used by the EightEightNine, Exclusions and
+RegistrationStatus objects.
+"""
+
+import functools
+import itertools
+from array import array
+
+from samtools.compliance.compliance_rules import (
+    _ANSWER_TO_PROVISION_TEXT_MAPPING,
+    _PROVISION_ANSWERS,
+    get_rules,
+)
+from samtools.sam_api.entity_information import DataAdaptors
+
+_COLUMNS = (
+    "isCompliant",
+    "statusText",
+    "farProvisionDate",
+    "hasExclusions",
+    "isActive",
+    "isSelectable",
+    "answers",
+)
+# Answer text ("No", "Yes") to the position of its provision text in _PROVISION_ANSWERS
+_ANSWER_CODES = {
+    answer: _PROVISION_ANSWERS.index(provision_text)
+    for answer, provision_text in _ANSWER_TO_PROVISION_TEXT_MAPPING.items()
+}
+_HAS_EXCLUSIONS = 2
+_IS_ACTIVE = 1
+
+
+@functools.lru_cache(maxsize=2)
+def _get_verdict_rows(rules):
+    """Verdict rows indexed by (c1 answer code * 3 + c2 answer code) * 4 + exclusion and
+    registration bits"""
+    return [
+        _get_verdict_row(rules, answers, has_exclusions, is_active)
+        for answers in itertools.product(_PROVISION_ANSWERS, repeat=2)
+        for has_exclusions in (False, True)
+        for is_active in (False, True)
+    ]
+
+
+def _get_verdict_row(rules, answers, has_exclusions, is_active):
+    is_compliant, status_text, _, far_provision_date = rules.verdicts[answers]
+    return (
+        is_compliant,
+        status_text,
+        far_provision_date,
+        has_exclusions,
+        is_active,
+        rules.is_selectable(is_compliant, has_exclusions, is_active),
+        answers,
+    )
+
+
+def evaluate_many(entities):
+    """The 889 compliance, exclusion and registration verdicts of many entities, identical to
+    the samToolsData built by _adapt_sam_entities for each one.
+
+    Args:
+        entities (iterable): SAM entity records
+
+    Raises:
+        KeyError: for 52.204-26 answers other than 'Yes' or 'No', like the per entity adaptors
+
+    Returns:
+        dict: columns isCompliant, statusText, farProvisionDate, hasExclusions, isActive,
+            isSelectable and answers, the (c.1, c.2) 52.204-26 answers as in the FAR text
+            ("DOES NOT", "DOES" or None), each a list in the order of entities
+    """
+    codes = array("B", map(_get_code, entities))
+    if not codes:
+        return {column: [] for column in _COLUMNS}
+    rows = map(_get_verdict_rows(get_rules()).__getitem__, codes)
+    return dict(zip(_COLUMNS, map(list, zip(*rows))))
+
+
+def _get_code(entity):
+    return _get_answers_code(entity) * 4 + _get_registration_bits(entity)
+
+
+def _get_answers_code(entity):
+    far_index = DataAdaptors.index_far_responses(entity)
+    if far_index is None:
+        return 0
+    answers = far_index.get("FAR 52.204-26", {})
+    c1_code = _get_answer_code(answers.get("52.204-26.c.1"))
+    return c1_code * 3 + _get_answer_code(answers.get("52.204-26.c.2"))
+
+
+def _get_answer_code(answer):
+    if answer is None:
+        return 0
+    return _ANSWER_CODES[answer.title()]
+
+
+def _get_registration_bits(entity):
+    registration = entity.get("entityRegistration", {})
+    bits = 0
+    # Exclusions.has_exclusions and RegistrationStatus.is_active
+    if registration.get("exclusionStatusFlag", "") != "N":
+        bits |= _HAS_EXCLUSIONS
+    if registration.get("registrationStatus") == "Active":
+        bits |= _IS_ACTIVE
+    return bits
@@ -0,0 +1,360 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+History of the compliance status of the entities returned by searches.
+
+Each time samToolsData is computed for an entity, its compliance status is hashed and compared
+with the last status recorded for that entity. A row is appended only when the status changed, so
+the history grows with the number of status changes rather than the number of searches. Rows are
+never updated or deleted.
+
+The status is the subset of samToolsData that describes compliance: isSelectable, the 889
+status, compliance and FAR provision date, and the exclusion and registration statuses. Each row
+points to the row it replaced, and changes (rows replacing an earlier status) have their own index
+by time, so "changes since" and per-entity timelines stay index lookups as the history grows.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+from samtools.sam_api import sqlite_store
+
+_EXTENSION_NAME = "samtools.compliance_history"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compliance_history (
+    id INTEGER PRIMARY KEY,
+    uei_sam TEXT NOT NULL,
+    entity_eft_indicator TEXT NOT NULL,
+    recorded_at INTEGER NOT NULL,
+    status_hash INTEGER NOT NULL,
+    previous_id INTEGER REFERENCES compliance_history (id),
+    is_selectable INTEGER NOT NULL,
+    is_compliant INTEGER NOT NULL,
+    status_text TEXT,
+    far_provision_date TEXT,
+    has_exclusions INTEGER NOT NULL,
+    exclusion_status_text TEXT,
+    is_active INTEGER NOT NULL,
+    registration_status_text TEXT
+);
+CREATE INDEX IF NOT EXISTS compliance_history_entity
+    ON compliance_history (uei_sam, entity_eft_indicator, id);
+CREATE INDEX IF NOT EXISTS compliance_history_changes
+    ON compliance_history (recorded_at, id) WHERE previous_id IS NOT NULL;
+"""
+_STATUS_COLUMNS = (
+    "is_selectable",
+    "is_compliant",
+    "status_text",
+    "far_provision_date",
+    "has_exclusions",
+    "exclusion_status_text",
+    "is_active",
+    "registration_status_text",
+)
+_ROW_COLUMNS = (
+    "id",
+    "uei_sam",
+    "entity_eft_indicator",
+    "recorded_at",
+    *_STATUS_COLUMNS,
+)
+_INSERT = (
+    "INSERT INTO compliance_history (uei_sam, entity_eft_indicator, recorded_at, "
+    f"status_hash, previous_id, {', '.join(_STATUS_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (5 + len(_STATUS_COLUMNS)))})"
+)
+_TIMELINE = (
+    f"SELECT {', '.join(_ROW_COLUMNS)} FROM compliance_history "
+    "WHERE uei_sam = ? AND entity_eft_indicator = ? ORDER BY id"
+)
+_CHANGES = f"""
+SELECT {', '.join(f'change.{column}' for column in _ROW_COLUMNS)},
+    {', '.join(f'previous.{column}' for column in _ROW_COLUMNS)}
+FROM compliance_history AS change INDEXED BY compliance_history_changes
+JOIN compliance_history AS previous ON previous.id = change.previous_id
+WHERE change.previous_id IS NOT NULL AND change.recorded_at >= ? AND change.id > ?
+ORDER BY change.recorded_at, change.id
+LIMIT ?
+"""
+_LATEST_ROW = """
+SELECT id, status_hash FROM compliance_history
+WHERE uei_sam = ? AND entity_eft_indicator = ?
+ORDER BY id DESC LIMIT 1
+"""
+_DEFAULT_CHANGES_LIMIT = 1000
+
+
+class ComplianceHistory:
+    """Append-only SQLite store of compliance status changes"""
+
+    def __init__(self, database_path, clock=time.time):
+        self.database_path = str(database_path)
+        self._clock = clock
+        self._read_connections = sqlite_store.ReadConnections(self.database_path)
+        self._counter_lock = threading.Lock()
+        self.recorded = 0
+        self.unchanged = 0
+        self.failures = 0
+        sqlite_store.create_schema(self.database_path, _SCHEMA)
+
+    def record(self, entities):
+        """Append the status of each entity that changed since it was last recorded
+
+        Args:
+            entities (iterable): entities with their entityRegistration and samToolsData sections
+
+        Returns:
+            int: the number of rows appended
+        """
+        statuses = {}
+        for entity in entities:
+            key, status = _get_status(entity)
+            if key is not None:
+                statuses[key] = status
+        if not statuses:
+            return 0
+
+        changed = self._get_changed(self._read_connections.get(), statuses)
+        appended = 0
+        if changed:
+            # In WAL mode, a power loss can only lose the last appends, not corrupt
+            with sqlite_store.transaction(
+                self.database_path, synchronous="NORMAL"
+            ) as connection:
+                appended = self._append(
+                    connection,
+                    {key: status for key, (_, status) in changed.items()},
+                )
+        with self._counter_lock:
+            self.recorded += appended
+            self.unchanged += len(statuses) - appended
+        return appended
+
+    def record_safely(self, entities):
+        """record, counting database errors instead of raising them, for use while serving
+        searches
+
+        Args:
+            entities (iterable):
+
+        Returns:
+            int: the number of rows appended
+        """
+        try:
+            return self.record(entities)
+        except sqlite3.Error as error:
+            with self._counter_lock:
+                self.failures += 1
+            current_app.logger.error(error)
+            return 0
+
+    def get_timeline(self, uei_sam, entity_eft_indicator=None):
+        """Every status recorded for an entity, oldest first
+
+        Args:
+            uei_sam (str):
+            entity_eft_indicator (str, optional): Defaults to the parent entity.
+
+        Returns:
+            list: of statuses, see _to_status
+        """
+        rows = self._read_connections.get().execute(
+            _TIMELINE, (uei_sam.upper(), entity_eft_indicator or "")
+        )
+        return [_to_status(row) for row in rows]
+
+    def get_changes(self, since, limit=_DEFAULT_CHANGES_LIMIT, after_id=None):
+        """Status changes recorded since a time, oldest first. The first status recorded for an
+        entity is not a change.
+
+        Args:
+            since (float): unix time
+            limit (int, optional): maximum number of changes
+            after_id (int, optional): only changes with a greater id, to page through the
+                results
+
+        Returns:
+            list: of statuses with the status they replaced under "previous"
+        """
+        rows = self._read_connections.get().execute(
+            _CHANGES, (int(since), after_id or 0, limit)
+        )
+        width = len(_ROW_COLUMNS)
+        return [
+            {**_to_status(row[:width]), "previous": _to_status(row[width:])}
+            for row in rows
+        ]
+
+    def stats(self):
+        """Row and recording counters for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        (rows,) = (
+            self._read_connections.get()
+            .execute("SELECT COALESCE(MAX(id), 0) FROM compliance_history")
+            .fetchone()
+        )
+        with self._counter_lock:
+            return {
+                "rows": rows,
+                "recorded": self.recorded,
+                "unchanged": self.unchanged,
+                "failures": self.failures,
+            }
+
+    @staticmethod
+    def _get_changed(connection, statuses):
+        """(id of the latest row, status) of the statuses whose hash differs from the latest row
+        of their entity"""
+        changed = {}
+        for key, status in statuses.items():
+            latest = connection.execute(_LATEST_ROW, key).fetchone()
+            if latest is None:
+                changed[key] = (None, status)
+            elif latest[1] != status[0]:
+                changed[key] = (latest[0], status)
+        return changed
+
+    def _append(self, connection, statuses):
+        # Another worker may have appended the same change since it was checked
+        changed = self._get_changed(connection, statuses)
+        recorded_at = int(self._clock())
+        connection.executemany(
+            _INSERT,
+            [
+                (*key, recorded_at, status[0], previous_id, *status[1:])
+                for key, (previous_id, status) in changed.items()
+            ],
+        )
+        return len(changed)
+
+
+def _get_status(entity):
+    """((UEI, EFT indicator), (hash, status columns...)) of an entity, or (None, None) if it has
+    no UEI or samToolsData"""
+    registration = entity.get("entityRegistration") or {}
+    sam_tools_data = entity.get("samToolsData")
+    if not registration.get("ueiSAM") or not sam_tools_data:
+        return None, None
+    eight_eight_nine = sam_tools_data["eightEightNine"]
+    exclusions = sam_tools_data["exclusions"]
+    registration_status = sam_tools_data["registration"]
+    status = (
+        bool(sam_tools_data["isSelectable"]),
+        bool(eight_eight_nine["isCompliant"]),
+        eight_eight_nine["statusText"],
+        eight_eight_nine["farProvisionDate"],
+        bool(exclusions["hasExclusions"]),
+        exclusions["statusText"],
+        bool(registration_status["isActive"]),
+        registration_status["statusText"],
+    )
+    key = (
+        registration["ueiSAM"].upper(),
+        registration.get("entityEFTIndicator") or "",
+    )
+    status_hash = sqlite_store.get_hash(json.dumps(status, separators=(",", ":")))
+    return key, (status_hash, *status)
+
+
+def _to_status(row):
+    (
+        history_id,
+        uei_sam,
+        entity_eft_indicator,
+        recorded_at,
+        is_selectable,
+        is_compliant,
+        status_text,
+        far_provision_date,
+        has_exclusions,
+        exclusion_status_text,
+        is_active,
+        registration_status_text,
+    ) = row
+    return {
+        "id": history_id,
+        "ueiSAM": uei_sam,
+        "entityEFTIndicator": entity_eft_indicator or None,
+        "recordedAt": sqlite_store.format_time(recorded_at),
+        "isSelectable": bool(is_selectable),
+        "eightEightNine": {
+            "isCompliant": bool(is_compliant),
+            "statusText": status_text,
+            "farProvisionDate": far_provision_date,
+        },
+        "exclusions": {
+            "hasExclusions": bool(has_exclusions),
+            "statusText": exclusion_status_text,
+        },
+        "registration": {
+            "isActive": bool(is_active),
+            "statusText": registration_status_text,
+        },
+    }
+
+
+def parse_time(value):
+    """Unix time of an ISO 8601 date or UTC date and time, as accepted by the since parameter
+
+    Args:
+        value (str): for example 2022-10-03 or 2022-10-03T12:00:00Z
+
+    Raises:
+        ValueError: if value is not a date or date and time
+
+    Returns:
+        float:
+    """
+    parsed = datetime.datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def init_app(app):
+    """Attach the compliance history when SAM_COMPLIANCE_HISTORY is set. The database defaults
+    to instance/compliance_history.sqlite3.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    if not app.config["SAM_COMPLIANCE_HISTORY"]:
+        return
+    database_path = app.config["SAM_COMPLIANCE_HISTORY_DATABASE"]
+    if database_path is None:
+        os.makedirs(app.instance_path, exist_ok=True)
+        database_path = os.path.join(app.instance_path, "compliance_history.sqlite3")
+    app.extensions[_EXTENSION_NAME] = ComplianceHistory(database_path)
+
+
+def get_compliance_history():
+    """The compliance history of the current application
+
+    Returns:
+        ComplianceHistory: or None if the history is disabled
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
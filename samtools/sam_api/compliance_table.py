@@ -0,0 +1,347 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Precomputed compliance verdicts of every entity in the local entity index.
+
+The table is a file of fixed-width slots, an open addressing hash table keyed by UEI, that each
+worker maps into memory read-only. The operating system shares the mapped pages between all
+gunicorn workers, and a lookup reads one or two 16 byte slots. Each slot holds the UEI and its
+status bits:
+
+    bit 0     889 compliant
+    bits 1-2  52.204-26.c.1 answer (0 none, 1 DOES NOT, 2 DOES)
+    bits 3-4  52.204-26.c.2 answer
+    bits 5-6  FAR provision date (0 none, 1 DEC 2019, 2 OCT 2020)
+    bit 7     has exclusions
+    bit 8     active registration
+    bit 9     selectable
+
+The table is rebuilt from the local entity index into a temporary file that replaces the old one
+in a single rename. Workers notice the new file and map it on their next lookup.
+"""
+
+import itertools
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from flask import current_app
+
+from samtools.compliance import compliance_rules
+from samtools.sam_api.compliance_batch import evaluate_many
+from samtools.sam_api.entity_information import DataAdaptors, _is_entity_selectable
+
+_EXTENSION_NAME = "samtools.compliance_table"
+_MAGIC = b"S889"
+_VERSION = 1
+# magic, version, slot size, slot count, entity count, index high-water mark
+_HEADER = struct.Struct("<4sHHII10s6x")
+_UEI_SIZE = 12
+# UEI, status bits
+_SLOT = struct.Struct(f"<{_UEI_SIZE}sH2x")
+_MIN_SLOTS = 16
+# Entities scored together by evaluate_many while building the table
+_BUILD_BATCH_SIZE = 10000
+
+IS_COMPLIANT = 1 << 0
+_C1_SHIFT = 1
+_C2_SHIFT = 3
+_FAR_PROVISION_DATE_SHIFT = 5
+HAS_EXCLUSIONS = 1 << 7
+IS_ACTIVE = 1 << 8
+IS_SELECTABLE = 1 << 9
+
+_ANSWERS = (None, "DOES NOT", "DOES")
+_FAR_PROVISION_DATES = (None, "DEC 2019", "OCT 2020")
+
+
+def pack_compliance_status(entity):
+    """Status bits of an entity, from the same adaptors as samToolsData
+
+    Args:
+        entity (dict): a SAM entity record
+
+    Returns:
+        int:
+    """
+    data_adaptors = DataAdaptors()
+    try:
+        eight_eight_nine = data_adaptors.adapt_sam_response_to_889_compliance(entity)
+    except KeyError:
+        # 52.204-26 answers other than Yes or No count as no reps & certs
+        eight_eight_nine = compliance_rules.EightEightNine()
+    exclusions = data_adaptors.adapt_sam_response_to_exclusions(entity)
+    registration_status = data_adaptors.adapt_sam_response_to_registration_status(
+        entity
+    )
+    far = eight_eight_nine.far
+    return _pack(
+        eight_eight_nine.is_compliant,
+        eight_eight_nine.far_provision_date,
+        exclusions.has_exclusions,
+        registration_status.is_active,
+        _is_entity_selectable(
+            eight_eight_nine.is_compliant,
+            exclusions.has_exclusions,
+            registration_status.is_active,
+        ),
+        (far["52.204-26.c.1"]["answer"], far["52.204-26.c.2"]["answer"]),
+    )
+
+
+def _pack_many(entities):
+    """Status bits of a batch of entities, scored together by evaluate_many"""
+    try:
+        columns = evaluate_many(entities)
+    except KeyError:
+        # A batch with unreadable 52.204-26 answers is packed one entity at a time
+        return [pack_compliance_status(entity) for entity in entities]
+    return list(
+        map(
+            _pack,
+            columns["isCompliant"],
+            columns["farProvisionDate"],
+            columns["hasExclusions"],
+            columns["isActive"],
+            columns["isSelectable"],
+            columns["answers"],
+        )
+    )
+
+
+def _pack(
+    is_compliant, far_provision_date, has_exclusions, is_active, is_selectable, answers
+):
+    status = (
+        _ANSWERS.index(answers[0]) << _C1_SHIFT
+        | _ANSWERS.index(answers[1]) << _C2_SHIFT
+        | _FAR_PROVISION_DATES.index(far_provision_date) << _FAR_PROVISION_DATE_SHIFT
+    )
+    if is_compliant:
+        status |= IS_COMPLIANT
+    if has_exclusions:
+        status |= HAS_EXCLUSIONS
+    if is_active:
+        status |= IS_ACTIVE
+    if is_selectable:
+        status |= IS_SELECTABLE
+    return status
+
+
+def unpack_compliance_status(uei_sam, status):
+    """The compliance verdict of a UEI as returned by /api/compliance/<uei>
+
+    Args:
+        uei_sam (str):
+        status (int): status bits
+
+    Returns:
+        dict:
+    """
+    return {
+        "ueiSAM": uei_sam,
+        "isSelectable": bool(status & IS_SELECTABLE),
+        "eightEightNine": {
+            "isCompliant": bool(status & IS_COMPLIANT),
+            "farProvisionDate": _FAR_PROVISION_DATES[
+                status >> _FAR_PROVISION_DATE_SHIFT & 3
+            ],
+            "answers": {
+                "52.204-26.c.1": _ANSWERS[status >> _C1_SHIFT & 3],
+                "52.204-26.c.2": _ANSWERS[status >> _C2_SHIFT & 3],
+            },
+        },
+        "exclusions": {"hasExclusions": bool(status & HAS_EXCLUSIONS)},
+        "registration": {"isActive": bool(status & IS_ACTIVE)},
+    }
+
+
+def build_compliance_table(entity_index, path):
+    """Rebuild the compliance table file from the parent entities of the local entity index.
+    The new table replaces the old file atomically. Entities are scored in batches by
+    evaluate_many.
+
+    Args:
+        entity_index (EntityIndex):
+        path (str): the compliance table file
+
+    Returns:
+        int: the number of entities in the table
+    """
+    statuses = {}
+    entities = entity_index.iter_entities(parents_only=True)
+    for chunk in iter(lambda: list(itertools.islice(entities, _BUILD_BATCH_SIZE)), []):
+        batch = {}
+        for entity in chunk:
+            uei_sam = entity["entityRegistration"]["ueiSAM"].upper().encode("ascii")
+            if 0 < len(uei_sam) <= _UEI_SIZE:
+                batch[uei_sam] = entity
+        statuses.update(zip(batch, _pack_many(list(batch.values()))))
+
+    slot_count = _MIN_SLOTS
+    while slot_count < 2 * len(statuses):
+        slot_count *= 2
+    table = bytearray(_HEADER.size + slot_count * _SLOT.size)
+    high_water_mark = (entity_index.high_water_mark or "").encode("ascii")
+    _HEADER.pack_into(
+        table,
+        0,
+        _MAGIC,
+        _VERSION,
+        _SLOT.size,
+        slot_count,
+        len(statuses),
+        high_water_mark,
+    )
+    for uei_sam, status in statuses.items():
+        slot = zlib.crc32(uei_sam) & (slot_count - 1)
+        while table[_HEADER.size + slot * _SLOT.size] != 0:
+            slot = (slot + 1) & (slot_count - 1)
+        _SLOT.pack_into(table, _HEADER.size + slot * _SLOT.size, uei_sam, status)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        dir=directory, prefix=".compliance_table.", delete=False
+    ) as table_file:
+        table_file.write(table)
+    os.replace(table_file.name, path)
+    return len(statuses)
+
+
+class ComplianceTable:
+    """Read-only, memory-mapped view of the compliance table file. The file is checked for
+    replacement at most every check_interval seconds."""
+
+    def __init__(self, path, check_interval=1.0, clock=time.monotonic):
+        self.path = str(path)
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._table = None
+        self._file_id = None
+        self._checked_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, uei_sam):
+        """The compliance verdict of a parent entity
+
+        Args:
+            uei_sam (str):
+
+        Returns:
+            dict: see unpack_compliance_status, or None if the UEI is not in the table
+        """
+        status = self._find_status(uei_sam)
+        with self._lock:
+            if status is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if status is None:
+            return None
+        return unpack_compliance_status(uei_sam.upper(), status)
+
+    def stats(self):
+        """Table size and lookup counters for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        table = self._get_table()
+        entities = slots = 0
+        high_water_mark = None
+        if table is not None:
+            _, _, _, slots, entities, high_water_mark = _HEADER.unpack_from(table)
+            high_water_mark = high_water_mark.rstrip(b"\0").decode("ascii") or None
+        return {
+            "entities": entities,
+            "slots": slots,
+            "highWaterMark": high_water_mark,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _find_status(self, uei_sam):
+        table = self._get_table()
+        key = uei_sam.upper().encode("ascii", errors="replace")
+        if table is None or not 0 < len(key) <= _UEI_SIZE:
+            return None
+        slot_count = _HEADER.unpack_from(table)[3]
+        slot = zlib.crc32(key) & (slot_count - 1)
+        key = key.ljust(_UEI_SIZE, b"\0")
+        while True:
+            offset = _HEADER.size + slot * _SLOT.size
+            slot_uei, status = _SLOT.unpack_from(table, offset)
+            if slot_uei == key:
+                return status
+            if slot_uei[0] == 0:
+                return None
+            slot = (slot + 1) & (slot_count - 1)
+
+    def _get_table(self):
+        now = self._clock()
+        with self._lock:
+            if (
+                self._checked_at is not None
+                and now - self._checked_at < self.check_interval
+            ):
+                return self._table
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._table, self._file_id = None, None
+                return None
+            file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if file_id != self._file_id:
+                self._table, self._file_id = self._map(), file_id
+            return self._table
+
+    def _map(self):
+        with open(self.path, "rb") as table_file:
+            table = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, slot_size, *_ = _HEADER.unpack_from(table)
+        if (magic, version, slot_size) != (_MAGIC, _VERSION, _SLOT.size):
+            raise ValueError(f"{self.path} is not a compliance table")
+        return table
+
+
+def init_app(app):
+    """Attach the compliance table. The file defaults to instance/compliance_table.bin.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    path = app.config["SAM_COMPLIANCE_TABLE"]
+    if path is None:
+        os.makedirs(app.instance_path, exist_ok=True)
+        path = os.path.join(app.instance_path, "compliance_table.bin")
+    app.extensions[_EXTENSION_NAME] = ComplianceTable(path)
+
+
+def get_compliance_table():
+    """The compliance table of the current application
+
+    Returns:
+        ComplianceTable: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
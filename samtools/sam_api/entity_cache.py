@@ -0,0 +1,114 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Store of individual entity records (with samToolsData) returned by recent SAM searches.
+
+The front-end searches first and then asks for the PDF summary of one of the results by ueiSAM
+or cageCode. Keeping the adapted entities from the search lets the PDF be rendered without a
+second SAM round trip. Records older than SAM_ENTITY_CACHE_MAX_AGE seconds are never used so
+that compliance records do not go stale.
+"""
+
+from flask import current_app
+
+from samtools.sam_api.response_cache import TTLCache
+
+_EXTENSION_NAME = "samtools.entity_cache"
+_LOOKUP_PARAMETERS = {"ueiSAM", "cageCode", "entityEFTIndicator", "includeSections"}
+
+
+class EntityCache:
+    """Entities indexed by (ueiSAM, entityEFTIndicator) and by (cageCode, entityEFTIndicator).
+    Child entities share the CAGE code of their parent, so the EFT indicator keeps them apart."""
+
+    def __init__(self, max_size, max_age):
+        self._entities = TTLCache(max_size=max_size, ttl=max_age)
+
+    def add(self, entity):
+        """Store an adapted entity under its ueiSAM/EFT indicator and cageCode
+
+        Args:
+            entity (dict): entity with entityRegistration and samToolsData sections
+        """
+        registration = entity.get("entityRegistration") or {}
+        eft_indicator = registration.get("entityEFTIndicator") or ""
+        uei_sam = registration.get("ueiSAM")
+        if uei_sam:
+            self._entities.set(("ueiSAM", uei_sam.upper(), eft_indicator), entity)
+        cage_code = registration.get("cageCode")
+        if cage_code:
+            self._entities.set(("cageCode", cage_code.upper(), eft_indicator), entity)
+
+    def find(self, search_parameters):
+        """Find the single entity a set of SAM Entities API parameters would return.
+
+        Only direct lookups are answered: a ueiSAM with an entityEFTIndicator (a ueiSAM alone
+        also matches child entities), or a cageCode, which finds the parent entity unless an
+        entityEFTIndicator is given. Any other filter returns None.
+
+        Args:
+            search_parameters (dict): SAM Entities API parameters
+
+        Returns:
+            dict: the cached entity, or None
+        """
+        if not set(search_parameters).issubset(_LOOKUP_PARAMETERS):
+            return None
+
+        eft_indicator = search_parameters.get("entityEFTIndicator")
+        if "ueiSAM" in search_parameters and "cageCode" not in search_parameters:
+            if eft_indicator is None:
+                return None
+            return self._entities.get(
+                ("ueiSAM", search_parameters["ueiSAM"].upper(), eft_indicator)
+            )
+
+        if "cageCode" in search_parameters and "ueiSAM" not in search_parameters:
+            return self._entities.get(
+                ("cageCode", search_parameters["cageCode"].upper(), eft_indicator or "")
+            )
+
+        return None
+
+    def stats(self):
+        """Entity cache counters for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        return self._entities.stats()
+
+
+def init_app(app):
+    """Attach an entity cache sized by SAM_ENTITY_CACHE_SIZE and SAM_ENTITY_CACHE_MAX_AGE
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    app.extensions[_EXTENSION_NAME] = EntityCache(
+        max_size=app.config["SAM_ENTITY_CACHE_SIZE"],
+        max_age=app.config["SAM_ENTITY_CACHE_MAX_AGE"],
+    )
+
+
+def get_entity_cache():
+    """The entity cache of the current application
+
+    Returns:
+        EntityCache: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
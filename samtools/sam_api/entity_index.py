@@ -0,0 +1,553 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Local index of SAM entity records loaded from SAM entity extract files.
+
+Records are kept in a SQLite database indexed by UEI, CAGE code and business names. Lookups by
+ueiSAM or cageCode (including the [A~B] multi-value syntax used by bulk searches) can be answered
+from the index without calling the SAM Entities API. The database is in WAL mode, so searches
+keep reading the previous contents while an extract or a daily delta is being loaded.
+
+Daily delta files are applied as upserts and deletes in one transaction. The date of the last
+extract or delta loaded is kept as a high-water mark, so a delta is only applied once and in order.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+
+from flask import current_app
+
+from samtools.sam_api import sqlite_store
+from samtools.sam_api.search_preprocessor import (
+    _get_cleaned_and_prepared_business_name,
+    _split_and_preserve_quotes,
+)
+
+_EXTENSION_NAME = "samtools.entity_index"
+_LOOKUP_PARAMETERS = {
+    "ueiSAM",
+    "cageCode",
+    "entityEFTIndicator",
+    "registrationStatus",
+    "purposeOfRegistrationCode",
+    "includeSections",
+    "page",
+    "size",
+    "api_key",
+}
+_REGISTRATION_STATUSES = {"A": "Active", "E": "Expired"}
+# SAM extract code of delta records for registrations that were deleted or deactivated
+_DELETED_EXTRACT_CODE = "1"
+_DEFAULT_PAGE_SIZE = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    uei_sam TEXT NOT NULL,
+    entity_eft_indicator TEXT NOT NULL,
+    cage_code TEXT,
+    legal_business_name TEXT,
+    dba_name TEXT,
+    registration_status TEXT,
+    purpose_of_registration_code TEXT,
+    record TEXT NOT NULL,
+    UNIQUE (uei_sam, entity_eft_indicator)
+);
+CREATE INDEX IF NOT EXISTS entities_cage_code ON entities (cage_code);
+CREATE TABLE IF NOT EXISTS index_metadata (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+# Business names, by word prefix and by any three characters, kept in step with entities. Needs
+# SQLite 3.34 or later built with FTS5.
+_NAME_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entity_names USING fts5 (
+    legal_business_name, dba_name,
+    content='entities', content_rowid='id', prefix='2 3', tokenize='unicode61'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entity_names_trigram USING fts5 (
+    legal_business_name, dba_name,
+    content='entities', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS entities_insert AFTER INSERT ON entities BEGIN
+    INSERT INTO entity_names (rowid, legal_business_name, dba_name)
+        VALUES (new.id, new.legal_business_name, new.dba_name);
+    INSERT INTO entity_names_trigram (rowid, legal_business_name, dba_name)
+        VALUES (new.id, new.legal_business_name, new.dba_name);
+END;
+CREATE TRIGGER IF NOT EXISTS entities_delete AFTER DELETE ON entities BEGIN
+    INSERT INTO entity_names (entity_names, rowid, legal_business_name, dba_name)
+        VALUES ('delete', old.id, old.legal_business_name, old.dba_name);
+    INSERT INTO entity_names_trigram
+        (entity_names_trigram, rowid, legal_business_name, dba_name)
+        VALUES ('delete', old.id, old.legal_business_name, old.dba_name);
+END;
+CREATE TRIGGER IF NOT EXISTS entities_update AFTER UPDATE ON entities BEGIN
+    INSERT INTO entity_names (entity_names, rowid, legal_business_name, dba_name)
+        VALUES ('delete', old.id, old.legal_business_name, old.dba_name);
+    INSERT INTO entity_names_trigram
+        (entity_names_trigram, rowid, legal_business_name, dba_name)
+        VALUES ('delete', old.id, old.legal_business_name, old.dba_name);
+    INSERT INTO entity_names (rowid, legal_business_name, dba_name)
+        VALUES (new.id, new.legal_business_name, new.dba_name);
+    INSERT INTO entity_names_trigram (rowid, legal_business_name, dba_name)
+        VALUES (new.id, new.legal_business_name, new.dba_name);
+END;
+"""
+# bm25 weights of legalBusinessName and dbaName
+_NAME_RANK_WEIGHTS = (2.0, 1.0)
+
+
+class EntityIndex:
+    """SQLite store of SAM entity records"""
+
+    def __init__(self, database_path, name_search=False):
+        """
+        Args:
+            database_path (str): SQLite database file
+            name_search (bool, optional): index business names for search_names. Left off,
+                with a warning, when SQLite has no FTS5 trigram tokenizer.
+        """
+        self.database_path = str(database_path)
+        self._read_connections = sqlite_store.ReadConnections(self.database_path)
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.name_search = False
+        connection = sqlite_store.connect(self.database_path)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            if name_search:
+                self.name_search = self._create_name_tables(connection)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _create_name_tables(connection):
+        """Create the business name tables, filled from the entities already indexed.
+
+        Returns:
+            bool: False if this SQLite build cannot create them
+        """
+        (existing,) = connection.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'entity_names_trigram'"
+        ).fetchone()
+        if existing:
+            return True
+        try:
+            connection.executescript(
+                f"BEGIN IMMEDIATE; {_NAME_SCHEMA}"
+                "INSERT INTO entity_names (entity_names) VALUES ('rebuild');"
+                "INSERT INTO entity_names_trigram (entity_names_trigram) VALUES ('rebuild');"
+                "COMMIT;"
+            )
+        except sqlite3.OperationalError as exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            warnings.warn(f"Business name search is disabled: {exception}")
+            return False
+        return True
+
+    @property
+    def high_water_mark(self):
+        """Date (YYYY-MM-DD) of the last extract or delta loaded, or None"""
+        row = (
+            self._read_connections.get()
+            .execute("SELECT value FROM index_metadata WHERE name = 'highWaterMark'")
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    def replace_all(self, entities, source, as_of=None):
+        """Replace every record with entities, in one transaction
+
+        Args:
+            entities (iterable): SAM entity records, consumed lazily
+            source (str): where the records came from, for example the extract file name
+            as_of (str, optional): date of the extract (YYYY-MM-DD), recorded as the high-water
+                mark for later deltas
+
+        Returns:
+            int: the number of records loaded
+        """
+
+        def replace(connection):
+            connection.execute("DELETE FROM entities")
+            connection.execute("DELETE FROM index_metadata")
+            count = 0
+            for entity in entities:
+                count += self._upsert(connection, entity)
+            self._set_metadata(connection, source, as_of)
+            return count
+
+        return self._write(replace)
+
+    def apply_delta(self, entities, source, as_of):
+        """Apply a daily delta file in one transaction. Records with SAM extract code 1
+        (deleted or deactivated) are removed, all others are inserted or replaced. Searches keep
+        reading the previous contents until the whole delta is committed.
+
+        Args:
+            entities (iterable): SAM entity records of the delta, consumed lazily
+            source (str): where the records came from, for example the delta file name
+            as_of (str): date of the delta (YYYY-MM-DD)
+
+        Returns:
+            tuple: (records upserted, records deleted), or None if a delta or extract as recent
+                as as_of was already loaded
+        """
+
+        def apply(connection):
+            row = connection.execute(
+                "SELECT value FROM index_metadata WHERE name = 'highWaterMark'"
+            ).fetchone()
+            if row is not None and row[0] >= as_of:
+                return None
+            upserted = deleted = 0
+            for entity in entities:
+                if _get_extract_code(entity) == _DELETED_EXTRACT_CODE:
+                    deleted += self._delete(connection, entity)
+                else:
+                    upserted += self._upsert(connection, entity)
+            self._set_metadata(connection, source, as_of)
+            return upserted, deleted
+
+        return self._write(apply)
+
+    def find(self, search_parameters):
+        """Answer a SAM Entities API lookup by ueiSAM or cageCode from the index.
+
+        Every requested UEI or CAGE code has to be in the index, otherwise it may be a
+        registration newer than the extract and None is returned. The registrationStatus,
+        purposeOfRegistrationCode and entityEFTIndicator filters are applied to the records
+        found. Any other parameter also returns None.
+
+        Args:
+            search_parameters (dict): SAM Entities API parameters
+
+        Returns:
+            dict: {"entityData", "totalRecords"} like a SAM Entities API response, or None
+        """
+        sam_response_data = self._find(search_parameters)
+        with self._counter_lock:
+            if sam_response_data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return sam_response_data
+
+    def _find(self, search_parameters):
+        if not set(search_parameters).issubset(_LOOKUP_PARAMETERS):
+            return None
+        if ("ueiSAM" in search_parameters) == ("cageCode" in search_parameters):
+            return None
+        column, parameter_name = (
+            ("uei_sam", "ueiSAM")
+            if "ueiSAM" in search_parameters
+            else ("cage_code", "cageCode")
+        )
+        identifiers = {
+            identifier.upper()
+            for identifier in _split_values(search_parameters[parameter_name])
+        }
+        filters = _get_filters(search_parameters)
+        if filters is None or not identifiers:
+            return None
+
+        rows = (
+            self._read_connections.get()
+            .execute(
+                "SELECT uei_sam, cage_code, entity_eft_indicator, registration_status, "
+                "purpose_of_registration_code, record FROM entities "
+                f"WHERE {column} IN ({','.join('?' * len(identifiers))}) "
+                "ORDER BY uei_sam, entity_eft_indicator",
+                sorted(identifiers),
+            )
+            .fetchall()
+        )
+        found = {row[0] if column == "uei_sam" else row[1] for row in rows}
+        if found != identifiers:
+            return None
+
+        include_sections = set(search_parameters.get("includeSections", ()))
+        eft_indicator, registration_status, purposes = filters
+        entities = []
+        for _, _, row_eft, row_status, row_purpose, record in rows:
+            if eft_indicator is not None and row_eft != eft_indicator:
+                continue
+            if registration_status is not None and row_status != registration_status:
+                continue
+            if purposes is not None and row_purpose not in purposes:
+                continue
+            entity = json.loads(record)
+            if not include_sections.issubset(entity):
+                return None
+            entities.append(entity)
+
+        try:
+            page = int(search_parameters.get("page", 0))
+            size = int(search_parameters.get("size", _DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return None
+        return {
+            "totalRecords": len(entities),
+            "entityData": entities[page * size : (page + 1) * size],
+        }
+
+    def search_names(self, business_name, limit):
+        """UEIs of the entities whose legal business name or DBA name matches a name search,
+        best match first.
+
+        The search is cleaned like the SAM wildcard query (forbidden characters, commas, LLC and
+        trailing periods removed). Words of three or more characters match word prefixes,
+        shorter words and quoted phrases match whole words. Names are then matched on any three
+        characters of each word to fill up the results, so "soft" also finds "Microsoft".
+        Matches are ranked with bm25, legal business names above DBA names.
+
+        Args:
+            business_name (str): the user's search input
+            limit (int): the most UEIs returned
+
+        Returns:
+            list: UEIs, at most limit. Empty if the index was created without name_search.
+        """
+        if not self.name_search:
+            return []
+        prefix_query, trigram_query = _get_name_queries(business_name)
+        ueis = []
+        for table, query in (
+            ("entity_names", prefix_query),
+            ("entity_names_trigram", trigram_query),
+        ):
+            if query is None or len(ueis) >= limit:
+                continue
+            rows = (
+                self._read_connections.get()
+                .execute(
+                    f"SELECT entities.uei_sam FROM {table} "
+                    f"JOIN entities ON entities.id = {table}.rowid "
+                    f"WHERE {table} MATCH ? "
+                    f"ORDER BY bm25({table}, ?, ?) LIMIT ?",
+                    (query, *_NAME_RANK_WEIGHTS, limit * 2),
+                )
+                .fetchall()
+            )
+            for (uei_sam,) in rows:
+                if uei_sam not in ueis:
+                    ueis.append(uei_sam)
+        return ueis[:limit]
+
+    def get_entity_keys(self, ueis):
+        """The entities indexed under each UEI, parent first and then children
+
+        Args:
+            ueis (list): UEIs
+
+        Returns:
+            list: (ueiSAM, entityEFTIndicator) in the order of ueis
+        """
+        rows = self._read_connections.get().execute(
+            "SELECT uei_sam, entity_eft_indicator FROM entities "
+            f"WHERE uei_sam IN ({','.join('?' * len(ueis))})",
+            list(ueis),
+        )
+        entity_keys = {uei_sam: [] for uei_sam in ueis}
+        for uei_sam, eft_indicator in sorted(rows):
+            entity_keys[uei_sam].append((uei_sam, eft_indicator))
+        return [key for uei_sam in ueis for key in entity_keys[uei_sam]]
+
+    def iter_entities(self, parents_only=False):
+        """Every record in the index, read from one snapshot in UEI order
+
+        Args:
+            parents_only (bool, optional): skip child entities (with an entityEFTIndicator)
+
+        Yields:
+            dict: SAM entity records
+        """
+        connection = sqlite_store.connect(self.database_path)
+        try:
+            rows = connection.execute(
+                "SELECT record FROM entities "
+                + ("WHERE entity_eft_indicator = '' " if parents_only else "")
+                + "ORDER BY uei_sam, entity_eft_indicator"
+            )
+            for (record,) in rows:
+                yield json.loads(record)
+        finally:
+            connection.close()
+
+    def stats(self):
+        """Index contents and lookup counters for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        metadata = dict(
+            self._read_connections.get()
+            .execute("SELECT name, value FROM index_metadata")
+            .fetchall()
+        )
+        return {
+            "entities": int(metadata.get("entityCount", 0)),
+            "source": metadata.get("source"),
+            "loadedAt": metadata.get("loadedAt"),
+            "highWaterMark": metadata.get("highWaterMark"),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _write(self, update):
+        """Run update(connection) in one write transaction and return its result"""
+        with sqlite_store.transaction(self.database_path) as connection:
+            return update(connection)
+
+    @staticmethod
+    def _upsert(connection, entity):
+        registration = entity.get("entityRegistration") or {}
+        uei_sam = registration.get("ueiSAM")
+        if not uei_sam:
+            return 0
+        connection.execute(
+            "INSERT INTO entities (uei_sam, entity_eft_indicator, cage_code, "
+            "legal_business_name, dba_name, registration_status, "
+            "purpose_of_registration_code, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (uei_sam, entity_eft_indicator) DO UPDATE SET "
+            "cage_code = excluded.cage_code, "
+            "legal_business_name = excluded.legal_business_name, "
+            "dba_name = excluded.dba_name, "
+            "registration_status = excluded.registration_status, "
+            "purpose_of_registration_code = excluded.purpose_of_registration_code, "
+            "record = excluded.record",
+            (
+                uei_sam.upper(),
+                registration.get("entityEFTIndicator") or "",
+                (registration.get("cageCode") or "").upper() or None,
+                registration.get("legalBusinessName"),
+                registration.get("dbaName"),
+                registration.get("registrationStatus"),
+                registration.get("purposeOfRegistrationCode"),
+                json.dumps(entity, separators=(",", ":")),
+            ),
+        )
+        return 1
+
+    @staticmethod
+    def _delete(connection, entity):
+        registration = entity.get("entityRegistration") or {}
+        uei_sam = registration.get("ueiSAM")
+        if not uei_sam:
+            return 0
+        return connection.execute(
+            "DELETE FROM entities WHERE uei_sam = ? AND entity_eft_indicator = ?",
+            (uei_sam.upper(), registration.get("entityEFTIndicator") or ""),
+        ).rowcount
+
+    @staticmethod
+    def _set_metadata(connection, source, as_of):
+        (count,) = connection.execute("SELECT COUNT(*) FROM entities").fetchone()
+        values = {
+            "entityCount": count,
+            "source": source,
+            "loadedAt": sqlite_store.format_time(time.time()),
+        }
+        if as_of is not None:
+            values["highWaterMark"] = as_of
+        connection.executemany(
+            "INSERT OR REPLACE INTO index_metadata VALUES (?, ?)",
+            [(name, str(value)) for name, value in values.items()],
+        )
+
+
+def _get_extract_code(entity):
+    extract_code = entity.get("samExtractCode")
+    if extract_code is None:
+        extract_code = (entity.get("entityRegistration") or {}).get("samExtractCode")
+    return None if extract_code is None else str(extract_code)
+
+
+def _get_name_queries(business_name):
+    """FTS5 queries of a name search: (word prefix query, trigram query or None)"""
+    prefix_terms = []
+    trigram_terms = []
+    for word in _split_and_preserve_quotes(
+        _get_cleaned_and_prepared_business_name(business_name)
+    ):
+        is_prefix = word.endswith("*")
+        word = word.rstrip("*").strip('"')
+        if not word:
+            continue
+        quoted = '"{}"'.format(word.replace('"', '""'))
+        prefix_terms.append(f"{quoted}*" if is_prefix else quoted)
+        if len(word) >= 3:
+            trigram_terms.append(quoted)
+    if not prefix_terms:
+        return None, None
+    return " ".join(prefix_terms), " ".join(trigram_terms) or None
+
+
+def _split_values(value):
+    """ueiSAM and cageCode accept one value or several as [A~B~C]"""
+    value = str(value).strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [part.strip() for part in value[1:-1].split("~") if part.strip()]
+    return [value] if value else []
+
+
+def _get_filters(search_parameters):
+    """(entityEFTIndicator, registrationStatus, purposeOfRegistrationCode set), None for
+    filters that are absent, or None if a filter value cannot be answered locally"""
+    eft_indicator = search_parameters.get("entityEFTIndicator")
+    registration_status = search_parameters.get("registrationStatus")
+    if registration_status is not None:
+        registration_status = _REGISTRATION_STATUSES.get(registration_status.upper())
+        if registration_status is None:
+            return None
+    purposes = search_parameters.get("purposeOfRegistrationCode")
+    if purposes is not None:
+        purposes = {purpose.upper() for purpose in _split_values(f"[{purposes}]")}
+    return eft_indicator, registration_status, purposes
+
+
+def init_app(app):
+    """Attach the local entity index. The database defaults to instance/entity_index.sqlite3.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    database_path = app.config["SAM_ENTITY_INDEX_DATABASE"]
+    if database_path is None:
+        os.makedirs(app.instance_path, exist_ok=True)
+        database_path = os.path.join(app.instance_path, "entity_index.sqlite3")
+    app.extensions[_EXTENSION_NAME] = EntityIndex(
+        database_path, name_search=app.config["SAM_ENTITY_INDEX_NAME_SEARCH"]
+    )
+
+
+def get_entity_index():
+    """The local entity index of the current application
+
+    Returns:
+        EntityIndex: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
@@ -19,11 +19,50 @@ This is the main module that performs the calls to the SAM Entities API and retu
  compliance information
 """
 
+import copy
+
 import requests
 from flask import current_app
 
 from samtools.compliance import compliance_rules
-from samtools.sam_api.search_preprocessor import get_search_parameter
+from samtools.sam_api.circuit_breaker import (
+    CLOSED,
+    CircuitOpenError,
+    get_circuit_breaker,
+)
+from samtools.sam_api.compliance_history import get_compliance_history
+from samtools.sam_api.entity_cache import get_entity_cache
+from samtools.sam_api.entity_index import get_entity_index
+from samtools.sam_api.prefetch import get_prefetcher
+from samtools.sam_api.quota import (
+    QuotaExceededError,
+    acquire_sam_quota,
+    get_quota_scheduler,
+)
+from samtools.sam_api.response_cache import (
+    get_background_refresher,
+    CachedResponse,
+    get_response_cache,
+    make_cache_key,
+)
+from samtools.sam_api.search_preprocessor import get_business_name, get_search_parameter
+from samtools.sam_api.session import get_sam_session, get_sam_timeout
+from samtools.sam_api.single_flight import get_single_flight
+from samtools.sam_api.streaming import EntityDataDecoder
+
+SAM_ENTITIES_API_ENDPOINT = "https://api.sam.gov/entity-information/v3/entities"
+SAM_ENTITIES_API_PAGE_SIZE = 10
+SAM_RESPONSE_CHUNK_SIZE = 64 * 1024
+# repsAndCerts is trimmed to the Section 889 FAR responses
+ADAPTED_FAR_PROVISIONS = frozenset(["FAR 52.204-24", "FAR 52.204-25", "FAR 52.204-26"])
+# A business name search is resolved locally only when it has no other SAM filters
+_NAME_SEARCH_PARAMETERS = frozenset(["q", "includeSections", "page", "size", "api_key"])
+SAM_ERROR_MESSAGE = (
+    "SAM Entities API services cannot be accessed right now. Please try again later. "
+    "This occurs when the SAM Entities API returns an error, is down for maintenance, "
+    "or cannot be reached."
+)
+SAM_QUOTA_ERROR_MESSAGE = "The SAM Tool has reached its SAM Entities API request limit. Please try again later."
 
 
 def search_sam_v3(search_args, host_url):
@@ -39,27 +78,409 @@ def search_sam_v3(search_args, host_url):
     Returns:
         dict: Contains the response data, otherwise returns the error messages
     """
-    sam_api_endpoint = "https://api.sam.gov/entity-information/v3/entities"
-    return _search_sam(search_args, host_url, sam_api_endpoint)
+    search_sam_response = _search_sam(search_args, host_url, SAM_ENTITIES_API_ENDPOINT)
+    _prefetch_next_page(
+        search_args, host_url, SAM_ENTITIES_API_ENDPOINT, search_sam_response
+    )
+    return search_sam_response
+
+
+def find_cached_entity(search_args):
+    """Look up the single entity a search would return in the recent entity store, without
+    calling the SAM Entities API. Only ueiSAM (with entityEFTIndicator) and cageCode searches
+    can be answered. Searches with samToolsNoCache or their own API key always go to SAM.
+
+    Args:
+        search_args (dict): Sam Tools url search parameters
+
+    Returns:
+        dict: the entity including samToolsData, or None if it is not cached or too old
+    """
+    entity_cache = get_entity_cache()
+    if entity_cache is None or _is_cache_bypassed(search_args):
+        return None
+    search_parameters = DataAdaptors().adapt_samtools_to_sam_parameters(search_args)
+    if "api_key" in search_parameters:
+        return None
+    return entity_cache.find(search_parameters)
 
 
 def _search_sam(search_args, host_url, sam_api_endpoint):
     data_adaptors = DataAdaptors()
     search_parameters = data_adaptors.adapt_samtools_to_sam_parameters(search_args)
-    sam_response = _call_post_sam_entities_api(sam_api_endpoint, search_parameters)
-    sam_response_data = sam_response.json()
-    current_app.logger.info(sam_response.url)
-    current_app.logger.info(sam_response.request.body)
 
-    if not sam_response.ok:
-        sam_error_message = (
-            "SAM Entities API services cannot be accessed right now. Please try again later. "
-            "This occurs when the SAM Entities API returns an error, is down for maintenance, "
-            "or cannot be reached."
+    cached_response, stale_response = _get_cached_search_response(
+        search_args, search_parameters, host_url, sam_api_endpoint
+    )
+    if cached_response is not None:
+        return cached_response
+    ranked_entities = _search_local_entity_names(search_args, search_parameters)
+    if ranked_entities is not None:
+        search_sam_response = _search_ranked_entities(
+            search_args, ranked_entities, host_url, sam_api_endpoint
+        )
+        if "samToolsData" not in search_sam_response:
+            search_sam_response = _cache_search_response(
+                search_parameters, host_url, search_sam_response
+            )
+        return search_sam_response
+    local_response = _search_local_entity_index(
+        search_args, search_parameters, host_url, data_adaptors
+    )
+    if local_response is not None:
+        return local_response
+
+    try:
+        search_sam_response = _request_sam_entities(
+            search_parameters, host_url, sam_api_endpoint, data_adaptors
+        )
+    except requests.RequestException as exception:
+        if stale_response is None:
+            raise
+        current_app.logger.error(exception)
+        return stale_response
+    if not search_sam_response["success"] and stale_response is not None:
+        return stale_response
+
+    return _cache_search_response(search_parameters, host_url, search_sam_response)
+
+
+def _get_cached_search_response(
+    search_args, search_parameters, host_url, sam_api_endpoint
+):
+    """Look the search up in the response cache.
+
+    A response past its time-to-live but within SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE seconds
+    is served right away while a background refresh fetches a new copy. An older one, within
+    SAM_RESPONSE_CACHE_STALE_IF_ERROR seconds, is only served if the call to SAM fails.
+
+    Returns:
+        tuple: (response to serve now or None, stale response to serve if SAM fails or None)
+    """
+    response_cache = get_response_cache()
+    if response_cache is None or _is_cache_bypassed(search_args):
+        return None, None
+    cache_key = make_cache_key(search_parameters, host_url)
+    cached_response, age = response_cache.get_with_age(cache_key)
+    if cached_response is None:
+        return _take_prefetched_response(cache_key, response_cache), None
+    if age <= response_cache.ttl:
+        return cached_response, None
+
+    config = current_app.config
+    staleness = age - response_cache.ttl
+    if staleness <= config["SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE"]:
+        _refresh_search_response_in_background(
+            cache_key, search_parameters, host_url, sam_api_endpoint
+        )
+        return _mark_stale(cached_response, age), None
+    if staleness <= config["SAM_RESPONSE_CACHE_STALE_IF_ERROR"]:
+        return None, _mark_stale(cached_response, age)
+    return None, None
+
+
+def _search_local_entity_index(search_args, search_parameters, host_url, data_adaptors):
+    """Answer ueiSAM and cageCode searches from the local entity index when
+    SAM_ENTITY_INDEX_LOCAL_FIRST is set. Searches the index cannot answer completely, and
+    searches with samToolsNoCache, go to the SAM Entities API.
+
+    Returns:
+        dict: the search response, or None
+    """
+    entity_index = get_entity_index()
+    if (
+        entity_index is None
+        or not current_app.config["SAM_ENTITY_INDEX_LOCAL_FIRST"]
+        or _is_cache_bypassed(search_args)
+    ):
+        return None
+    sam_response_data = entity_index.find(search_parameters)
+    if sam_response_data is None:
+        return None
+    return _adapt_sam_entities(
+        sam_response_data, search_parameters, host_url, data_adaptors
+    )
+
+
+def _search_local_entity_names(search_args, search_parameters):
+    """Resolve a business name search to entities with the local name index when
+    SAM_ENTITY_INDEX_NAME_SEARCH is set, instead of a wildcard query to SAM. Searches with other
+    SAM filters, and names the index has no match for, are left to SAM.
+
+    Returns:
+        list: (ueiSAM, entityEFTIndicator) of the entities of up to
+            SAM_ENTITY_INDEX_NAME_SEARCH_LIMIT UEIs, best match first, or None
+    """
+    entity_index = get_entity_index()
+    if (
+        entity_index is None
+        or not current_app.config["SAM_ENTITY_INDEX_NAME_SEARCH"]
+        or not set(search_parameters).issubset(_NAME_SEARCH_PARAMETERS)
+    ):
+        return None
+    business_name = get_business_name(search_args.get("samToolsSearch"))
+    if business_name is None:
+        return None
+    ranked_ueis = entity_index.search_names(
+        business_name, current_app.config["SAM_ENTITY_INDEX_NAME_SEARCH_LIMIT"]
+    )
+    if not ranked_ueis:
+        return None
+    return entity_index.get_entity_keys(ranked_ueis) or None
+
+
+def _search_ranked_entities(search_args, ranked_entities, host_url, sam_api_endpoint):
+    name_search_page = _NameSearchPage(search_args, ranked_entities)
+    page_search_args = name_search_page.get_next_search_args()
+    while page_search_args is not None:
+        name_search_page.add(_search_sam(page_search_args, host_url, sam_api_endpoint))
+        page_search_args = name_search_page.get_next_search_args()
+    return name_search_page.get_response()
+
+
+class _NameSearchPage:
+    """One page of a local name search.
+
+    Pages are cut from the ranked entities, children included, so a page never holds more than
+    size entities. Their records are fetched from SAM by UEI, over more than one SAM page when
+    the UEIs have more entities than a SAM page holds, and returned in rank order.
+    """
+
+    def __init__(self, search_args, ranked_entities):
+        try:
+            page = int(search_args.get("page", 0))
+            size = int(search_args.get("size", SAM_ENTITIES_API_PAGE_SIZE))
+        except ValueError:
+            page, size = 0, SAM_ENTITIES_API_PAGE_SIZE
+        self._search_args = search_args
+        self._total_records = len(ranked_entities)
+        self._entity_keys = ranked_entities[page * size : (page + 1) * size]
+        self._ueis = list(dict.fromkeys(uei_sam for uei_sam, _ in self._entity_keys))
+        self._entities = {}
+        self._sam_page = 0
+        self._sam_total_records = None
+        self._error_response = None
+        self._sam_tools_data = None
+
+    def get_next_search_args(self):
+        """Search args of the next SAM page to fetch, or None when the page is complete"""
+        if not self._ueis or self._error_response is not None:
+            return None
+        if self._sam_total_records is not None and (
+            self._entities.keys() >= set(self._entity_keys)
+            or self._sam_page * SAM_ENTITIES_API_PAGE_SIZE >= self._sam_total_records
+        ):
+            return None
+        page_search_args = {
+            key: value
+            for key, value in dict(self._search_args).items()
+            if key not in ("samToolsSearch", "page", "size")
+        }
+        page_search_args["ueiSAM"] = (
+            self._ueis[0] if len(self._ueis) == 1 else f"[{'~'.join(self._ueis)}]"
+        )
+        page_search_args["size"] = str(SAM_ENTITIES_API_PAGE_SIZE)
+        if self._sam_page:
+            page_search_args["page"] = str(self._sam_page)
+        return page_search_args
+
+    def add(self, search_sam_response):
+        """Keep the entities of a SAM page returned for get_next_search_args"""
+        self._sam_page += 1
+        if not search_sam_response["success"]:
+            self._error_response = search_sam_response
+            return
+        self._sam_total_records = search_sam_response["totalRecords"]
+        self._sam_tools_data = (
+            search_sam_response.get("samToolsData") or self._sam_tools_data
+        )
+        for entity in search_sam_response["entityData"]:
+            registration = entity["entityRegistration"]
+            entity_key = (
+                registration["ueiSAM"],
+                registration.get("entityEFTIndicator") or "",
+            )
+            self._entities.setdefault(entity_key, entity)
+
+    def get_response(self):
+        """The search response of the page, with totalRecords counting every ranked entity"""
+        if self._error_response is not None:
+            return self._error_response
+        search_sam_response = {
+            "entityData": [
+                self._entities[entity_key]
+                for entity_key in self._entity_keys
+                if entity_key in self._entities
+            ],
+            "totalRecords": self._total_records,
+            "success": True,
+        }
+        if self._sam_tools_data is not None:
+            search_sam_response["samToolsData"] = self._sam_tools_data
+        return search_sam_response
+
+
+def _mark_stale(search_sam_response, age):
+    return {**search_sam_response, "samToolsData": {"isStale": True, "age": int(age)}}
+
+
+def _refresh_search_response_in_background(
+    cache_key, search_parameters, host_url, sam_api_endpoint
+):
+    background_refresher = get_background_refresher()
+    if background_refresher is None:
+        return
+    app = current_app._get_current_object()
+    search_parameters = copy.deepcopy(search_parameters)
+
+    def refresh():
+        with app.app_context():
+            try:
+                search_sam_response = _request_sam_entities(
+                    search_parameters, host_url, sam_api_endpoint, DataAdaptors()
+                )
+            except Exception as exception:
+                app.logger.error(exception)
+                raise
+            _cache_search_response(search_parameters, host_url, search_sam_response)
+
+    background_refresher.submit(cache_key, refresh)
+
+
+def _cache_search_response(search_parameters, host_url, search_sam_response):
+    """Store a successful search response in the response cache
+
+    Returns:
+        dict: the cached response, or search_sam_response if it was not cached
+    """
+    response_cache = get_response_cache()
+    if response_cache is None or not search_sam_response["success"]:
+        return search_sam_response
+    cached_response = CachedResponse(search_sam_response)
+    response_cache.set(make_cache_key(search_parameters, host_url), cached_response)
+    return cached_response
+
+
+def _take_prefetched_response(cache_key, response_cache):
+    prefetcher = get_prefetcher()
+    if prefetcher is None:
+        return None
+    prefetched_response = prefetcher.take(cache_key)
+    if prefetched_response is not None:
+        prefetched_response = CachedResponse(prefetched_response)
+        response_cache.set(cache_key, prefetched_response)
+    return prefetched_response
+
+
+def _prefetch_next_page(search_args, host_url, sam_api_endpoint, search_sam_response):
+    """Fetch the next page of a successful search into the prefetcher if more results exist,
+    SAM is healthy and more than SAM_PREFETCH_QUOTA_RESERVE calls are left in today's quota
+    """
+    prefetcher = get_prefetcher()
+    response_cache = get_response_cache()
+    if prefetcher is None or response_cache is None:
+        return
+    if not search_sam_response["success"] or _is_cache_bypassed(search_args):
+        return
+    next_page_args = _get_next_page_args(
+        search_args, search_sam_response["totalRecords"]
+    )
+    if next_page_args is None or not _has_prefetch_budget():
+        return
+
+    data_adaptors = DataAdaptors()
+    search_parameters = data_adaptors.adapt_samtools_to_sam_parameters(next_page_args)
+    cache_key = make_cache_key(search_parameters, host_url)
+    if cache_key in response_cache:
+        return
+    app = current_app._get_current_object()
+
+    def prefetch():
+        with app.app_context():
+            if not _has_prefetch_budget():
+                return None
+            next_page_response = _fetch_next_page(
+                next_page_args,
+                search_parameters,
+                host_url,
+                sam_api_endpoint,
+                data_adaptors,
+            )
+            if (
+                not next_page_response["success"]
+                or "samToolsData" in next_page_response
+            ):
+                return None
+            return next_page_response
+
+    prefetcher.submit(cache_key, prefetch)
+
+
+def _fetch_next_page(
+    next_page_args, search_parameters, host_url, sam_api_endpoint, data_adaptors
+):
+    """Fetch a page the way _search_sam would on a cache miss, so that the prefetched response
+    matches what the search would have returned"""
+    ranked_entities = _search_local_entity_names(next_page_args, search_parameters)
+    if ranked_entities is not None:
+        return _search_ranked_entities(
+            next_page_args, ranked_entities, host_url, sam_api_endpoint
+        )
+    return _request_sam_entities(
+        search_parameters, host_url, sam_api_endpoint, data_adaptors
+    )
+
+
+def _get_next_page_args(search_args, total_records):
+    try:
+        page = int(search_args.get("page", 0))
+        size = int(search_args.get("size", SAM_ENTITIES_API_PAGE_SIZE))
+    except ValueError:
+        return None
+    if (page + 1) * size >= total_records:
+        return None
+    return {**dict(search_args), "page": str(page + 1)}
+
+
+def _has_prefetch_budget():
+    circuit_breaker = get_circuit_breaker()
+    if circuit_breaker is not None and circuit_breaker.state != CLOSED:
+        return False
+    quota_scheduler = get_quota_scheduler()
+    return (
+        quota_scheduler is None
+        or quota_scheduler.remaining_today()
+        > current_app.config["SAM_PREFETCH_QUOTA_RESERVE"]
+    )
+
+
+def _is_cache_bypassed(search_args):
+    return str(search_args.get("samToolsNoCache", "false")).lower() in ("1", "true", "")
+
+
+def _request_sam_entities(search_parameters, host_url, sam_api_endpoint, data_adaptors):
+    try:
+        sam_response_ok, sam_response_data = _get_sam_entities_data(
+            sam_api_endpoint, search_parameters
         )
-        current_app.logger.error(sam_response.json())
-        return {"success": False, "errors": [f"{sam_error_message}"]}
+    except QuotaExceededError as exception:
+        current_app.logger.error(exception)
+        return {"success": False, "errors": [f"{SAM_QUOTA_ERROR_MESSAGE}"]}
+    except CircuitOpenError as exception:
+        current_app.logger.error(exception)
+        return {"success": False, "errors": [f"{SAM_ERROR_MESSAGE}"]}
+
+    if not sam_response_ok:
+        return {"success": False, "errors": [f"{SAM_ERROR_MESSAGE}"]}
+
+    return _adapt_sam_entities(
+        sam_response_data, search_parameters, host_url, data_adaptors
+    )
+
 
+def _adapt_sam_entities(sam_response_data, search_parameters, host_url, data_adaptors):
+    # Entities fetched with a caller's own API key are not served to searches made with another
+    entity_cache = None if "api_key" in search_parameters else get_entity_cache()
     entities = []
     for entity in sam_response_data.get("entityData"):
         eight_eight_nine = data_adaptors.adapt_sam_response_to_889_compliance(entity)
@@ -67,6 +488,7 @@ def _search_sam(search_args, host_url, sam_api_endpoint):
         registration_status = data_adaptors.adapt_sam_response_to_registration_status(
             entity
         )
+        far = eight_eight_nine.far
         entity = {
             **entity,
             **{
@@ -87,12 +509,8 @@ def _search_sam(search_args, host_url, sam_api_endpoint):
                         "elaboratedStatusText": eight_eight_nine.elaborated_status_text,
                         "farProvisionDate": eight_eight_nine.far_provision_date,
                         "farText": {
-                            "52.204-26.c.1": eight_eight_nine.far["52.204-26.c.1"][
-                                "text"
-                            ],
-                            "52.204-26.c.2": eight_eight_nine.far["52.204-26.c.2"][
-                                "text"
-                            ],
+                            "52.204-26.c.1": far["52.204-26.c.1"]["text"],
+                            "52.204-26.c.2": far["52.204-26.c.2"]["text"],
                         },
                     },
                     "exclusions": {
@@ -107,6 +525,9 @@ def _search_sam(search_args, host_url, sam_api_endpoint):
             },
         }
 
+        if entity_cache is not None:
+            entity_cache.add(entity)
+
         entities.append(
             {
                 section: entity[section]
@@ -116,6 +537,10 @@ def _search_sam(search_args, host_url, sam_api_endpoint):
             }
         )
 
+    compliance_history = get_compliance_history()
+    if compliance_history is not None:
+        compliance_history.record_safely(entities)
+
     search_sam_response = {
         "entityData": entities,
         "totalRecords": sam_response_data["totalRecords"],
@@ -124,6 +549,108 @@ def _search_sam(search_args, host_url, sam_api_endpoint):
     return search_sam_response
 
 
+def _get_sam_entities_data(sam_api_endpoint, search_parameters):
+    """Call the SAM Entities API, sharing the call with any identical call already in flight.
+
+    Returns:
+        tuple: (ok, parsed response data)
+    """
+    single_flight = get_single_flight()
+    if single_flight is None:
+        return _call_and_parse_sam_entities_api(sam_api_endpoint, search_parameters)
+    key = make_cache_key(search_parameters, sam_api_endpoint)
+    return single_flight.do(
+        key,
+        lambda: _call_and_parse_sam_entities_api(sam_api_endpoint, search_parameters),
+    )
+
+
+def _call_and_parse_sam_entities_api(sam_api_endpoint, search_parameters):
+    circuit_breaker = get_circuit_breaker()
+    if circuit_breaker is None:
+        sam_response, sam_response_data = _call_and_read_sam_entities_api(
+            sam_api_endpoint, search_parameters
+        )
+    else:
+        sam_response, sam_response_data = circuit_breaker.call(
+            lambda: _call_and_read_sam_entities_api(
+                sam_api_endpoint, search_parameters
+            ),
+            is_failure=lambda result: _is_sam_outage(result[0]),
+        )
+    current_app.logger.info(sam_response.url)
+    current_app.logger.info(sam_response.request.body)
+    if not sam_response.ok:
+        current_app.logger.error(sam_response_data)
+    return sam_response.ok, sam_response_data
+
+
+def _call_and_read_sam_entities_api(sam_api_endpoint, search_parameters):
+    sam_response = _call_post_sam_entities_api(sam_api_endpoint, search_parameters)
+    try:
+        if not sam_response.ok:
+            return sam_response, sam_response.json()
+        return sam_response, _read_sam_entities_data(
+            sam_response.iter_content(chunk_size=SAM_RESPONSE_CHUNK_SIZE),
+            transform=get_entity_transform(),
+        )
+    finally:
+        sam_response.close()
+
+
+def _read_sam_entities_data(chunks, transform=None):
+    """Decode a successful SAM Entities API response body one entity at a time
+
+    Args:
+        chunks (iterable): the response body as bytes
+        transform (callable, optional): applied to each entity, see get_entity_transform
+
+    Returns:
+        dict: the response data
+    """
+    decoder = EntityDataDecoder(transform=transform)
+    entities = []
+    for chunk in chunks:
+        entities.extend(decoder.feed(chunk))
+    entities.extend(decoder.close())
+    return {**decoder.fields, "entityData": entities}
+
+
+def get_entity_transform():
+    """The transform applied to each decoded entity: _trim_sam_entity, which keeps only the
+    parts of repsAndCerts that DataAdaptors reads, when SAM_TRIM_REPS_AND_CERTS is set
+
+    Returns:
+        callable: or None to keep the entities as SAM returned them
+    """
+    if current_app.config["SAM_TRIM_REPS_AND_CERTS"]:
+        return _trim_sam_entity
+    return None
+
+
+def _trim_sam_entity(entity):
+    if "repsAndCerts" not in entity:
+        return entity
+    far_responses = DataAdaptors._get_far_responses(  # pylint: disable=protected-access
+        entity
+    )
+    entity["repsAndCerts"] = {}
+    if far_responses is not None:
+        entity["repsAndCerts"]["certifications"] = {
+            "fARResponses": [
+                far_response
+                for far_response in far_responses
+                if far_response.get("provisionId") in ADAPTED_FAR_PROVISIONS
+            ]
+        }
+    return entity
+
+
+def _is_sam_outage(sam_response):
+    """Client errors (4xx) are caused by the search, not by SAM being unavailable"""
+    return not sam_response.ok and sam_response.status_code >= 500
+
+
 def _call_post_sam_entities_api(sam_api_endpoint, search_parameters):
     """
     Users must have a Federal System Account with the “Read FOUO” permission and the respective API
@@ -141,20 +668,37 @@ def _call_post_sam_entities_api(sam_api_endpoint, search_parameters):
     The "Content-Type" parameter must be sent as "application/json" under "Headers".
     All the optional search filters can be sent in the request URL or in the "Body".
     """
+    # A copy, as the caller's parameters, api_key included, also key the response cache
+    search_parameters = dict(search_parameters)
+    _acquire_quota_if_default_api_key(search_parameters)
     header = {
         "X-api-key": _get_api_key_if_none_provided(search_parameters),
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
     search_parameters.pop("api_key", None)
-    return requests.post(
-        sam_api_endpoint, headers=header, params=search_parameters, timeout=20
+    return get_sam_session().post(
+        sam_api_endpoint,
+        headers=header,
+        params=search_parameters,
+        timeout=get_sam_timeout(),
+        stream=True,
     )
 
 
 def _call_get_sam_entities_api(sam_api_endpoint, search_parameters):
+    search_parameters = dict(search_parameters)
+    _acquire_quota_if_default_api_key(search_parameters)
     search_parameters["api_key"] = _get_api_key_if_none_provided(search_parameters)
-    return requests.get(sam_api_endpoint, search_parameters, timeout=20)
+    return get_sam_session().get(
+        sam_api_endpoint, params=search_parameters, timeout=get_sam_timeout()
+    )
+
+
+def _acquire_quota_if_default_api_key(search_parameters):
+    """Only calls made with the tool's own SAM_API_KEY count against its quota"""
+    if "api_key" not in search_parameters:
+        acquire_sam_quota()
 
 
 def _get_api_key_if_none_provided(search_args):
@@ -183,6 +727,8 @@ class DataAdaptors:
             samtools_sections
         )
 
+        sam_parameters.pop("samToolsNoCache", None)
+
         samtools_search = sam_parameters.pop("samToolsSearch", "")
         sam_parameters.update(get_search_parameter(samtools_search))
 
@@ -211,23 +757,43 @@ class DataAdaptors:
         Returns:
             EightEightNine: EightEightNine compliance object
         """
-        compliance = compliance_rules.EightEightNine()
-
-        far_responses = self._get_far_responses(entity)
-        if far_responses is None:
-            return compliance
-
-        far52_204_26 = self._get_far_52_204_26(far_responses)
+        far_index = self.index_far_responses(entity)
+        if far_index is None:
+            return compliance_rules.EightEightNine()
+        return compliance_rules.EightEightNine.from_far_index(far_index)
 
-        compliance.set_far(
-            "52.204-26.c.1", self._get_far_52_204_26_c_1_answer(far52_204_26)
-        )
+    @staticmethod
+    def index_far_responses(entity, provision_ids=ADAPTED_FAR_PROVISIONS):
+        """Index the answers of the FAR responses of an entity in a single pass over its
+        certifications. Later duplicates of a provision or section are ignored, as the first
+        match was always used.
 
-        compliance.set_far(
-            "52.204-26.c.2", self._get_far_52_204_26_c_2_answer(far52_204_26)
-        )
+        Args:
+            entity (dict): A single entity as returned by the SAM Entities API
+            provision_ids (set, optional): the provisions to index, or None for every provision.
+                Defaults to the Section 889 provisions, ADAPTED_FAR_PROVISIONS.
 
-        return compliance
+        Returns:
+            dict: {provisionId: {section: answerText}}, for example
+                {"FAR 52.204-26": {"52.204-26.c.1": "No", "52.204-26.c.2": "No"}}, or None if
+                the entity has no FAR responses
+        """
+        far_responses = DataAdaptors._get_far_responses(entity)
+        if far_responses is None:
+            return None
+        far_index = {}
+        for far_response in far_responses:
+            provision_id = far_response.get("provisionId")
+            if provision_id in far_index or (
+                provision_ids is not None and provision_id not in provision_ids
+            ):
+                continue
+            answers = far_index[provision_id] = {}
+            for answer in far_response.get("listOfAnswers") or ():
+                section = answer.get("section")
+                if section not in answers:
+                    answers[section] = answer.get("answerText")
+        return far_index
 
     @staticmethod
     def _get_far_responses(entity):
@@ -237,28 +803,6 @@ class DataAdaptors:
             return None
         return entity["repsAndCerts"]["certifications"].get("fARResponses", None)
 
-    @staticmethod
-    def _get_far_52_204_26(far_responses):
-        key = "provisionId"
-        value = "FAR 52.204-26"
-        return _get_dict_from_list_of_dicts(far_responses, key, value)
-
-    @staticmethod
-    def _get_far_52_204_26_c_1_answer(far52_204_26):
-        key = "section"
-        value = "52.204-26.c.1"
-        return _get_dict_from_list_of_dicts(far52_204_26["listOfAnswers"], key, value)[
-            "answerText"
-        ]
-
-    @staticmethod
-    def _get_far_52_204_26_c_2_answer(far52_204_26):
-        key = "section"
-        value = "52.204-26.c.2"
-        return _get_dict_from_list_of_dicts(far52_204_26["listOfAnswers"], key, value)[
-            "answerText"
-        ]
-
     @staticmethod
     def adapt_sam_response_to_exclusions(entity):
         """Convert SAM Entities API response to a SAM Tools Exclusions object.
@@ -295,10 +839,6 @@ class DataAdaptors:
 
 
 def _is_entity_selectable(is_compliant, has_exclusions, is_active):
-    if is_compliant and not has_exclusions and is_active:
-        return True
-    return False
-
-
-def _get_dict_from_list_of_dicts(list_of_dicts, key_name, value):
-    return next((dict_i for dict_i in list_of_dicts if dict_i[key_name] == value), None)
+    return compliance_rules.get_rules().is_selectable(
+        is_compliant, has_exclusions, is_active
+    )
@@ -0,0 +1,207 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Load SAM entity extract files into the local entity index.
+
+An extract is a JSON document in the SAM Entities API response format ({"entityData": [...]}),
+plain, gzipped or as the first file of a zip archive. It is read in chunks and decoded one entity
+at a time, so extracts larger than memory can be loaded.
+
+Daily delta files have the same format. Records with "samExtractCode": "1" are deletions. The
+date of an extract or delta is taken from the YYYYMMDD in its file name, as in
+SAM_PUBLIC_UTF-8_DAILY_V2_20221003.json.gz.
+
+Both commands then rebuild the compliance table from the updated index.
+
+Usage:
+    flask --app samtools ingest-entity-extract path/to/extract.json.gz
+    flask --app samtools apply-entity-deltas path/to/daily/*.json.gz
+    flask --app samtools build-compliance-table
+"""
+
+import datetime
+import gzip
+import os
+import re
+import time
+import zipfile
+
+import click
+from flask.cli import with_appcontext
+
+from samtools.sam_api.compliance_table import (
+    build_compliance_table,
+    get_compliance_table,
+)
+from samtools.sam_api.entity_index import get_entity_index
+from samtools.sam_api.entity_information import (
+    SAM_RESPONSE_CHUNK_SIZE,
+    get_entity_transform,
+)
+from samtools.sam_api.streaming import EntityDataDecoder
+
+_FILE_DATE = re.compile(r"(?<!\d)(\d{8})(?!\d)")
+
+
+def ingest_extract(entity_index, path, transform=None):
+    """Replace the contents of the entity index with the entities of an extract file
+
+    Args:
+        entity_index (EntityIndex): the index to load
+        path (str): a .json, .json.gz or .zip extract file
+        transform (callable, optional): applied to each entity, see get_entity_transform
+
+    Raises:
+        ValueError: if the file is not a complete SAM entity extract
+
+    Returns:
+        int: the number of entities loaded
+    """
+    return entity_index.replace_all(
+        read_extract_entities(path, transform),
+        source=os.path.basename(path),
+        as_of=get_extract_date(path),
+    )
+
+
+def apply_delta(entity_index, path, transform=None):
+    """Apply a daily delta file to the entity index
+
+    Args:
+        entity_index (EntityIndex): the index to update
+        path (str): a .json, .json.gz or .zip delta file with its date in the file name
+        transform (callable, optional): applied to each entity, see get_entity_transform
+
+    Raises:
+        ValueError: if the file name has no date, or the file is not a complete delta
+
+    Returns:
+        tuple: (records upserted, records deleted), or None if the index is already as recent
+    """
+    as_of = get_extract_date(path)
+    if as_of is None:
+        raise ValueError(f"{path} has no YYYYMMDD date in its name")
+    return entity_index.apply_delta(
+        read_extract_entities(path, transform),
+        source=os.path.basename(path),
+        as_of=as_of,
+    )
+
+
+def get_extract_date(path):
+    """The date in an extract or delta file name
+
+    Args:
+        path (str):
+
+    Returns:
+        str: YYYY-MM-DD, or None if the name has no valid YYYYMMDD date
+    """
+    for match in reversed(_FILE_DATE.findall(os.path.basename(path))):
+        try:
+            return datetime.datetime.strptime(match, "%Y%m%d").date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def read_extract_entities(path, transform=None):
+    """The entities of an extract file
+
+    Args:
+        path (str): a .json, .json.gz or .zip extract file
+        transform (callable, optional): applied to each entity, see get_entity_transform
+
+    Yields:
+        dict: SAM entity records
+    """
+    decoder = EntityDataDecoder(transform=transform)
+    with _open_extract(path) as extract_file:
+        for chunk in iter(lambda: extract_file.read(SAM_RESPONSE_CHUNK_SIZE), b""):
+            yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+def _open_extract(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        try:
+            return archive.open(archive.namelist()[0])
+        finally:
+            archive.close()
+    return open(path, "rb")
+
+
+@click.command("ingest-entity-extract")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@with_appcontext
+def ingest_entity_extract_command(path):
+    """Load a SAM entity extract file into the local entity index."""
+    start = time.perf_counter()
+    count = ingest_extract(get_entity_index(), path, get_entity_transform())
+    click.echo(
+        f"Loaded {count} entities from {os.path.basename(path)} "
+        f"in {time.perf_counter() - start:.1f} s"
+    )
+    _rebuild_compliance_table()
+
+
+@click.command("apply-entity-deltas")
+@click.argument(
+    "paths", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@with_appcontext
+def apply_entity_deltas_command(paths):
+    """Apply SAM daily delta files to the local entity index, oldest first."""
+    entity_index = get_entity_index()
+    for path in sorted(paths, key=lambda path: get_extract_date(path) or ""):
+        start = time.perf_counter()
+        result = apply_delta(entity_index, path, get_entity_transform())
+        elapsed = time.perf_counter() - start
+        if result is None:
+            click.echo(
+                f"Skipped {os.path.basename(path)}: the index is already at "
+                f"{entity_index.high_water_mark}"
+            )
+            continue
+        upserted, deleted = result
+        click.echo(
+            f"Applied {os.path.basename(path)}: {upserted} upserted, "
+            f"{deleted} deleted in {elapsed:.2f} s"
+        )
+    _rebuild_compliance_table()
+
+
+@click.command("build-compliance-table")
+@with_appcontext
+def build_compliance_table_command():
+    """Rebuild the compliance table from the local entity index."""
+    _rebuild_compliance_table()
+
+
+def _rebuild_compliance_table():
+    compliance_table = get_compliance_table()
+    if compliance_table is None:
+        return
+    start = time.perf_counter()
+    count = build_compliance_table(get_entity_index(), compliance_table.path)
+    click.echo(
+        f"Built the compliance table of {count} entities "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
@@ -0,0 +1,165 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Speculative prefetch of the next page of search results.
+
+The browser client asks for page N+1 only when the user clicks "show more". When page N is
+served and more results exist, page N+1 is fetched in the background and held for
+SAM_PREFETCH_WINDOW seconds. A prefetch that has not started within the window is cancelled,
+and a prefetched page that nobody asks for within the window is dropped.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app
+
+_EXTENSION_NAME = "samtools.prefetch"
+
+
+class Prefetcher:
+    """Runs prefetches on a small thread pool and holds their results for a short window"""
+
+    def __init__(self, window, max_workers, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="samtools-prefetch"
+        )
+        self._pending = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self.prefetched = 0
+        self.used = 0
+        self.unused = 0
+        self.cancelled = 0
+        self.failures = 0
+
+    def submit(self, key, function):
+        """Prefetch key in the background unless it is already pending or held
+
+        Args:
+            key (hashable): cache key of the prefetched response
+            function (callable): fetches the response, taking no arguments. It returns None when
+                there is nothing worth keeping.
+
+        Returns:
+            bool: True if a prefetch was started
+        """
+        with self._lock:
+            self._drop_expired()
+            if key in self._pending or key in self._results:
+                return False
+            self._pending[key] = self._executor.submit(
+                self._prefetch, key, function, self._clock()
+            )
+            return True
+
+    def take(self, key):
+        """Remove and return the prefetched response for key
+
+        Args:
+            key (hashable): cache key of the prefetched response
+
+        Returns:
+            object: the response, or None if it was not prefetched or is older than the window
+        """
+        with self._lock:
+            self._drop_expired()
+            entry = self._results.pop(key, None)
+            if entry is None:
+                return None
+            self.used += 1
+            return entry[1]
+
+    def wait(self, timeout=None):
+        """Wait for the pending prefetches to finish
+
+        Args:
+            timeout (float, optional): maximum number of seconds to wait
+        """
+        with self._lock:
+            pending = list(self._pending.values())
+        wait(pending, timeout=timeout)
+
+    def stats(self):
+        """Prefetch counters for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        with self._lock:
+            self._drop_expired()
+            return {
+                "prefetched": self.prefetched,
+                "used": self.used,
+                "unused": self.unused,
+                "cancelled": self.cancelled,
+                "failures": self.failures,
+                "pending": len(self._pending),
+                "held": len(self._results),
+            }
+
+    def _prefetch(self, key, function, submitted_at):
+        result = None
+        try:
+            if self._clock() - submitted_at > self.window:
+                with self._lock:
+                    self.cancelled += 1
+                return
+            result = function()
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+                if result is not None:
+                    self._results[key] = (self._clock(), result)
+                    self.prefetched += 1
+
+    def _drop_expired(self):
+        now = self._clock()
+        for key, (stored_at, _) in list(self._results.items()):
+            if now - stored_at > self.window:
+                del self._results[key]
+                self.unused += 1
+
+
+def init_app(app):
+    """Attach the prefetcher. It is disabled when SAM_PREFETCH_WINDOW is 0 or None.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    if not app.config["SAM_PREFETCH_WINDOW"]:
+        return
+    app.extensions[_EXTENSION_NAME] = Prefetcher(
+        window=app.config["SAM_PREFETCH_WINDOW"],
+        max_workers=app.config["SAM_PREFETCH_WORKERS"],
+    )
+
+
+def get_prefetcher():
+    """The next page prefetcher of the current application
+
+    Returns:
+        Prefetcher: or None if prefetching is disabled
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
@@ -0,0 +1,231 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Quota aware scheduler for calls made with the tool's SAM API key.
+
+SAM API keys have a daily request limit. Every call made with the configured key takes a token
+from a requests-per-second token bucket and counts against the daily budget. Callers wait (up
+to SAM_QUOTA_MAX_WAIT seconds) for a token when the rate is exceeded, and are shed with
+QuotaExceededError once the daily budget is spent or the wait would be too long.
+
+The bucket and the day's usage live in a small SQLite database so that they are shared by all
+gunicorn workers and survive restarts.
+"""
+
+import datetime
+import os
+import threading
+import time
+
+from flask import current_app
+
+from samtools.sam_api import sqlite_store
+
+_EXTENSION_NAME = "samtools.sam_quota"
+
+
+class QuotaExceededError(Exception):
+    """Raised when a SAM call cannot be scheduled within the configured quota"""
+
+
+class QuotaScheduler:
+    """Token bucket (requests per second) plus daily budget, persisted in SQLite"""
+
+    def __init__(
+        self,
+        database_path,
+        requests_per_second,
+        requests_per_day,
+        max_wait,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        if requests_per_second <= 0:
+            raise ValueError(
+                f"requests_per_second must be positive, not {requests_per_second}"
+            )
+        self.database_path = database_path
+        self.requests_per_second = requests_per_second
+        self.requests_per_day = requests_per_day
+        self.max_wait = max_wait
+        self._burst = max(1.0, float(requests_per_second))
+        self._clock = clock
+        self._sleep = sleep
+        self._read_connections = sqlite_store.ReadConnections(database_path)
+        self._counter_lock = threading.Lock()
+        self.scheduled = 0
+        self.waited = 0
+        self.shed = 0
+        # WAL mode lets the metrics endpoint read the usage while a worker takes a token
+        sqlite_store.create_schema(
+            self.database_path,
+            "CREATE TABLE IF NOT EXISTS sam_quota ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), "
+            "day TEXT NOT NULL, used INTEGER NOT NULL, "
+            "tokens REAL NOT NULL, refilled_at REAL NOT NULL)",
+        )
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO sam_quota VALUES (1, ?, 0, ?, ?)",
+                (self._today(), self._burst, self._clock()),
+            )
+
+    def acquire(self):
+        """Block until a SAM call may be made, then count it against the quota.
+
+        Raises:
+            QuotaExceededError: the daily budget is spent, or no token is available within
+                max_wait seconds
+        """
+        deadline = self._clock() + self.max_wait
+        has_waited = False
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                with self._counter_lock:
+                    self.scheduled += 1
+                    self.waited += has_waited
+                return
+            if self._clock() + wait > deadline:
+                self._count_shed()
+                raise QuotaExceededError(
+                    f"More than {self.requests_per_second} SAM requests per second"
+                )
+            has_waited = True
+            self._sleep(wait)
+
+    def _try_acquire(self):
+        """Take a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until the next token
+        """
+        with self._transaction() as connection:
+            day, used, tokens, refilled_at = connection.execute(
+                "SELECT day, used, tokens, refilled_at FROM sam_quota WHERE id = 1"
+            ).fetchone()
+            today = self._today()
+            if day != today:
+                day, used = today, 0
+            if used >= self.requests_per_day:
+                self._count_shed()
+                raise QuotaExceededError(
+                    f"Daily budget of {self.requests_per_day} SAM requests is spent"
+                )
+
+            now = self._clock()
+            elapsed = max(0.0, now - refilled_at)
+            tokens = min(self._burst, tokens + elapsed * self.requests_per_second)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+                used += 1
+            else:
+                wait = (1 - tokens) / self.requests_per_second
+            connection.execute(
+                "UPDATE sam_quota SET day = ?, used = ?, tokens = ?, refilled_at = ? "
+                "WHERE id = 1",
+                (day, used, tokens, now),
+            )
+            return wait
+
+    def remaining_today(self):
+        """Number of SAM calls left in today's budget
+
+        Returns:
+            int:
+        """
+        return max(0, self.requests_per_day - self._used_today())
+
+    def stats(self):
+        """Quota usage for the metrics endpoint
+
+        Returns:
+            dict: the day's usage and remaining budget, and scheduling counters
+        """
+        used = self._used_today()
+        return {
+            "requestsPerSecond": self.requests_per_second,
+            "requestsPerDay": self.requests_per_day,
+            "usedToday": used,
+            "remainingToday": max(0, self.requests_per_day - used),
+            "scheduled": self.scheduled,
+            "waited": self.waited,
+            "shed": self.shed,
+        }
+
+    def _used_today(self):
+        day, used = (
+            self._read_connections.get()
+            .execute("SELECT day, used FROM sam_quota WHERE id = 1")
+            .fetchone()
+        )
+        if day != self._today():
+            return 0
+        return used
+
+    def _count_shed(self):
+        with self._counter_lock:
+            self.shed += 1
+
+    def _today(self):
+        return datetime.datetime.fromtimestamp(
+            self._clock(), tz=datetime.timezone.utc
+        ).strftime("%Y-%m-%d")
+
+    def _transaction(self):
+        return sqlite_store.transaction(self.database_path, timeout=10)
+
+
+def init_app(app):
+    """Attach the quota scheduler. It is disabled when SAM_QUOTA_REQUESTS_PER_DAY is None.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    if app.config["SAM_QUOTA_REQUESTS_PER_DAY"] is None:
+        return
+    database_path = app.config["SAM_QUOTA_DATABASE"]
+    if database_path is None:
+        os.makedirs(app.instance_path, exist_ok=True)
+        database_path = os.path.join(app.instance_path, "sam_quota.sqlite3")
+    app.extensions[_EXTENSION_NAME] = QuotaScheduler(
+        database_path,
+        requests_per_second=app.config["SAM_QUOTA_REQUESTS_PER_SECOND"],
+        requests_per_day=app.config["SAM_QUOTA_REQUESTS_PER_DAY"],
+        max_wait=app.config["SAM_QUOTA_MAX_WAIT"],
+    )
+
+
+def get_quota_scheduler():
+    """The quota scheduler of the current application
+
+    Returns:
+        QuotaScheduler: or None if quota scheduling is disabled
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
+
+
+def acquire_sam_quota():
+    """Wait for quota for one SAM call if a scheduler is configured
+
+    Raises:
+        QuotaExceededError:
+    """
+    quota_scheduler = get_quota_scheduler()
+    if quota_scheduler is not None:
+        quota_scheduler.acquire()
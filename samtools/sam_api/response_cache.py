@@ -0,0 +1,291 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Bounded in-memory cache of Sam Tool search responses with a time-to-live and least recently
+used eviction. Entries are keyed on the normalized SAM Entities API parameters so that the same
+search made with different argument orderings or include section orderings shares one entry.
+
+Expired responses are kept for a while longer so that they can be served stale: immediately,
+while a background refresh fetches a new copy, or in place of an error while SAM is failing.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app
+
+_EXTENSION_NAME = "samtools.response_cache"
+_REFRESHER_EXTENSION_NAME = "samtools.response_cache_refresher"
+
+
+class TTLCache:
+    """A thread safe LRU cache whose entries expire after a fixed number of seconds.
+
+    Expired entries are retained for max_stale more seconds, where only get_with_age returns them.
+    """
+
+    def __init__(self, max_size, ttl, max_stale=0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired
+
+        Args:
+            key (hashable): cache key
+
+        Returns:
+            object: cached value or None
+        """
+        with self._lock:
+            value, age = self._get_retained(key)
+            if value is None or age > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def get_with_age(self, key):
+        """Return the cached value for key and its age, including expired values that are still
+        within max_stale seconds of their time-to-live
+
+        Args:
+            key (hashable): cache key
+
+        Returns:
+            tuple: (value, age in seconds), or (None, None) if there is no retained value
+        """
+        with self._lock:
+            value, age = self._get_retained(key)
+            if value is None:
+                self.misses += 1
+            elif age > self.ttl:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return value, age
+
+    def _get_retained(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        stored_at, value = entry
+        age = self._clock() - stored_at
+        if age > self.ttl + self.max_stale:
+            del self._entries[key]
+            self.expirations += 1
+            return None, None
+        self._entries.move_to_end(key)
+        return value, age
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry when full
+
+        Args:
+            key (hashable): cache key
+            value (object): value to cache
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """True if key has an unexpired value. Hit and miss counters are not updated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self._clock() - entry[0] <= self.ttl
+
+    def stats(self):
+        """Cache counters for the metrics endpoint
+
+        Returns:
+            dict: hits, staleHits, misses, evictions, expirations, size and maxSize
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "staleHits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+            }
+
+
+class CachedResponse(dict):
+    """A search response stored in the response cache. Its serialized forms (see
+    json_responses) are kept on it, so they are dropped with the cache entry."""
+
+    __slots__ = ("serialized",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.serialized = None
+
+
+class BackgroundRefresher:
+    """Runs cache refreshes on a small thread pool, at most one at a time per cache key"""
+
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="samtools-refresh"
+        )
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.failures = 0
+
+    def submit(self, key, function):
+        """Call function in the background unless a refresh of key is already pending
+
+        Args:
+            key (hashable): cache key being refreshed
+            function (callable): the refresh, taking no arguments
+
+        Returns:
+            bool: True if a refresh was started
+        """
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending[key] = self._executor.submit(self._refresh, key, function)
+            return True
+
+    def wait(self, timeout=None):
+        """Wait for the pending refreshes to finish
+
+        Args:
+            timeout (float, optional): maximum number of seconds to wait
+        """
+        with self._lock:
+            pending = list(self._pending.values())
+        wait(pending, timeout=timeout)
+
+    def stats(self):
+        """Refresh counters for the metrics endpoint
+
+        Returns:
+            dict: refreshes, failures and pending
+        """
+        with self._lock:
+            return {
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "pending": len(self._pending),
+            }
+
+    def _refresh(self, key, function):
+        try:
+            function()
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self.refreshes += 1
+                del self._pending[key]
+
+
+def make_cache_key(search_parameters, host_url):
+    """Build a hashable key from SAM Entities API parameters.
+
+    A caller supplied API key is only kept as a hash, so that the key itself is not held in
+    memory: callers with their own key share entries (and coalesced calls) with callers of the
+    same key only, never with searches made with the tool's key. includeSections is canonicalized
+    as a sorted tuple. host_url is part of the key because it is embedded in the pdfLinks of every
+    cached entity.
+
+    Args:
+        search_parameters (dict): SAM Entities API parameters
+        host_url (str): The url of this tool
+
+    Returns:
+        tuple: cache key
+    """
+    normalized = []
+    for name, value in search_parameters.items():
+        if name == "api_key":
+            value = hashlib.sha256(str(value).encode("utf-8")).hexdigest()
+        if name == "includeSections":
+            value = tuple(sorted(value))
+        normalized.append((name, value))
+    return (host_url, tuple(sorted(normalized)))
+
+
+def init_app(app):
+    """Attach a response cache sized by SAM_RESPONSE_CACHE_SIZE and SAM_RESPONSE_CACHE_TTL.
+    Expired responses are retained for the longer of the SAM_RESPONSE_CACHE_STALE_* windows.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    app.extensions[_EXTENSION_NAME] = TTLCache(
+        max_size=app.config["SAM_RESPONSE_CACHE_SIZE"],
+        ttl=app.config["SAM_RESPONSE_CACHE_TTL"],
+        max_stale=max(
+            app.config["SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE"],
+            app.config["SAM_RESPONSE_CACHE_STALE_IF_ERROR"],
+        ),
+    )
+    app.extensions[_REFRESHER_EXTENSION_NAME] = BackgroundRefresher(
+        max_workers=app.config["SAM_RESPONSE_CACHE_REFRESH_WORKERS"]
+    )
+
+
+def get_response_cache():
+    """The response cache of the current application
+
+    Returns:
+        TTLCache: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
+
+
+def get_background_refresher():
+    """The background refresher of stale responses of the current application
+
+    Returns:
+        BackgroundRefresher: or None if the application was created without one
+    """
+    return current_app.extensions.get(_REFRESHER_EXTENSION_NAME)
@@ -21,11 +21,114 @@ Module for generating SAM Entities API query parameters from a user input string
 
 """
 
+import functools
 import re
-import shlex
 import warnings
 from urllib.parse import urlparse
 
+UEI_SAM = "ueiSAM"
+US_CAGE_CODE = "cageCode"
+NCAGE_CODE = "ncageCode"
+WEBSITE = "website"
+
+_DIGITS = frozenset("0123456789")
+# A-HJ-NP-Z0-9
+_CODE_CHARACTERS = frozenset("ABCDEFGHJKLMNPQRSTUVWXYZ") | _DIGITS
+_UEI_FIRST_CHARACTERS = _CODE_CHARACTERS - {"0"}
+# The characters the case-insensitive regular expressions match as A-Z, including the
+# non-ASCII ones Unicode case folding maps to I, S and K. Other characters are kept and fail
+# every check.
+_UPPER_CASE = str.maketrans(
+    "abcdefghijklmnopqrstuvwxyz\u0131\u0130\u017f\u212a",
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZIISK",
+)
+
+# First characters, last characters and country of each NCAGE code series,
+# see _is_potential_ncage_code
+_NCAGE_CODE_SERIES = (
+    ("I", "0123456789", "NATO & International Org."),
+    ("S", "0123456789", "Non-NATO Nations"),
+    ("A", "H", "Albania"),
+    ("B", "0123456789", "Belgium"),
+    ("0123456789", "U", "Bulgaria"),
+    ("0123456789L", "0123456789", "Canada"),
+    ("A", "B", "Croatia"),
+    ("0123456789", "G", "Czech Republic"),
+    ("R", "0123456789", "Denmark"),
+    ("0123456789", "J", "Estonia"),
+    ("FM", "0123456789", "France"),
+    ("CD", "0123456789", "Germany"),
+    ("G", "0123456789", "Greece"),
+    ("0123456789", "V", "Hungary"),
+    ("S", "0123456789", "Iceland"),
+    ("A", "0123456789", "Italy"),
+    ("A", "D", "Latvia"),
+    ("0123456789", "R", "Lithuania"),
+    ("B", "0123456789", "Luxembourg"),
+    ("A", "W", "Montenegro"),
+    ("H", "0123456789", "Netherlands"),
+    ("A", "C", "North Macedonia"),
+    ("N", "0123456789", "Norway"),
+    ("0123456789", "H", "Poland"),
+    ("P", "0123456789", "Portugal"),
+    ("0123456789", "L", "Romania"),
+    ("0123456789", "M", "Slovakia"),
+    ("0123456789", "Q", "Slovenia"),
+    ("0123456789", "B", "Spain"),
+    ("T", "0123456789", "Turkey"),
+    ("UK", "0123456789", "United Kingdom"),
+    ("0123456789", "0123456789", "United States"),
+    ("W", "0123456789", "Argentina"),
+    ("Z", "0123456789", "Australia"),
+    ("0123456789", "N", "Austria"),
+    ("0123456789", "K", "Brazil"),
+    ("A", "Z", "Colombia"),
+    ("A", "G", "Finland"),
+    ("0123456789", "Y", "India"),
+    ("0123456789", "Z", "Indonesia"),
+    ("0123456789", "A", "Israel"),
+    ("J", "0123456789", "Japan"),
+    ("A", "X", "Jordan"),
+    ("0123456789", "F", "Korea, Republic of"),
+    ("Y", "0123456789", "Malaysia"),
+    ("A", "M", "Morocco"),
+    ("E", "0123456789", "New Zealand"),
+    ("A", "S", "Serbia"),
+    ("Q", "0123456789", "Singapore"),
+    ("A", "N", "Sweden"),
+    ("A", "J", "Ukraine"),
+    ("0123456789", "W", "United Arab Emirates"),
+)
+
+
+def _get_ncage_countries(code_series):
+    """Countries indexed by the first and last characters of their NCAGE codes"""
+    countries = {}
+    for first_characters, last_characters, country in code_series:
+        for first in first_characters:
+            for last in last_characters:
+                countries[first + last] = countries.get(first + last, ()) + (country,)
+    return countries
+
+
+_NCAGE_COUNTRIES = _get_ncage_countries(_NCAGE_CODE_SERIES)
+
+# A quoted word, an unclosed quote, or a word up to the next whitespace
+_WORD_PATTERN = re.compile(r'"[^"]*"|"|[^ \t\r\n"][^ \t\r\n]*')
+_FORBIDDEN_CHARACTERS = r"-&|{}^\\"
+_WHITESPACE_FOR_FORBIDDEN_CHARACTERS = str.maketrans(
+    _FORBIDDEN_CHARACTERS, " " * len(_FORBIDDEN_CHARACTERS)
+)
+_FORBIDDEN_CHARACTERS_AND_COMMAS = str.maketrans(
+    _FORBIDDEN_CHARACTERS, " " * len(_FORBIDDEN_CHARACTERS), ","
+)
+
+# Distinct raw search inputs whose SAM Entities API parameters are kept
+_SEARCH_PARAMETER_CACHE_SIZE = 4096
+
+_LLC_WORDS = frozenset(["L.L.C", "L.L.C.", "LLC"])
+_TOP_LEVEL_DOMAINS = frozenset(["com", "org", "net", "int", "edu", "gov", "mil", "us"])
+
 
 def get_search_parameter(search_input=""):
     """Generate SAM API query parameters from a user input string.
@@ -39,12 +142,37 @@ def get_search_parameter(search_input=""):
     WI, entities on apple road etc.). For websites, the word.domain structure required prevents
     these false positives in our testing.
 
+    The parameters of recent inputs are kept in a bounded LRU cache keyed on the raw input.
+    Every call returns a new dict, so callers may modify it.
+
     Args:
         search_input (str, optional): User input search expression. Defaults to "".
 
     Returns:
         dict: Contains keys of either "cageCode", "ueiSAM", or "q"
     """
+    return dict(_get_search_parameter(search_input))
+
+
+def get_search_parameter_cache_stats():
+    """Counters of the get_search_parameter cache for the metrics endpoint
+
+    Returns:
+        dict: hits, misses, hitRate (None before the first call), size and maxSize
+    """
+    cache_info = _get_search_parameter.cache_info()
+    calls = cache_info.hits + cache_info.misses
+    return {
+        "hits": cache_info.hits,
+        "misses": cache_info.misses,
+        "hitRate": cache_info.hits / calls if calls else None,
+        "size": cache_info.currsize,
+        "maxSize": cache_info.maxsize,
+    }
+
+
+@functools.lru_cache(maxsize=_SEARCH_PARAMETER_CACHE_SIZE)
+def _get_search_parameter(search_input):
     if search_input is None:
         return {}
 
@@ -53,20 +181,22 @@ def get_search_parameter(search_input=""):
     if len(search_input) == 0:
         return {}
 
-    if _is_sam_unique_entity_id(search_input):
+    identifier_type, _ = classify_search_input(search_input)
+
+    if identifier_type == UEI_SAM:
         return {"ueiSAM": search_input}
 
-    if _is_us_cage_code(search_input):
+    if identifier_type == US_CAGE_CODE:
         return {"cageCode": search_input}
 
-    if _is_potential_ncage_code(search_input):
+    if identifier_type == NCAGE_CODE:
         business_name = _get_cleaned_and_prepared_business_name(search_input)
         return {
             "q": f"(legalBusinessName:{business_name} OR "
             f"dbaName:{business_name} OR cageCode:{search_input})"
         }
 
-    if _is_potential_website(search_input):
+    if identifier_type == WEBSITE:
         website = _get_cleaned_and_prepared_website(search_input)
         return {"q": f"(*{website}*)"}
 
@@ -74,6 +204,72 @@ def get_search_parameter(search_input=""):
     return {"q": f"(legalBusinessName:{business_name} OR dbaName:{business_name})"}
 
 
+def get_business_name(search_input=""):
+    """The business name a user input string is searched by, for local name searches.
+
+    Args:
+        search_input (str, optional): User input search expression. Defaults to "".
+
+    Returns:
+        str: the search input, or None if it is searched as a UEI, a CAGE or NCAGE code, or a
+            website
+    """
+    if search_input is None:
+        return None
+
+    search_input = " ".join(_split_and_preserve_quotes(search_input))
+
+    if len(search_input) == 0 or classify_search_input(search_input)[0] is not None:
+        return None
+    return search_input
+
+
+def classify_search_input(search_input):
+    """Classify a search input as a UEI, a US CAGE code, an NCAGE code or a website in one pass.
+
+    Gives the same answers as _is_sam_unique_entity_id, _is_us_cage_code,
+    _is_potential_ncage_code and _is_potential_website, checked in that order, using character
+    sets and an NCAGE country table built once at import.
+
+    Args:
+        search_input (str): User input search expression
+
+    Returns:
+        tuple: UEI_SAM, US_CAGE_CODE, NCAGE_CODE, WEBSITE or None for a business name, and the
+            countries an NCAGE code may belong to (empty for the other types)
+    """
+    # Like the $ of the regular expressions, ignore one trailing newline
+    code = search_input[:-1] if search_input[-1:] == "\n" else search_input
+
+    if len(code) == 12:
+        code = _to_upper_case(code)
+        if (
+            code[0] in _UEI_FIRST_CHARACTERS
+            and code[11] in _DIGITS
+            and _CODE_CHARACTERS.issuperset(code[1:11])
+        ):
+            return UEI_SAM, ()
+
+    elif len(code) == 5:
+        code = _to_upper_case(code)
+        if _CODE_CHARACTERS.issuperset(code[1:4]):
+            if code[0] in _DIGITS and code[4] in _DIGITS:
+                return US_CAGE_CODE, ()
+            countries = _NCAGE_COUNTRIES.get(code[0] + code[4])
+            if countries is not None:
+                return NCAGE_CODE, countries
+
+    if "." in search_input and _is_potential_website(search_input):
+        return WEBSITE, ()
+    return None, ()
+
+
+def _to_upper_case(code):
+    if code.isascii():
+        return code.upper()
+    return code.translate(_UPPER_CASE)
+
+
 def _is_sam_unique_entity_id(search_input):
     """
     SAM Unique Entity Identifier: Twelve-position alphanumeric, does not have leading
@@ -168,17 +364,28 @@ def _is_potential_ncage_code(search_input):
 
 
 def _get_cleaned_and_prepared_business_name(search_input):
-    search_input = _replace_forbidden_characters_with_whitespace(search_input)
-    search_input = _remove_commas(search_input)
-    search_input = _remove_llc(search_input)
-    search_input = _remove_trailing_periods(search_input)
-    search_input = _add_wildcards(search_input)
-    return search_input
+    search_input = search_input.translate(_FORBIDDEN_CHARACTERS_AND_COMMAS)
+    words = _tokenize(search_input)
+    if words is None:
+        # Joining and splitting again can pair an unclosed quote with a later one, so each
+        # step splits the result of the previous one
+        search_input = _remove_llc(search_input)
+        search_input = _remove_trailing_periods(search_input)
+        return _add_wildcards(search_input)
+
+    # Balanced quotes split the same way after each step, so the words are transformed in one
+    # pass. Words emptied by _remove_trailing_periods are dropped like the next split would.
+    sentence = []
+    for word in words:
+        if word.upper() in _LLC_WORDS:
+            continue
+        word = word.rstrip(".")
+        if word:
+            sentence.append(_add_wildcard(word))
+    return " ".join(sentence)
 
 
 def _is_potential_website(search_input):
-    top_level_domains = set(["com", "org", "net", "int", "edu", "gov", "mil", "us"])
-
     if "." not in search_input:
         return False
 
@@ -194,7 +401,7 @@ def _is_potential_website(search_input):
         return False
 
     top_level_domain = split_potential_netloc[-1]
-    if top_level_domain not in top_level_domains:
+    if top_level_domain not in _TOP_LEVEL_DOMAINS:
         return False
 
     return True
@@ -221,37 +428,40 @@ def _get_website_netloc(search_input):
 
 
 def _add_wildcards(search_inputs):
-    sentence = []
-    for word in _split_and_preserve_quotes(search_inputs):
-        if word[0] == '"' and word[-1] == '"':
-            sentence.append(word)
-        elif len(word) <= 2:
-            sentence.append(word)
-        else:
-            sentence.append(f"{word}*")
-    return " ".join(sentence)
+    return " ".join(map(_add_wildcard, _split_and_preserve_quotes(search_inputs)))
+
+
+def _add_wildcard(word):
+    if word[0] == '"' and word[-1] == '"':
+        return word
+    if len(word) <= 2:
+        return word
+    return f"{word}*"
 
 
 def _split_and_preserve_quotes(search_input):
-    try:
-        lex = shlex.shlex(search_input, posix=False)
-        lex.quotes = '"'
-        lex.whitespace_split = True
-        lex.commenters = ""
-        return list(lex)
-    except ValueError:
+    words = _tokenize(search_input)
+    if words is None:
         return search_input.split()
+    return words
 
 
-def _replace_forbidden_characters_with_whitespace(search_input):
-    forbidden_characters = r"-&|{}^\\"
-    return search_input.translate(
-        str.maketrans(forbidden_characters, " " * len(forbidden_characters))
-    )
+def _tokenize(search_input):
+    """Split into words like shlex in non-POSIX mode with whitespace_split and '"' as the only
+    quote character: a word starting with a quote runs to the closing quote, other words run to
+    the next space, tab, carriage return or newline.
 
+    Returns:
+        list: words, or None if a quote is not closed
+    """
+    words = _WORD_PATTERN.findall(search_input)
+    if '"' in words:
+        return None
+    return words
 
-def _remove_commas(search_input):
-    return search_input.replace(",", "")
+
+def _replace_forbidden_characters_with_whitespace(search_input):
+    return search_input.translate(_WHITESPACE_FOR_FORBIDDEN_CHARACTERS)
 
 
 def _remove_trailing_periods(search_input):
@@ -266,6 +476,6 @@ def _remove_llc(search_input):
     "User searches like 'Thermo Fisher L.L.C.' perform better without 'L.L.C."
     sentence = []
     for word in _split_and_preserve_quotes(search_input):
-        if word.upper() not in ("L.L.C", "L.L.C.", "LLC"):
+        if word.upper() not in _LLC_WORDS:
             sentence.append(word)
     return " ".join(sentence)
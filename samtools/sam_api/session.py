@@ -0,0 +1,97 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Pooled HTTP session used for every call to the SAM Entities API.
+
+A single requests.Session is kept per worker process so that connections to api.sam.gov are
+reused (keep-alive) instead of paying a new TCP and TLS handshake on every search. The session
+is rebuilt if the process id changes, so sessions are never shared across forked gunicorn
+workers.
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_sam_session():
+    """Return the pooled session for this worker process, creating it on first use.
+
+    Returns:
+        requests.Session: session configured from the SAM_API_* application settings
+    """
+    global _session, _session_pid  # pylint: disable=global-statement
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            config = current_app.config
+            _session = create_sam_session(
+                pool_connections=config["SAM_API_POOL_CONNECTIONS"],
+                pool_maxsize=config["SAM_API_POOL_MAXSIZE"],
+                keep_alive=config["SAM_API_KEEP_ALIVE"],
+            )
+            _session_pid = pid
+    return _session
+
+
+def get_sam_timeout():
+    """The (connect, read) timeout tuple used for calls to the SAM Entities API
+
+    Returns:
+        tuple: connect and read timeouts in seconds
+    """
+    config = current_app.config
+    return (config["SAM_API_CONNECT_TIMEOUT"], config["SAM_API_READ_TIMEOUT"])
+
+
+def create_sam_session(pool_connections, pool_maxsize, keep_alive=True):
+    """Build a requests session with a connection pool mounted for http and https.
+
+    Args:
+        pool_connections (int): number of host pools to cache
+        pool_maxsize (int): maximum number of connections kept per host
+        keep_alive (bool, optional): reuse connections between calls. Defaults to True.
+
+    Returns:
+        requests.Session:
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def _reset_sam_session():
+    global _session, _session_pid  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_pid = None
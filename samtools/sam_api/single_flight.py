@@ -0,0 +1,242 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Request coalescing for identical concurrent SAM Entities API calls.
+
+When several threads ask for the same key at once, only the first (the leader) runs the call and
+the others wait for and share its result. FileLockSingleFlight extends this across gunicorn
+workers on the same host: the leader holds an exclusive lock on a per-key file and writes its
+result next to it, so workers that were waiting on the lock can read it instead of calling SAM.
+A worker waits at most lock_timeout seconds for the lock before calling SAM itself, and lock and
+result files untouched for FILE_MAX_AGE seconds are removed.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+
+from flask import current_app
+
+_EXTENSION_NAME = "samtools.single_flight"
+_LOCK_POLL_INTERVAL = 0.05
+FILE_MAX_AGE = 600
+_CLEANUP_INTERVAL = 60
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key within one process"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.collapsed = 0
+
+    def do(self, key, function):
+        """Run function() unless a call with the same key is in flight, in which case wait
+        for that call and return its result (or raise its exception).
+
+        Args:
+            key (hashable): identifies identical calls
+            function (callable): the call to make, taking no arguments
+
+        Returns:
+            object: the return value of function
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.collapsed += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = self._run_leader(key, function)
+            return call.result
+        except Exception as exception:
+            call.exception = exception
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_leader(self, key, function):  # pylint: disable=unused-argument
+        return function()
+
+    def stats(self):
+        """Coalescing counters for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        return {"leaders": self.leaders, "collapsed": self.collapsed}
+
+
+class FileLockSingleFlight(SingleFlight):
+    """Collapses concurrent calls within a process and across processes sharing lock_directory.
+
+    Results are shared between processes as JSON, so function must return JSON serializable
+    data.
+    """
+
+    def __init__(self, lock_directory, lock_timeout=30, file_max_age=FILE_MAX_AGE):
+        """
+        Args:
+            lock_directory (str): directory of the lock and result files, shared by the workers
+            lock_timeout (float, optional): seconds to wait for another worker's call before
+                calling SAM anyway
+            file_max_age (float, optional): seconds after which unused files are removed
+        """
+        super().__init__()
+        self._lock_directory = pathlib.Path(lock_directory)
+        self._lock_directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.lock_timeout = lock_timeout
+        self.file_max_age = file_max_age
+        self._next_cleanup = 0.0
+        self.collapsed_across_workers = 0
+        self.lock_timeouts = 0
+
+    def _run_leader(self, key, function):
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        lock_path = self._lock_directory / f"{name}.lock"
+        result_path = self._lock_directory / f"{name}.json"
+        started = time.time()
+
+        with open(lock_path, "a", encoding="utf-8") as lock_file:
+            if not _try_lock(lock_file):
+                if not self._wait_for_lock(lock_file):
+                    with self._lock:
+                        self.lock_timeouts += 1
+                    return function()
+                shared = _read_result(result_path, written_after=started)
+                if shared is not None:
+                    with self._lock:
+                        self.collapsed_across_workers += 1
+                    return shared["result"]
+
+            # Keeps the lock file from being removed as unused while the call runs
+            os.utime(lock_file.fileno())
+            result = function()
+            _write_result(result_path, result)
+        self._remove_expired_files()
+        return result
+
+    def _wait_for_lock(self, lock_file):
+        deadline = time.monotonic() + self.lock_timeout
+        while not _try_lock(lock_file):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(_LOCK_POLL_INTERVAL)
+        return True
+
+    def _remove_expired_files(self):
+        """Remove the lock, result and temporary files not used for file_max_age seconds, at
+        most once per _CLEANUP_INTERVAL"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_cleanup:
+                return
+            self._next_cleanup = now + _CLEANUP_INTERVAL
+        expired_before = time.time() - self.file_max_age
+        with os.scandir(self._lock_directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < expired_before:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        return {
+            **super().stats(),
+            "collapsedAcrossWorkers": self.collapsed_across_workers,
+            "lockTimeouts": self.lock_timeouts,
+        }
+
+
+def _try_lock(lock_file):
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _read_result(result_path, written_after):
+    try:
+        with open(result_path, "r", encoding="utf-8") as result_file:
+            shared = json.load(result_file)
+    except (OSError, ValueError):
+        return None
+    if shared.get("writtenAt", 0) < written_after:
+        return None
+    return shared
+
+
+def _write_result(result_path, result):
+    temporary_path = result_path.with_suffix(f".{os.getpid()}.tmp")
+    file_descriptor = os.open(
+        temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+    )
+    with os.fdopen(file_descriptor, "w", encoding="utf-8") as result_file:
+        json.dump({"writtenAt": time.time(), "result": result}, result_file)
+    os.replace(temporary_path, result_path)
+
+
+def init_app(app):
+    """Attach the coalescer. Set SAM_SINGLE_FLIGHT_LOCK_DIRECTORY to share calls between workers.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    lock_directory = app.config["SAM_SINGLE_FLIGHT_LOCK_DIRECTORY"]
+    if lock_directory:
+        app.extensions[_EXTENSION_NAME] = FileLockSingleFlight(
+            lock_directory, lock_timeout=app.config["SAM_SINGLE_FLIGHT_LOCK_TIMEOUT"]
+        )
+    else:
+        app.extensions[_EXTENSION_NAME] = SingleFlight()
+
+
+def get_single_flight():
+    """The request coalescer of the current application
+
+    Returns:
+        SingleFlight: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
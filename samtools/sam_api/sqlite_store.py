@@ -0,0 +1,130 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Connections and transactions shared by the SQLite stores (entity index, compliance history, SAM
+quota and watchlist).
+
+The databases are in WAL mode and shared by every gunicorn worker. Reads go through a read-only
+connection per thread, kept open between queries. Writes are short BEGIN IMMEDIATE transactions
+on a new connection, so that writers from other processes wait for each other instead of failing.
+"""
+
+import contextlib
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def connect(database_path, timeout=30):
+    """A connection in autocommit mode, which leaves transactions to BEGIN and COMMIT statements
+
+    Args:
+        database_path (str): SQLite database file
+        timeout (float, optional): seconds to wait for a lock held by another connection
+
+    Returns:
+        sqlite3.Connection:
+    """
+    return sqlite3.connect(database_path, timeout=timeout, isolation_level=None)
+
+
+def create_schema(database_path, schema):
+    """Switch a database to WAL mode and create the tables missing from it
+
+    Args:
+        database_path (str): SQLite database file
+        schema (str): CREATE ... IF NOT EXISTS statements
+    """
+    connection = connect(database_path)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(schema)
+    finally:
+        connection.close()
+
+
+@contextlib.contextmanager
+def transaction(database_path, timeout=30, synchronous=None):
+    """A write transaction on a new connection, committed unless an exception is raised
+
+    Args:
+        database_path (str): SQLite database file
+        timeout (float, optional): seconds to wait for other writers
+        synchronous (str, optional): PRAGMA synchronous of the transaction, for example NORMAL
+
+    Yields:
+        sqlite3.Connection:
+    """
+    connection = connect(database_path, timeout)
+    try:
+        if synchronous is not None:
+            connection.execute(f"PRAGMA synchronous={synchronous}")
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+
+class ReadConnections:
+    """A read-only connection per thread, kept open between queries"""
+
+    def __init__(self, database_path, timeout=30):
+        self.database_path = str(database_path)
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def get(self):
+        """
+        Returns:
+            sqlite3.Connection: the connection of the current thread
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = connect(self.database_path, self._timeout)
+            connection.execute("PRAGMA query_only=ON")
+            self._local.connection = connection
+        return connection
+
+
+def get_hash(text):
+    """64-bit hash of a serialized status, stored in an INTEGER column to detect changes
+
+    Args:
+        text (str):
+
+    Returns:
+        int: signed, to fit in SQLite's 64-bit integers
+    """
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def format_time(unix_time):
+    """
+    Args:
+        unix_time (float):
+
+    Returns:
+        str: UTC date and time in ISO 8601, for example 2022-10-03T12:00:00Z
+    """
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(unix_time))
@@ -0,0 +1,183 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Incremental decoder for SAM Entities API response bodies.
+
+The body is fed in chunks as it arrives. Every element of the top level entityData array is
+decoded on its own and handed to a transform as soon as it is complete, so only one full entity
+is held in memory at a time. The other top level fields (totalRecords, links) are decoded into
+EntityDataDecoder.fields.
+"""
+
+import codecs
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_WHITESPACE = re.compile(r"[\s,]*")
+
+_START = "start"
+_KEY = "key"
+_VALUE = "value"
+_ENTITY = "entity"
+_DONE = "done"
+
+
+class EntityDataDecoder:
+    """Push decoder that yields the entities of a SAM Entities API response one at a time"""
+
+    def __init__(self, transform=None, array_name="entityData"):
+        """
+        Args:
+            transform (callable, optional): applied to every decoded entity, for example to drop
+                the parts of it that are not needed. Defaults to None.
+            array_name (str, optional): the top level array to stream. Defaults to "entityData".
+        """
+        self.fields = {}
+        self._transform = transform
+        self._array_name = array_name
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._state = _START
+        self._key = None
+        self._retry_length = 0
+        self._final = False
+
+    def feed(self, chunk):
+        """Add a chunk of the body
+
+        Args:
+            chunk (bytes): the next part of the body
+
+        Raises:
+            ValueError: the body is not a JSON object
+
+        Returns:
+            list: the entities completed by this chunk, after transform
+        """
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._decode_available()
+
+    def close(self):
+        """Finish decoding
+
+        Raises:
+            ValueError: the body is not valid JSON or ended before the top level object was
+                complete
+
+        Returns:
+            list: the remaining entities, after transform
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._final = True
+        entities = self._decode_available()
+        if self._state != _DONE:
+            raise ValueError("SAM Entities API response ended unexpectedly")
+        return entities
+
+    def _decode_available(self):
+        entities = []
+        while self._state != _DONE and self._step(entities):
+            pass
+        self._buffer = self._buffer[self._position :]
+        self._position = 0
+        return entities
+
+    def _step(self, entities):
+        """Advance by one token or value. Returns False when more data is needed."""
+        self._position = _WHITESPACE.match(self._buffer, self._position).end()
+        if self._position >= len(self._buffer):
+            return False
+        character = self._buffer[self._position]
+
+        if self._state == _START:
+            if character != "{":
+                raise ValueError("SAM Entities API response is not a JSON object")
+            self._position += 1
+            self._state = _KEY
+            return True
+
+        if self._state == _KEY:
+            if character == "}":
+                self._position += 1
+                self._state = _DONE
+                return True
+            match = _STRING.match(self._buffer, self._position)
+            if match is None:
+                return False
+            colon = self._buffer.find(":", match.end())
+            if colon < 0:
+                return False
+            self._key = json.loads(match.group())
+            self._position = colon + 1
+            self._state = _VALUE
+            return True
+
+        if self._state == _VALUE and self._key == self._array_name:
+            if character != "[":
+                raise ValueError(f"{self._array_name} is not an array")
+            self._position += 1
+            self._state = _ENTITY
+            return True
+
+        if self._state == _ENTITY and character == "]":
+            self._position += 1
+            self._state = _KEY
+            return True
+
+        decoded = self._decode_value()
+        if decoded is None:
+            return False
+        value, self._position = decoded
+        if self._state == _ENTITY:
+            entities.append(
+                value if self._transform is None else self._transform(value)
+            )
+        else:
+            self.fields[self._key] = value
+            self._state = _KEY
+        return True
+
+    def _decode_value(self):
+        """Decode the value at the current position, or return None if it may be incomplete.
+
+        A failed attempt is only retried once the text available for the value has doubled, so
+        partial attempts cost at most about as much as decoding the value itself.
+        """
+        available = len(self._buffer) - self._position
+        if available < self._retry_length and not self._final:
+            return None
+        try:
+            value, end = _DECODER.raw_decode(self._buffer, self._position)
+        except json.JSONDecodeError as exception:
+            if self._final:
+                raise ValueError(
+                    "SAM Entities API response is not valid JSON"
+                ) from exception
+            self._retry_length = 2 * available
+            return None
+        if end == len(self._buffer) and not self._final and _is_number(value):
+            # the rest of the number may be in the next chunk
+            return None
+        self._retry_length = 0
+        return value, end
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
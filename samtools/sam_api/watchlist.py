@@ -0,0 +1,512 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+"""
+Watchlist of vendors whose compliance status is re-checked in the background.
+
+`flask --app samtools monitor-watchlist` re-checks the watched UEIs that were checked longest ago,
+SAM_WATCHLIST_BATCH_SIZE (at most one SAM page of 10) at a time in one multi-value SAM query
+(ueiSAM=[A~B~C]) through the usual search pipeline. Calls are spread evenly over the day, so that
+every UEI is checked once per SAM_WATCHLIST_RECHECK_INTERVAL, without making more than
+SAM_WATCHLIST_DAILY_CALLS calls a day or using the last SAM_WATCHLIST_QUOTA_RESERVE calls of the SAM
+quota. The monitor looks at the watchlist again every SAM_WATCHLIST_POLL_INTERVAL seconds, so that
+newly added UEIs are checked without waiting for the next paced call.
+
+When the status of a UEI differs from its previous check (889 compliance, exclusions,
+registration, or the entity no longer being found) a notification is written to the outbox table
+of the watchlist database, for delivery by another process.
+
+Usage:
+    flask --app samtools watchlist-add UEI...
+    flask --app samtools watchlist-remove UEI...
+    flask --app samtools monitor-watchlist [--once]
+    flask --app samtools watchlist-notifications [--mark-delivered]
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from samtools.sam_api import sqlite_store
+from samtools.sam_api.circuit_breaker import CLOSED, get_circuit_breaker
+from samtools.sam_api.entity_information import (
+    SAM_ENTITIES_API_ENDPOINT,
+    SAM_ENTITIES_API_PAGE_SIZE,
+    _search_sam,
+)
+from samtools.sam_api.quota import get_quota_scheduler
+from samtools.sam_api.search_preprocessor import _is_sam_unique_entity_id
+
+_EXTENSION_NAME = "samtools.watchlist"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    uei_sam TEXT PRIMARY KEY,
+    added_at INTEGER NOT NULL,
+    checked_at INTEGER NOT NULL DEFAULT 0,
+    status_hash INTEGER,
+    status TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS watchlist_checked_at ON watchlist (checked_at);
+CREATE TABLE IF NOT EXISTS watchlist_calls (
+    day TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watchlist_outbox (
+    id INTEGER PRIMARY KEY,
+    uei_sam TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    previous TEXT,
+    current TEXT,
+    delivered_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS watchlist_outbox_pending
+    ON watchlist_outbox (id) WHERE delivered_at IS NULL;
+"""
+_SECONDS_PER_DAY = 86400
+_SEARCH_ARGS = {
+    "includeSections": "entityRegistration",
+    "entityEFTIndicator": "",
+    "samToolsNoCache": "true",
+}
+
+
+class Watchlist:
+    """SQLite store of the watched UEIs, their last status and the notification outbox"""
+
+    def __init__(self, database_path, clock=time.time):
+        self.database_path = str(database_path)
+        self._clock = clock
+        self._read_connections = sqlite_store.ReadConnections(self.database_path)
+        sqlite_store.create_schema(self.database_path, _SCHEMA)
+
+    def add(self, ueis):
+        """Watch UEIs. UEIs already watched keep their status.
+
+        Args:
+            ueis (iterable): SAM UEIs
+
+        Raises:
+            ValueError: if one is not a SAM UEI
+
+        Returns:
+            int: the number of UEIs added
+        """
+        ueis = [uei_sam.strip().upper() for uei_sam in ueis]
+        invalid = [uei_sam for uei_sam in ueis if not _is_sam_unique_entity_id(uei_sam)]
+        if invalid:
+            raise ValueError(f"Not SAM UEIs: {', '.join(invalid)}")
+        now = int(self._clock())
+        with self._transaction() as connection:
+            return connection.executemany(
+                "INSERT OR IGNORE INTO watchlist (uei_sam, added_at) VALUES (?, ?)",
+                [(uei_sam, now) for uei_sam in ueis],
+            ).rowcount
+
+    def remove(self, ueis):
+        """Stop watching UEIs
+
+        Args:
+            ueis (iterable): SAM UEIs
+
+        Returns:
+            int: the number of UEIs removed
+        """
+        with self._transaction() as connection:
+            return connection.executemany(
+                "DELETE FROM watchlist WHERE uei_sam = ?",
+                [(uei_sam.strip().upper(),) for uei_sam in ueis],
+            ).rowcount
+
+    def __len__(self):
+        return (
+            self._read_connections.get()
+            .execute("SELECT COUNT(*) FROM watchlist")
+            .fetchone()[0]
+        )
+
+    def has_never_checked(self):
+        """
+        Returns:
+            bool: whether a watched UEI was never checked
+        """
+        return bool(
+            self._read_connections.get()
+            .execute("SELECT EXISTS (SELECT 1 FROM watchlist WHERE checked_at = 0)")
+            .fetchone()[0]
+        )
+
+    def get_due(self, limit, recheck_interval):
+        """The UEIs due for a check, never checked first and then checked longest ago
+
+        Args:
+            limit (int): maximum number of UEIs
+            recheck_interval (float): seconds between two checks of a UEI
+
+        Returns:
+            list: UEIs
+        """
+        rows = self._read_connections.get().execute(
+            "SELECT uei_sam FROM watchlist WHERE checked_at <= ? "
+            "ORDER BY checked_at LIMIT ?",
+            (int(self._clock() - recheck_interval), limit),
+        )
+        return [uei_sam for (uei_sam,) in rows]
+
+    def count_call(self):
+        """Count a SAM call made today
+
+        Returns:
+            int: the calls made today
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO watchlist_calls VALUES (?, 1) "
+                "ON CONFLICT (day) DO UPDATE SET calls = calls + 1",
+                (self._today(),),
+            )
+            return self._get_calls_today(connection)
+
+    def calls_today(self):
+        """
+        Returns:
+            int: the SAM calls made today
+        """
+        return self._get_calls_today(self._read_connections.get())
+
+    def record_checks(self, ueis, statuses):
+        """Save the result of a check, and write a notification for each UEI whose status
+        differs from its previous check
+
+        Args:
+            ueis (list): the UEIs checked
+            statuses (dict): status by UEI, see get_watched_status. UEIs that were not found are
+                left out.
+
+        Returns:
+            int: the number of notifications written
+        """
+        now = int(self._clock())
+        notifications = 0
+        with self._transaction() as connection:
+            for uei_sam in ueis:
+                row = connection.execute(
+                    "SELECT checked_at, status_hash, status FROM watchlist "
+                    "WHERE uei_sam = ?",
+                    (uei_sam,),
+                ).fetchone()
+                if row is None:
+                    continue
+                checked_at, previous_hash, previous = row
+                status = statuses.get(uei_sam)
+                status_json = json.dumps(status, sort_keys=True, separators=(",", ":"))
+                status_hash = sqlite_store.get_hash(status_json)
+                if checked_at and status_hash != previous_hash:
+                    connection.execute(
+                        "INSERT INTO watchlist_outbox "
+                        "(uei_sam, created_at, previous, current) VALUES (?, ?, ?, ?)",
+                        (uei_sam, now, previous, status_json),
+                    )
+                    notifications += 1
+                connection.execute(
+                    "UPDATE watchlist SET checked_at = ?, status_hash = ?, status = ? "
+                    "WHERE uei_sam = ?",
+                    (now, status_hash, status_json, uei_sam),
+                )
+        return notifications
+
+    def get_notifications(self, limit=100):
+        """Notifications not delivered yet, oldest first
+
+        Args:
+            limit (int, optional): Defaults to 100.
+
+        Returns:
+            list: of {"id", "ueiSAM", "createdAt", "previous", "current"}. The statuses are None
+                when the UEI was not found.
+        """
+        rows = self._read_connections.get().execute(
+            "SELECT id, uei_sam, created_at, previous, current FROM watchlist_outbox "
+            "WHERE delivered_at IS NULL ORDER BY id LIMIT ?",
+            (limit,),
+        )
+        return [
+            {
+                "id": notification_id,
+                "ueiSAM": uei_sam,
+                "createdAt": sqlite_store.format_time(created_at),
+                "previous": json.loads(previous),
+                "current": json.loads(current),
+            }
+            for notification_id, uei_sam, created_at, previous, current in rows
+        ]
+
+    def mark_delivered(self, notification_ids):
+        """
+        Args:
+            notification_ids (iterable): ids of delivered notifications
+        """
+        now = int(self._clock())
+        with self._transaction() as connection:
+            connection.executemany(
+                "UPDATE watchlist_outbox SET delivered_at = ? WHERE id = ?",
+                [(now, notification_id) for notification_id in notification_ids],
+            )
+
+    def stats(self):
+        """Freshness and throughput of the re-checks for the metrics endpoint
+
+        Returns:
+            dict:
+        """
+        now = int(self._clock())
+        connection = self._read_connections.get()
+        watched, never_checked, oldest_check, last_hour, last_day = connection.execute(
+            "SELECT COUNT(*), COUNT(*) FILTER (WHERE checked_at = 0), "
+            "MIN(checked_at) FILTER (WHERE checked_at > 0), "
+            "COUNT(*) FILTER (WHERE checked_at > ?), "
+            "COUNT(*) FILTER (WHERE checked_at > ?) FROM watchlist",
+            (now - 3600, now - _SECONDS_PER_DAY),
+        ).fetchone()
+        (pending,) = connection.execute(
+            "SELECT COUNT(*) FROM watchlist_outbox WHERE delivered_at IS NULL"
+        ).fetchone()
+        return {
+            "watched": watched,
+            "neverChecked": never_checked,
+            "oldestCheckAge": None if oldest_check is None else now - oldest_check,
+            "checkedLastHour": last_hour,
+            "checkedLastDay": last_day,
+            "callsToday": self._get_calls_today(connection),
+            "pendingNotifications": pending,
+        }
+
+    def _get_calls_today(self, connection):
+        row = connection.execute(
+            "SELECT calls FROM watchlist_calls WHERE day = ?", (self._today(),)
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def _today(self):
+        return time.strftime("%Y-%m-%d", time.gmtime(self._clock()))
+
+    def _transaction(self):
+        return sqlite_store.transaction(self.database_path)
+
+
+def get_watched_status(entity):
+    """The part of samToolsData a watchlist notification is about
+
+    Args:
+        entity (dict): an entity with its samToolsData section
+
+    Returns:
+        dict:
+    """
+    sam_tools_data = entity["samToolsData"]
+    eight_eight_nine = sam_tools_data["eightEightNine"]
+    return {
+        "isSelectable": sam_tools_data["isSelectable"],
+        "eightEightNine": {
+            "isCompliant": eight_eight_nine["isCompliant"],
+            "statusText": eight_eight_nine["statusText"],
+            "farProvisionDate": eight_eight_nine["farProvisionDate"],
+        },
+        "exclusions": dict(sam_tools_data["exclusions"]),
+        "registration": dict(sam_tools_data["registration"]),
+    }
+
+
+def check_next_batch(watchlist):
+    """Re-check the watched UEIs that are most overdue, in one SAM call
+
+    Args:
+        watchlist (Watchlist):
+
+    Returns:
+        tuple: (UEIs checked, notifications written), or None if no UEI is due or there is no
+            budget for a SAM call
+    """
+    config = current_app.config
+    due = watchlist.get_due(
+        _get_batch_size(config), config["SAM_WATCHLIST_RECHECK_INTERVAL"]
+    )
+    if not due or not _has_watchlist_budget(watchlist):
+        return None
+
+    watchlist.count_call()
+    response = _search_sam(
+        {**_SEARCH_ARGS, "ueiSAM": f"[{'~'.join(due)}]", "size": len(due)},
+        "",
+        SAM_ENTITIES_API_ENDPOINT,
+    )
+    if not response["success"]:
+        current_app.logger.error(f"Watchlist check failed: {response['errors']}")
+        return None
+    statuses = {
+        entity["entityRegistration"]["ueiSAM"].upper(): get_watched_status(entity)
+        for entity in response["entityData"]
+    }
+    return len(due), watchlist.record_checks(due, statuses)
+
+
+def get_call_interval(watched, config):
+    """Seconds between two SAM calls of the monitor
+
+    Args:
+        watched (int): the number of watched UEIs
+        config (dict): the application config
+
+    Returns:
+        float:
+    """
+    calls_per_pass = math.ceil(watched / _get_batch_size(config))
+    calls_per_day = min(
+        calls_per_pass * _SECONDS_PER_DAY / config["SAM_WATCHLIST_RECHECK_INTERVAL"],
+        config["SAM_WATCHLIST_DAILY_CALLS"],
+    )
+    if calls_per_day <= 0:
+        return config["SAM_WATCHLIST_RECHECK_INTERVAL"]
+    return _SECONDS_PER_DAY / calls_per_day
+
+
+def run_monitor(watchlist, stop=None, clock=time.monotonic):
+    """Check batches of the watchlist at an even pace until stop is set. The pace is recomputed
+    every SAM_WATCHLIST_POLL_INTERVAL seconds, and UEIs that were never checked are checked
+    without waiting for it.
+
+    Args:
+        watchlist (Watchlist):
+        stop (threading.Event, optional): Defaults to running forever.
+        clock (callable, optional): monotonic time in seconds
+    """
+    stop = stop or threading.Event()
+    config = current_app.config
+    last_call = -math.inf
+    while not stop.is_set():
+        interval = get_call_interval(len(watchlist), config)
+        if clock() >= last_call + interval or watchlist.has_never_checked():
+            last_call = clock()
+            try:
+                check_next_batch(watchlist)
+            except Exception as exception:  # pylint: disable=broad-except
+                current_app.logger.error(exception)
+        stop.wait(
+            max(
+                0.0,
+                min(
+                    config["SAM_WATCHLIST_POLL_INTERVAL"],
+                    last_call + interval - clock(),
+                ),
+            )
+        )
+
+
+def _get_batch_size(config):
+    """UEIs per SAM call, no more than one page of results so that none is missed"""
+    return min(config["SAM_WATCHLIST_BATCH_SIZE"], SAM_ENTITIES_API_PAGE_SIZE)
+
+
+def _has_watchlist_budget(watchlist):
+    config = current_app.config
+    if watchlist.calls_today() >= config["SAM_WATCHLIST_DAILY_CALLS"]:
+        return False
+    circuit_breaker = get_circuit_breaker()
+    if circuit_breaker is not None and circuit_breaker.state != CLOSED:
+        return False
+    quota_scheduler = get_quota_scheduler()
+    return (
+        quota_scheduler is None
+        or quota_scheduler.remaining_today() > config["SAM_WATCHLIST_QUOTA_RESERVE"]
+    )
+
+
+@click.command("watchlist-add")
+@click.argument("ueis", nargs=-1, required=True)
+@with_appcontext
+def watchlist_add_command(ueis):
+    """Watch SAM UEIs."""
+    try:
+        added = get_watchlist().add(ueis)
+    except ValueError as error:
+        raise click.BadParameter(str(error)) from error
+    click.echo(f"Added {added} UEIs to the watchlist")
+
+
+@click.command("watchlist-remove")
+@click.argument("ueis", nargs=-1, required=True)
+@with_appcontext
+def watchlist_remove_command(ueis):
+    """Stop watching SAM UEIs."""
+    click.echo(f"Removed {get_watchlist().remove(ueis)} UEIs from the watchlist")
+
+
+@click.command("monitor-watchlist")
+@click.option("--once", is_flag=True, help="Check one batch and exit.")
+@with_appcontext
+def monitor_watchlist_command(once):
+    """Re-check the watchlist in the background, within the SAM quota."""
+    watchlist = get_watchlist()
+    if not once:
+        run_monitor(watchlist)
+        return
+    result = check_next_batch(watchlist)
+    if result is None:
+        click.echo("No UEIs checked: none are due or the SAM budget is used")
+        return
+    checked, notifications = result
+    click.echo(f"Checked {checked} UEIs, {notifications} notifications")
+
+
+@click.command("watchlist-notifications")
+@click.option("--mark-delivered", is_flag=True, help="Remove them from the outbox.")
+@click.option("--limit", default=100, show_default=True)
+@with_appcontext
+def watchlist_notifications_command(mark_delivered, limit):
+    """Print the undelivered watchlist notifications as JSON lines."""
+    watchlist = get_watchlist()
+    notifications = watchlist.get_notifications(limit)
+    for notification in notifications:
+        click.echo(json.dumps(notification))
+    if mark_delivered:
+        watchlist.mark_delivered(notification["id"] for notification in notifications)
+
+
+def init_app(app):
+    """Attach the watchlist. The database defaults to instance/watchlist.sqlite3.
+
+    Args:
+        app (flask app): the Sam Tool application
+    """
+    database_path = app.config["SAM_WATCHLIST_DATABASE"]
+    if database_path is None:
+        os.makedirs(app.instance_path, exist_ok=True)
+        database_path = os.path.join(app.instance_path, "watchlist.sqlite3")
+    app.extensions[_EXTENSION_NAME] = Watchlist(database_path)
+
+
+def get_watchlist():
+    """The watchlist of the current application
+
+    Returns:
+        Watchlist: or None if the application was created without one
+    """
+    return current_app.extensions.get(_EXTENSION_NAME)
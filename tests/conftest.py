@@ -0,0 +1,135 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+
+"""Fakes, SAM entity factories and fixtures shared by the tests"""
+
+import json
+
+import pytest
+from flask import Flask
+
+
+class FakeClock:
+    """A clock that only moves when a test moves it, usable as sleep too"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeSamResponse:
+    """A successful SAM Entities API response of some entities"""
+
+    ok = True
+    status_code = 200
+    url = "https://api.sam.gov/entity-information/v3/entities"
+
+    class request:
+        body = None
+
+    def __init__(self, entities):
+        self._data = {"entityData": entities, "totalRecords": len(entities)}
+
+    def json(self):
+        return self._data
+
+    def iter_content(self, chunk_size):
+        body = json.dumps(self._data).encode("utf-8")
+        for start in range(0, len(body), chunk_size):
+            yield body[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def sam_entity(
+    uei_sam="K3B5JE3ZS915",
+    answers=("No", "No"),
+    status="Active",
+    exclusions="N",
+    eft=None,
+    **registration,
+):
+    """A SAM entity with its 52.204-26 answers. An answer of None is left out.
+
+    Args:
+        uei_sam (str, optional):
+        answers (tuple, optional): the c.1 and c.2 answerText
+        status (str, optional): registrationStatus
+        exclusions (str, optional): exclusionStatusFlag
+        eft (str, optional): entityEFTIndicator
+        **registration: other entityRegistration fields, for example cageCode
+
+    Returns:
+        dict:
+    """
+    list_of_answers = [
+        {"section": section, "answerText": answer}
+        for section, answer in zip(("52.204-26.c.1", "52.204-26.c.2"), answers)
+        if answer is not None
+    ]
+    return {
+        "entityRegistration": {
+            "ueiSAM": uei_sam,
+            "entityEFTIndicator": eft,
+            "registrationStatus": status,
+            "exclusionStatusFlag": exclusions,
+            **registration,
+        },
+        "coreData": {},
+        "repsAndCerts": {
+            "certifications": {
+                "fARResponses": [
+                    {"provisionId": "FAR 52.204-26", "listOfAnswers": list_of_answers}
+                ]
+            }
+        },
+    }
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def app_config():
+    """The config of the app_context application, overridden by the test modules"""
+    return {}
+
+
+@pytest.fixture
+def app_extensions():
+    """The init_app functions run on the app_context application"""
+    return ()
+
+
+@pytest.fixture
+def app_context(app_config, app_extensions):
+    app = Flask(__name__)
+    app.config.update(app_config)
+    for init_app in app_extensions:
+        init_app(app)
+    with app.app_context():
+        yield app
@@ -0,0 +1,191 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from werkzeug.datastructures import ImmutableMultiDict
+
+from samtools.sam_api import (
+    async_entity_information,
+    circuit_breaker,
+    entity_information,
+    response_cache,
+)
+from samtools.sam_api.session import _reset_sam_session
+
+ENTITY = {
+    "entityRegistration": {
+        "ueiSAM": "K3B5JE3ZS915",
+        "cageCode": "1YES6",
+        "registrationStatus": "Active",
+        "exclusionStatusFlag": "N",
+    },
+    "coreData": {},
+    "repsAndCerts": {
+        "certifications": {
+            "fARResponses": [
+                {
+                    "provisionId": "FAR 52.204-26",
+                    "listOfAnswers": [
+                        {"section": "52.204-26.c.1", "answerText": "No"},
+                        {"section": "52.204-26.c.2", "answerText": "Yes"},
+                    ],
+                }
+            ]
+        }
+    },
+}
+
+
+@pytest.fixture
+def fake_sam_url():
+    received_queries = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            query = parse_qs(urlparse(self.path).query)
+            received_queries.append({**query, "X-api-key": self.headers["X-api-key"]})
+            status = 500 if "fail" in self.path else 200
+            body = json.dumps({"entityData": [ENTITY], "totalRecords": 1}).encode()
+            content_type = "application/json"
+            if "html" in self.path:
+                status, content_type = 503, "text/html"
+                body = b"<html><body>Service Unavailable</body></html>"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/entities", received_queries
+    server.shutdown()
+
+
+@pytest.fixture
+def app_config():
+    return dict(
+        SAM_API_KEY="test",
+        SAM_API_POOL_CONNECTIONS=1,
+        SAM_API_POOL_MAXSIZE=4,
+        SAM_API_KEEP_ALIVE=True,
+        SAM_API_CONNECT_TIMEOUT=5,
+        SAM_API_READ_TIMEOUT=5,
+        SAM_TRIM_REPS_AND_CERTS=False,
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_sam_session():
+    _reset_sam_session()
+    yield
+    _reset_sam_session()
+
+
+async def _search_async(search_args, sam_api_endpoint):
+    async with async_entity_information.create_client_session() as client_session:
+        return await async_entity_information._search_sam_async(
+            search_args, "http://host/", sam_api_endpoint, client_session
+        )
+
+
+class TestSearchSamAsync:
+    @staticmethod
+    def test_matches_sync_pipeline(app_context, fake_sam_url):
+        url, received_queries = fake_sam_url
+        search_args = ImmutableMultiDict(
+            [
+                ("samToolsSearch", "k3b5je3zs915"),
+                ("includeSections", "entityRegistration"),
+            ]
+        )
+        sync_response = entity_information._search_sam(search_args, "http://host/", url)
+        async_response = asyncio.run(_search_async(search_args, url))
+        assert async_response == sync_response
+        assert sorted(received_queries[0]["includeSections"]) == sorted(
+            received_queries[1]["includeSections"]
+        )
+
+    @staticmethod
+    def test_sam_error(app_context, fake_sam_url):
+        url, _ = fake_sam_url
+        response = asyncio.run(
+            _search_async(
+                ImmutableMultiDict([("samToolsSearch", "grainger")]), url + "/fail"
+            )
+        )
+        assert response == {
+            "success": False,
+            "errors": [entity_information.SAM_ERROR_MESSAGE],
+        }
+
+    @staticmethod
+    def test_html_outage_is_recorded_by_the_circuit_breaker(app_context, fake_sam_url):
+        url, _ = fake_sam_url
+        app_context.config.update(
+            SAM_CIRCUIT_FAILURE_THRESHOLD=5,
+            SAM_CIRCUIT_SLOW_CALL_SECONDS=10,
+            SAM_CIRCUIT_RESET_TIMEOUT=30,
+            SAM_CIRCUIT_HALF_OPEN_MAX_CALLS=1,
+        )
+        circuit_breaker.init_app(app_context)
+        response = asyncio.run(
+            _search_async(
+                ImmutableMultiDict([("samToolsSearch", "grainger")]), url + "/html"
+            )
+        )
+        assert response["success"] is False
+        stats = circuit_breaker.get_circuit_breaker().stats()
+        assert stats["consecutiveFailures"] == 1
+
+    @staticmethod
+    def test_api_key_keeps_its_own_cache_entry(app_context, fake_sam_url):
+        url, received_queries = fake_sam_url
+        app_context.config.update(
+            SAM_RESPONSE_CACHE_SIZE=8,
+            SAM_RESPONSE_CACHE_TTL=60,
+            SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=0,
+            SAM_RESPONSE_CACHE_STALE_IF_ERROR=0,
+            SAM_RESPONSE_CACHE_REFRESH_WORKERS=1,
+        )
+        response_cache.init_app(app_context)
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        own_key_args = ImmutableMultiDict(
+            [("samToolsSearch", "grainger"), ("api_key", "caller")]
+        )
+        for args in (own_key_args, search_args, own_key_args, search_args):
+            asyncio.run(_search_async(args, url))
+        assert [query["X-api-key"] for query in received_queries] == ["caller", "test"]
+        assert all("api_key" not in query for query in received_queries)
+
+    @staticmethod
+    def test_query_items_expand_sets():
+        assert async_entity_information._to_query_items(
+            {"includeSections": {"coreData", "entityRegistration"}, "page": 1}
+        ) == [
+            ("includeSections", "coreData"),
+            ("includeSections", "entityRegistration"),
+            ("page", "1"),
+        ]
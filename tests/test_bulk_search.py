@@ -0,0 +1,146 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import pytest
+
+from samtools.sam_api import bulk_search
+
+
+@pytest.fixture
+def app_config():
+    return dict(
+        SAM_BULK_MAX_IDENTIFIERS=10,
+        SAM_BULK_BATCH_SIZE=2,
+        SAM_BULK_CONCURRENCY=4,
+    )
+
+
+@pytest.fixture
+def sam_searches(monkeypatch):
+    searches = []
+
+    def fake_search_sam(search_args, host_url, sam_api_endpoint):
+        searches.append(search_args)
+        if "ueiSAM" in search_args:
+            ueis = search_args["ueiSAM"].strip("[]").split("~")
+            entities = [
+                {"entityRegistration": {"ueiSAM": uei}, "samToolsData": {}}
+                for uei in ueis
+            ]
+            if search_args.get("entityEFTIndicator") is None:
+                entities = [entity for entity in entities for _ in range(4)]
+            start = search_args.get("page", 0) * search_args["size"]
+            return {
+                "entityData": entities[start : start + search_args["size"]],
+                "totalRecords": len(entities),
+                "success": True,
+            }
+        if search_args.get("samToolsSearch") == "down":
+            raise ConnectionError("SAM is down")
+        return {"entityData": [], "totalRecords": 0, "success": True}
+
+    monkeypatch.setattr(bulk_search, "_search_sam", fake_search_sam)
+    return searches
+
+
+class TestGetBatches:
+    @staticmethod
+    def test_ueis_and_cage_codes_are_batched():
+        batches = bulk_search._get_batches(
+            ["K3B5JE3ZS915", "E2JQUCNKLE93", "YGZMMVQKVFH1", "1YES6", "grainger"], 2
+        )
+        assert [(name, len(members)) for name, members in batches] == [
+            (None, 1),
+            ("ueiSAM", 2),
+            ("ueiSAM", 1),
+            ("cageCode", 1),
+        ]
+
+
+class TestSearchSamV3Bulk:
+    @staticmethod
+    def test_one_result_per_identifier(app_context, sam_searches):
+        identifiers = ["K3B5JE3ZS915", "e2jqucnkle93", "YGZMMVQKVFH1", "grainger"]
+        results = list(
+            bulk_search.search_sam_v3_bulk(identifiers, {}, host_url="http://host/")
+        )
+        assert sorted(result["identifier"] for result in results) == sorted(identifiers)
+        assert len(sam_searches) == 3
+        for result in results:
+            if result["identifier"] == "e2jqucnkle93":
+                assert [
+                    entity["entityRegistration"]["ueiSAM"]
+                    for entity in result["entityData"]
+                ] == ["E2JQUCNKLE93"]
+
+    @staticmethod
+    def test_batched_search_args(app_context, sam_searches):
+        list(
+            bulk_search.search_sam_v3_bulk(
+                ["K3B5JE3ZS915", "E2JQUCNKLE93"],
+                {"includeSections": "samToolsData"},
+                host_url="http://host/",
+            )
+        )
+        assert sam_searches == [
+            {
+                "includeSections": "entityRegistration,samToolsData",
+                "entityEFTIndicator": "",
+                "ueiSAM": "[E2JQUCNKLE93~K3B5JE3ZS915]",
+                "size": 10,
+            }
+        ]
+
+    @staticmethod
+    def test_batches_larger_than_a_page_are_paged(app_context, sam_searches):
+        app_context.config["SAM_BULK_BATCH_SIZE"] = 3
+        identifiers = ["K3B5JE3ZS915", "E2JQUCNKLE93", "YGZMMVQKVFH1"]
+        results = list(
+            bulk_search.search_sam_v3_bulk(
+                identifiers, {"entityEFTIndicator": None}, host_url="http://host/"
+            )
+        )
+        assert [search.get("page", 0) for search in sam_searches] == [0, 1]
+        assert {
+            result["identifier"]: len(result["entityData"]) for result in results
+        } == {identifier: 4 for identifier in identifiers}
+
+    @staticmethod
+    def test_failed_search_does_not_stop_the_others(app_context, sam_searches):
+        results = list(
+            bulk_search.search_sam_v3_bulk(
+                ["down", "grainger"], {}, host_url="http://host/"
+            )
+        )
+        success = {result["identifier"]: result["success"] for result in results}
+        assert success == {"down": False, "grainger": True}
+
+    @staticmethod
+    def test_empty_identifier_is_not_searched(app_context, sam_searches):
+        results = list(
+            bulk_search.search_sam_v3_bulk([" "], {}, host_url="http://host/")
+        )
+        assert results[0]["success"] is False
+        assert sam_searches == []
+
+    @staticmethod
+    def test_too_many_identifiers(app_context, sam_searches):
+        with pytest.raises(ValueError):
+            list(
+                bulk_search.search_sam_v3_bulk(
+                    ["grainger"] * 11, {}, host_url="http://host/"
+                )
+            )
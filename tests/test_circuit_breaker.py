@@ -0,0 +1,133 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import pytest
+import requests
+from flask import Flask
+from werkzeug.datastructures import ImmutableMultiDict
+
+from samtools.sam_api import circuit_breaker, entity_information
+from samtools.sam_api.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _breaker(clock):
+    return CircuitBreaker(
+        failure_threshold=2, slow_call_seconds=5, reset_timeout=30, clock=clock
+    )
+
+
+def _timeout():
+    raise requests.Timeout("read timeout")
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.Timeout):
+            breaker.call(_timeout, is_failure=lambda result: False)
+
+
+class TestCircuitBreaker:
+    @staticmethod
+    def test_opens_after_consecutive_failures(clock):
+        breaker = _breaker(clock)
+        _trip(breaker)
+        assert breaker.state == circuit_breaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "ok", is_failure=lambda result: False)
+        assert breaker.stats()["rejected"] == 1
+
+    @staticmethod
+    def test_success_resets_failure_count(clock):
+        breaker = _breaker(clock)
+        with pytest.raises(requests.Timeout):
+            breaker.call(_timeout, is_failure=lambda result: False)
+        breaker.call(lambda: "ok", is_failure=lambda result: False)
+        with pytest.raises(requests.Timeout):
+            breaker.call(_timeout, is_failure=lambda result: False)
+        assert breaker.state == circuit_breaker.CLOSED
+
+    @staticmethod
+    def test_slow_calls_count_as_failures(clock):
+        breaker = _breaker(clock)
+
+        def slow_call():
+            clock.now += 6
+            return "ok"
+
+        breaker.call(slow_call, is_failure=lambda result: False)
+        breaker.call(slow_call, is_failure=lambda result: False)
+        assert breaker.state == circuit_breaker.OPEN
+
+    @staticmethod
+    def test_half_open_trial_closes_circuit(clock):
+        breaker = _breaker(clock)
+        _trip(breaker)
+        clock.now += 30
+        assert breaker.state == circuit_breaker.HALF_OPEN
+        breaker.call(lambda: "ok", is_failure=lambda result: False)
+        assert breaker.state == circuit_breaker.CLOSED
+
+    @staticmethod
+    def test_half_open_trial_failure_reopens_circuit(clock):
+        breaker = _breaker(clock)
+        _trip(breaker)
+        clock.now += 30
+        breaker.call(lambda: 503, is_failure=lambda status: status >= 500)
+        assert breaker.state == circuit_breaker.OPEN
+        assert breaker.stats()["timesOpened"] == 2
+
+    @staticmethod
+    def test_half_open_allows_limited_trial_calls(clock):
+        breaker = _breaker(clock)
+        _trip(breaker)
+        clock.now += 30
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+
+class TestSearchWithCircuitBreaker:
+    @staticmethod
+    def test_open_circuit_returns_sam_error_without_calling_sam(monkeypatch):
+        app = Flask(__name__)
+        app.config.update(
+            SAM_CIRCUIT_FAILURE_THRESHOLD=1,
+            SAM_CIRCUIT_SLOW_CALL_SECONDS=10,
+            SAM_CIRCUIT_RESET_TIMEOUT=30,
+            SAM_CIRCUIT_HALF_OPEN_MAX_CALLS=1,
+        )
+        circuit_breaker.init_app(app)
+        calls = []
+
+        def failing_call(sam_api_endpoint, search_parameters):
+            calls.append(search_parameters)
+            raise requests.ConnectionError("SAM is down")
+
+        monkeypatch.setattr(
+            entity_information, "_call_post_sam_entities_api", failing_call
+        )
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        with app.app_context():
+            with pytest.raises(requests.ConnectionError):
+                entity_information._search_sam(search_args, "http://host/", "endpoint")
+            response = entity_information._search_sam(
+                search_args, "http://host/", "endpoint"
+            )
+        assert response == {
+            "success": False,
+            "errors": [entity_information.SAM_ERROR_MESSAGE],
+        }
+        assert len(calls) == 1
@@ -0,0 +1,134 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import itertools
+
+import pytest
+
+from samtools.sam_api.compliance_batch import evaluate_many
+from samtools.sam_api.entity_information import DataAdaptors, _is_entity_selectable
+
+
+def _entity(answers, exclusion_flag, registration_status):
+    entity = {"entityRegistration": {}}
+    if exclusion_flag is not None:
+        entity["entityRegistration"]["exclusionStatusFlag"] = exclusion_flag
+    if registration_status is not None:
+        entity["entityRegistration"]["registrationStatus"] = registration_status
+    if answers is not None:
+        entity["repsAndCerts"] = {
+            "certifications": {
+                "fARResponses": [
+                    {"provisionId": "FAR 52.209-2", "listOfAnswers": []},
+                    {
+                        "provisionId": "FAR 52.204-26",
+                        "listOfAnswers": [
+                            {"section": "52.204-26.c.2", "answerText": answers[1]},
+                            {"section": "52.204-26.c.1", "answerText": answers[0]},
+                        ],
+                    },
+                ]
+            }
+        }
+    return entity
+
+
+ENTITIES = [
+    _entity(answers, exclusion_flag, registration_status)
+    for answers, exclusion_flag, registration_status in itertools.product(
+        [None, ("No", "No"), ("YES", "no"), ("No", "Yes"), ("Yes", "Yes")],
+        [None, "N", "Y", "D"],
+        [None, "Active", "Expired"],
+    )
+] + [{}, {"repsAndCerts": {}}]
+
+
+def _evaluate_one(entity):
+    data_adaptors = DataAdaptors()
+    eight_eight_nine = data_adaptors.adapt_sam_response_to_889_compliance(entity)
+    exclusions = data_adaptors.adapt_sam_response_to_exclusions(entity)
+    registration = data_adaptors.adapt_sam_response_to_registration_status(entity)
+    return (
+        eight_eight_nine.is_compliant,
+        eight_eight_nine.status_text,
+        eight_eight_nine.far_provision_date,
+        exclusions.has_exclusions,
+        registration.is_active,
+        _is_entity_selectable(
+            eight_eight_nine.is_compliant,
+            exclusions.has_exclusions,
+            registration.is_active,
+        ),
+    )
+
+
+class TestEvaluateMany:
+    @staticmethod
+    def test_identical_to_per_entity_adaptors():
+        columns = evaluate_many(ENTITIES)
+        assert list(
+            zip(
+                columns["isCompliant"],
+                columns["statusText"],
+                columns["farProvisionDate"],
+                columns["hasExclusions"],
+                columns["isActive"],
+                columns["isSelectable"],
+            )
+        ) == [_evaluate_one(entity) for entity in ENTITIES]
+
+    @staticmethod
+    def test_accepts_generators():
+        columns = evaluate_many(entity for entity in ENTITIES[:3])
+        assert len(columns["isSelectable"]) == 3
+
+    @staticmethod
+    def test_no_entities():
+        assert evaluate_many([]) == {
+            "isCompliant": [],
+            "statusText": [],
+            "farProvisionDate": [],
+            "hasExclusions": [],
+            "isActive": [],
+            "isSelectable": [],
+            "answers": [],
+        }
+
+    @staticmethod
+    def test_incomplete_far_responses():
+        without_c2 = _entity(("No", "No"), "N", "Active")
+        far52_204_26 = without_c2["repsAndCerts"]["certifications"]["fARResponses"][1]
+        far52_204_26["listOfAnswers"].pop(0)
+        without_far52_204_26 = _entity(("No", "No"), "N", "Active")
+        without_far52_204_26["repsAndCerts"]["certifications"]["fARResponses"].pop()
+        entities = [without_c2, without_far52_204_26]
+        columns = evaluate_many(entities)
+        assert columns["statusText"] == [
+            "OUTDATED FAR (No part (C)(2))",
+            "NO REPS & CERTS",
+        ]
+        assert columns["answers"] == [("DOES NOT", None), (None, None)]
+        assert list(zip(*list(columns.values())[:6])) == [
+            _evaluate_one(entity) for entity in entities
+        ]
+
+    @staticmethod
+    def test_unreadable_answers_raise_like_the_adaptors():
+        entity = _entity(("No", "N/A"), "N", "Active")
+        with pytest.raises(KeyError):
+            _evaluate_one(entity)
+        with pytest.raises(KeyError):
+            evaluate_many([entity])
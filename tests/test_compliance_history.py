@@ -0,0 +1,146 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import pytest
+
+from samtools.sam_api import compliance_history, entity_information
+from samtools.sam_api.compliance_history import ComplianceHistory, parse_time
+from samtools.sam_api.entity_information import DataAdaptors
+from tests.conftest import sam_entity
+
+
+def _adapt(*entities):
+    return entity_information._adapt_sam_entities(
+        {"entityData": list(entities), "totalRecords": len(entities)},
+        {"includeSections": {"entityRegistration"}},
+        "http://host",
+        DataAdaptors(),
+    )["entityData"]
+
+
+@pytest.fixture
+def app_config():
+    return dict(SAM_COMPLIANCE_HISTORY=False)
+
+
+@pytest.fixture
+def clock(clock):
+    clock.now = 1664800000.0
+    return clock
+
+
+@pytest.fixture
+def history(tmp_path, clock):
+    return ComplianceHistory(tmp_path / "compliance_history.sqlite3", clock=clock)
+
+
+class TestComplianceHistory:
+    @staticmethod
+    def test_only_changes_are_recorded(app_context, history, clock):
+        assert history.record(_adapt(sam_entity())) == 1
+        clock.now += 60
+        assert history.record(_adapt(sam_entity())) == 0
+        clock.now += 60
+        assert history.record(_adapt(sam_entity(answers=("No", "Yes")))) == 1
+        assert history.stats() == {
+            "rows": 2,
+            "recorded": 2,
+            "unchanged": 1,
+            "failures": 0,
+        }
+
+        timeline = history.get_timeline("k3b5je3zs915")
+        assert [status["eightEightNine"]["statusText"] for status in timeline] == [
+            "COMPLIANT",
+            "USES COVERED TELECOMMUNICATIONS",
+        ]
+        assert timeline[1]["recordedAt"] == "2022-10-03T12:28:40Z"
+        assert timeline[1]["isSelectable"] is False
+
+    @staticmethod
+    def test_changes_since(app_context, history, clock):
+        history.record(_adapt(sam_entity(), sam_entity("QJ8GDNZ7RMC5")))
+        clock.now += 3600
+        history.record(_adapt(sam_entity(exclusions="Y"), sam_entity("QJ8GDNZ7RMC5")))
+        changes = history.get_changes(since=clock.now - 60)
+        assert len(changes) == 1
+        assert changes[0]["ueiSAM"] == "K3B5JE3ZS915"
+        assert changes[0]["exclusions"] == {"hasExclusions": True, "statusText": "Yes"}
+        assert changes[0]["previous"]["exclusions"]["hasExclusions"] is False
+        assert history.get_changes(since=clock.now + 1) == []
+
+    @staticmethod
+    def test_changes_are_paged(app_context, history, clock):
+        ueis = [f"AAAAAAAAAA{number:02d}" for number in range(5)]
+        history.record(_adapt(*(sam_entity(uei) for uei in ueis)))
+        history.record(_adapt(*(sam_entity(uei, exclusions="Y") for uei in ueis)))
+        first_page = history.get_changes(since=0, limit=3)
+        second_page = history.get_changes(
+            since=0, limit=3, after_id=first_page[-1]["id"]
+        )
+        assert [change["ueiSAM"] for change in first_page + second_page] == ueis
+
+    @staticmethod
+    def test_child_entities_have_their_own_timeline(app_context, history):
+        history.record(_adapt(sam_entity(), sam_entity(eft="0001", exclusions="Y")))
+        assert len(history.get_timeline("K3B5JE3ZS915")) == 1
+        child = history.get_timeline("K3B5JE3ZS915", "0001")
+        assert child[0]["entityEFTIndicator"] == "0001"
+        assert child[0]["exclusions"]["hasExclusions"] is True
+
+    @staticmethod
+    def test_entities_without_sam_tools_data_are_ignored(history):
+        assert history.record([{"entityRegistration": {"ueiSAM": "X"}}, {}]) == 0
+
+
+class TestSearchRecordsHistory:
+    @staticmethod
+    def test_adapted_entities_are_recorded(app_context, tmp_path):
+        app_context.config.update(
+            SAM_COMPLIANCE_HISTORY=True,
+            SAM_COMPLIANCE_HISTORY_DATABASE=str(tmp_path / "history.sqlite3"),
+        )
+        compliance_history.init_app(app_context)
+        _adapt(sam_entity())
+        _adapt(sam_entity())
+        history = compliance_history.get_compliance_history()
+        assert history.stats()["rows"] == 1
+
+    @staticmethod
+    def test_disabled_by_default(app_context):
+        compliance_history.init_app(app_context)
+        assert compliance_history.get_compliance_history() is None
+        assert _adapt(sam_entity())[0]["samToolsData"]["isSelectable"] is True
+
+
+class TestParseTime:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "value, unix_time",
+        [
+            ("2022-10-03", 1664755200),
+            ("2022-10-03T12:00:00Z", 1664798400),
+            ("2022-10-03T14:00:00+02:00", 1664798400),
+        ],
+    )
+    def test_parse(value, unix_time):
+        assert parse_time(value) == unix_time
+
+    @staticmethod
+    @pytest.mark.parametrize("value", ["", "yesterday", "2022-13-01"])
+    def test_invalid(value):
+        with pytest.raises(ValueError):
+            parse_time(value)
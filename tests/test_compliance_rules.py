@@ -14,6 +14,10 @@
 # the License.
 # ------------------------------------------------------------------------------
 
+import copy
+import itertools
+import json
+
 import pytest
 
 from samtools.compliance import compliance_rules
@@ -257,3 +261,148 @@ class TestEightEightNineDoesNotProvideAndNoC2:
 
     def test_far_text_c2(self, entity_does_not_provide_and_no_c2):
         assert entity_does_not_provide_and_no_c2.far["52.204-26.c.2"]["text"] is None
+
+
+class TestEightEightNineSharedData:
+    def test_objects_have_no_instance_dict(self, compliant_entity):
+        assert not hasattr(compliant_entity, "__dict__")
+
+    def test_far_texts_are_shared_and_read_only(self, compliant_entity):
+        other = compliance_rules.EightEightNine()
+        other.set_far("52.204-26.c.1", "no")
+        c1 = compliant_entity.far["52.204-26.c.1"]
+        assert c1 is other.far["52.204-26.c.1"]
+        with pytest.raises(TypeError):
+            c1["answer"] = "DOES"
+
+    def test_set_far_unknown_provision(self, empty_entity):
+        with pytest.raises(ValueError):
+            empty_entity.set_far("52.204-25.d", "No")
+
+    def test_c2_without_c1(self, empty_entity):
+        empty_entity.set_far("52.204-26.c.2", "Yes")
+        assert empty_entity.status_text == "USES COVERED TELECOMMUNICATIONS"
+        assert empty_entity.far_provision_date is None
+
+
+def _hard_coded_verdict(c1_answer, c2_answer):
+    """The if-chain EightEightNine used before the rules moved to compliance_rules.json"""
+    has_c1, has_c2 = c1_answer is not None, c2_answer is not None
+    is_compliant = has_c1 and has_c2 and c1_answer == c2_answer == "DOES NOT"
+    if is_compliant:
+        status_text = "COMPLIANT"
+    elif not has_c1 and not has_c2:
+        status_text = "NO REPS & CERTS"
+    elif not has_c2:
+        status_text = "OUTDATED FAR (No part (C)(2))"
+    elif c1_answer == "DOES" and c2_answer == "DOES":
+        status_text = "PROVIDES AND USES COVERED TELECOMMUNICATIONS"
+    elif c1_answer == "DOES":
+        status_text = "PROVIDES COVERED TELECOMMUNICATIONS"
+    elif c2_answer == "DOES":
+        status_text = "USES COVERED TELECOMMUNICATIONS"
+    else:
+        status_text = "UNSPECIFIED"
+    if has_c1 and not has_c2:
+        far_provision_date = "DEC 2019"
+    elif has_c1 and has_c2:
+        far_provision_date = "OCT 2020"
+    else:
+        far_provision_date = None
+    elaborated = status_text if is_compliant else f"NONCOMPLIANT - {status_text}"
+    return is_compliant, status_text, elaborated, far_provision_date
+
+
+@pytest.fixture
+def rules_definition():
+    with open(compliance_rules.RULES_FILE, encoding="utf-8") as rules_file:
+        return json.load(rules_file)
+
+
+@pytest.fixture
+def restore_rules():
+    rules = compliance_rules.get_rules()
+    yield
+    compliance_rules.use_rules(rules)
+
+
+class TestCompiledRules:
+    def test_verdicts_identical_to_hard_coded_rules(self):
+        answers = [None, "No", "Yes"]
+        for c1_answer, c2_answer in itertools.product(answers, repeat=2):
+            compliance = compliance_rules.EightEightNine()
+            if c1_answer is not None:
+                compliance.set_far("52.204-26.c.1", c1_answer)
+            if c2_answer is not None:
+                compliance.set_far("52.204-26.c.2", c2_answer)
+            assert (
+                compliance.is_compliant,
+                compliance.status_text,
+                compliance.elaborated_status_text,
+                compliance.far_provision_date,
+            ) == _hard_coded_verdict(
+                *(compliance.far[section]["answer"] for section in compliance.far)
+            )
+
+    def test_selectable_identical_to_hard_coded_rule(self):
+        rules = compliance_rules.get_rules()
+        for flags in itertools.product([False, True], repeat=3):
+            is_compliant, has_exclusions, is_active = flags
+            assert rules.is_selectable(*flags) is bool(
+                is_compliant and not has_exclusions and is_active
+            )
+
+    def test_tables_are_read_only(self):
+        with pytest.raises(TypeError):
+            compliance_rules.get_rules().verdicts[None, None] = (True,)
+
+    def test_first_matching_rule_applies(self, rules_definition):
+        rules_definition["statusText"].insert(
+            0, {"when": {"52.204-26.c.2": "DOES"}, "statusText": "USES"}
+        )
+        rules = compliance_rules.compile_rules(rules_definition)
+        assert rules.verdicts["DOES", "DOES"][1] == "USES"
+        assert rules.verdicts["DOES", "DOES NOT"][1] == (
+            "PROVIDES COVERED TELECOMMUNICATIONS"
+        )
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda definition: definition["statusText"].pop(),
+            lambda definition: definition["farProvisionDate"][0]["when"].update(
+                {"52.204-26.c.3": None}
+            ),
+            lambda definition: definition["statusText"][0]["when"].update(
+                {"52.204-26.c.1": "No"}
+            ),
+            lambda definition: definition["isSelectable"].update({"isExcluded": False}),
+            lambda definition: definition.pop("elaboratedStatusText"),
+            lambda definition: definition.update({"statusText": [None]}),
+            lambda definition: definition["elaboratedStatusText"].update(
+                {"noncompliant": "NONCOMPLIANT - {0}"}
+            ),
+            lambda definition: definition["elaboratedStatusText"].update(
+                {"compliant": "{statusText[0][1]}"}
+            ),
+            lambda definition: definition["elaboratedStatusText"].update(
+                {"compliant": "{statusText:d}"}
+            ),
+            lambda definition: definition["elaboratedStatusText"].update(
+                {"compliant": 1}
+            ),
+        ],
+    )
+    def test_malformed_rules(self, rules_definition, change):
+        change(rules_definition)
+        with pytest.raises(ValueError):
+            compliance_rules.compile_rules(rules_definition)
+
+    def test_objects_keep_their_rules(self, rules_definition, restore_rules):
+        before = compliance_rules.EightEightNine()
+        definition = copy.deepcopy(rules_definition)
+        definition["statusText"][1]["statusText"] = "NO REPRESENTATIONS"
+        compliance_rules.use_rules(compliance_rules.compile_rules(definition))
+        after = compliance_rules.EightEightNine()
+        assert before.status_text == "NO REPS & CERTS"
+        assert after.status_text == "NO REPRESENTATIONS"
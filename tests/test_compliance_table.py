@@ -0,0 +1,190 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import pytest
+from flask import Flask
+
+from samtools.sam_api import compliance_table, entity_index
+from samtools.sam_api.compliance_table import (
+    ComplianceTable,
+    build_compliance_table,
+    pack_compliance_status,
+    unpack_compliance_status,
+)
+from samtools.sam_api.entity_index import EntityIndex
+from samtools.sam_api.entity_information import DataAdaptors, _is_entity_selectable
+from tests.conftest import sam_entity
+
+
+ENTITIES = [
+    sam_entity("K3B5JE3ZS915"),
+    sam_entity("QJ8GDNZ7RMC5", answers=("Yes", "No")),
+    sam_entity("ZQGGHJH74DW7", exclusions="Y"),
+    sam_entity("MN3JLNDKKH38", status="Expired"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = EntityIndex(tmp_path / "entity_index.sqlite3")
+    index.replace_all(
+        ENTITIES + [sam_entity("K3B5JE3ZS915", answers=("Yes", "No"), eft="0001")],
+        source="extract",
+        as_of="2022-10-02",
+    )
+    return index
+
+
+@pytest.fixture
+def table_path(tmp_path, index):
+    path = str(tmp_path / "compliance_table.bin")
+    build_compliance_table(index, path)
+    return path
+
+
+class TestComplianceStatus:
+    @staticmethod
+    @pytest.mark.parametrize("entity", ENTITIES + [{"entityRegistration": {}}])
+    def test_matches_sam_tools_data(entity):
+        data_adaptors = DataAdaptors()
+        eight_eight_nine = data_adaptors.adapt_sam_response_to_889_compliance(entity)
+        exclusions = data_adaptors.adapt_sam_response_to_exclusions(entity)
+        registration = data_adaptors.adapt_sam_response_to_registration_status(entity)
+
+        status = unpack_compliance_status("UEI", pack_compliance_status(entity))
+        assert status["isSelectable"] == _is_entity_selectable(
+            eight_eight_nine.is_compliant,
+            exclusions.has_exclusions,
+            registration.is_active,
+        )
+        assert status["eightEightNine"] == {
+            "isCompliant": eight_eight_nine.is_compliant,
+            "farProvisionDate": eight_eight_nine.far_provision_date,
+            "answers": {
+                provision_id: eight_eight_nine.far[provision_id]["answer"]
+                for provision_id in ("52.204-26.c.1", "52.204-26.c.2")
+            },
+        }
+        assert status["exclusions"]["hasExclusions"] == exclusions.has_exclusions
+        assert status["registration"]["isActive"] == registration.is_active
+
+    @staticmethod
+    def test_incomplete_far_responses():
+        entity = sam_entity("K3B5JE3ZS915")
+        entity["repsAndCerts"]["certifications"]["fARResponses"] = []
+        status = unpack_compliance_status("UEI", pack_compliance_status(entity))
+        assert status["eightEightNine"]["answers"]["52.204-26.c.1"] is None
+        assert not status["isSelectable"]
+
+
+class TestComplianceTable:
+    @staticmethod
+    def test_lookup(table_path):
+        table = ComplianceTable(table_path)
+        assert table.find("k3b5je3zs915")["isSelectable"] is True
+        assert table.find("QJ8GDNZ7RMC5")["eightEightNine"]["answers"] == {
+            "52.204-26.c.1": "DOES",
+            "52.204-26.c.2": "DOES NOT",
+        }
+        assert table.find("ZQGGHJH74DW7")["exclusions"]["hasExclusions"] is True
+        assert table.find("MN3JLNDKKH38")["registration"]["isActive"] is False
+        assert table.find("AAAAAAAAAAA1") is None
+        assert table.find("TOO-LONG-FOR-A-UEI") is None
+        assert table.stats() == {
+            "entities": 4,
+            "slots": 16,
+            "highWaterMark": "2022-10-02",
+            "hits": 4,
+            "misses": 2,
+        }
+
+    @staticmethod
+    def test_missing_file(tmp_path):
+        table = ComplianceTable(tmp_path / "missing.bin")
+        assert table.find("K3B5JE3ZS915") is None
+        assert table.stats()["entities"] == 0
+
+    @staticmethod
+    def test_many_entities_collide_and_probe(tmp_path):
+        index = EntityIndex(tmp_path / "many.sqlite3")
+        ueis = [f"U{number:010d}1" for number in range(1000)]
+        index.replace_all((sam_entity(uei_sam) for uei_sam in ueis), source="many")
+        path = str(tmp_path / "many.bin")
+        assert build_compliance_table(index, path) == 1000
+        table = ComplianceTable(path)
+        assert all(table.find(uei_sam)["isSelectable"] for uei_sam in ueis)
+        assert table.stats()["slots"] == 2048
+
+    @staticmethod
+    def test_batches_match_per_entity_status(tmp_path, monkeypatch):
+        monkeypatch.setattr(compliance_table, "_BUILD_BATCH_SIZE", 3)
+        entities = ENTITIES + [
+            sam_entity("U00000000001", answers=("Yes", "Yes")),
+            sam_entity("U00000000002", answers=("No", "N/A")),
+            sam_entity("U00000000003", answers=("No", None)),
+        ]
+        index = EntityIndex(tmp_path / "batches.sqlite3")
+        index.replace_all(entities, source="batches")
+        path = str(tmp_path / "batches.bin")
+        assert build_compliance_table(index, path) == len(entities)
+        table = ComplianceTable(path)
+        for entity in entities:
+            uei_sam = entity["entityRegistration"]["ueiSAM"]
+            assert table.find(uei_sam) == unpack_compliance_status(
+                uei_sam, pack_compliance_status(entity)
+            )
+
+    @staticmethod
+    def test_rebuilt_table_is_picked_up(table_path, index):
+        now = [0.0]
+        table = ComplianceTable(table_path, check_interval=1.0, clock=lambda: now[0])
+        assert table.find("MN3JLNDKKH38") is not None
+
+        index.apply_delta(
+            [{"samExtractCode": "1", "entityRegistration": {"ueiSAM": "MN3JLNDKKH38"}}],
+            source="delta",
+            as_of="2022-10-03",
+        )
+        build_compliance_table(index, table_path)
+        assert table.find("MN3JLNDKKH38") is not None
+        now[0] = 1.0
+        assert table.find("MN3JLNDKKH38") is None
+        assert table.stats()["highWaterMark"] == "2022-10-03"
+
+
+class TestComplianceEndpoint:
+    @staticmethod
+    def test_endpoint(tmp_path, table_path):
+        app = Flask(__name__)
+        app.config.update(
+            SAM_ENTITY_INDEX_DATABASE=str(tmp_path / "entity_index.sqlite3"),
+            SAM_ENTITY_INDEX_NAME_SEARCH=False,
+            SAM_COMPLIANCE_TABLE=table_path,
+        )
+        entity_index.init_app(app)
+        compliance_table.init_app(app)
+
+        @app.route("/api/compliance/<uei_sam>")
+        def compliance(uei_sam):
+            status = compliance_table.get_compliance_table().find(uei_sam)
+            if status is None:
+                return {"success": False, "errors": ["404 Not Found"]}, 404
+            return {**status, "success": True}
+
+        client = app.test_client()
+        response = client.get("/api/compliance/K3B5JE3ZS915")
+        assert response.json["success"] and response.json["isSelectable"]
+        assert client.get("/api/compliance/AAAAAAAAAAA1").status_code == 404
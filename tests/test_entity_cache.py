@@ -0,0 +1,161 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+
+import pytest
+from werkzeug.datastructures import ImmutableMultiDict
+
+from samtools.sam_api import entity_cache, entity_information
+from samtools.sam_api.entity_cache import EntityCache
+from tests.conftest import FakeSamResponse, sam_entity
+
+
+@pytest.fixture
+def app_config():
+    return dict(
+        SAM_ENTITY_CACHE_SIZE=8,
+        SAM_ENTITY_CACHE_MAX_AGE=60,
+        SAM_TRIM_REPS_AND_CERTS=False,
+    )
+
+
+@pytest.fixture
+def app_extensions():
+    return (entity_cache.init_app,)
+
+
+class TestEntityCache:
+    @staticmethod
+    def test_find_by_uei_and_eft_indicator():
+        cache = EntityCache(max_size=8, max_age=60)
+        entity = sam_entity(cageCode="1YES6")
+        cache.add(entity)
+        assert (
+            cache.find({"ueiSAM": "k3b5je3zs915", "entityEFTIndicator": ""}) is entity
+        )
+
+    @staticmethod
+    def test_uei_without_eft_indicator_is_not_answered():
+        cache = EntityCache(max_size=8, max_age=60)
+        cache.add(sam_entity(cageCode="1YES6"))
+        assert cache.find({"ueiSAM": "K3B5JE3ZS915"}) is None
+
+    @staticmethod
+    def test_child_entity_does_not_match_parent_lookup():
+        cache = EntityCache(max_size=8, max_age=60)
+        cache.add(sam_entity(cageCode="1YES6", eft="0001"))
+        assert cache.find({"ueiSAM": "K3B5JE3ZS915", "entityEFTIndicator": ""}) is None
+
+    @staticmethod
+    def test_find_by_cage_code():
+        cache = EntityCache(max_size=8, max_age=60)
+        entity = sam_entity(cageCode="1YES6")
+        cache.add(entity)
+        assert cache.find({"cageCode": "1yes6"}) is entity
+
+    @staticmethod
+    def test_child_entity_does_not_replace_parent_cage_code():
+        cache = EntityCache(max_size=8, max_age=60)
+        parent = sam_entity(cageCode="1YES6")
+        child = sam_entity(cageCode="1YES6", eft="0001")
+        cache.add(parent)
+        cache.add(child)
+        assert cache.find({"cageCode": "1YES6"}) is parent
+        assert cache.find({"cageCode": "1YES6", "entityEFTIndicator": ""}) is parent
+        assert cache.find({"cageCode": "1YES6", "entityEFTIndicator": "0001"}) is child
+
+    @staticmethod
+    def test_other_filters_are_not_answered():
+        cache = EntityCache(max_size=8, max_age=60)
+        cache.add(sam_entity(cageCode="1YES6"))
+        assert cache.find({"cageCode": "1YES6", "registrationStatus": "A"}) is None
+
+    @staticmethod
+    def test_old_records_are_not_used():
+        cache = EntityCache(max_size=8, max_age=-1)
+        cache.add(sam_entity(cageCode="1YES6"))
+        assert cache.find({"cageCode": "1YES6"}) is None
+
+
+class TestSearchFillsEntityCache:
+    @staticmethod
+    def test_pdf_lookup_after_search(app_context, monkeypatch):
+        monkeypatch.setattr(
+            entity_information,
+            "_call_post_sam_entities_api",
+            lambda endpoint, parameters: FakeSamResponse(
+                [sam_entity(cageCode="1YES6")]
+            ),
+        )
+        entity_information._search_sam(
+            ImmutableMultiDict([("samToolsSearch", "1yes6")]),
+            "http://host/",
+            "endpoint",
+        )
+        entity = entity_information.find_cached_entity(
+            ImmutableMultiDict([("ueiSAM", "K3B5JE3ZS915"), ("entityEFTIndicator", "")])
+        )
+        assert entity["samToolsData"]["eightEightNine"]["isCompliant"] is True
+        assert "repsAndCerts" in entity
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "extra_args", [[("samToolsNoCache", "true")], [("api_key", "caller")]]
+    )
+    def test_pdf_lookup_can_bypass_the_cache(app_context, monkeypatch, extra_args):
+        monkeypatch.setattr(
+            entity_information,
+            "_call_post_sam_entities_api",
+            lambda endpoint, parameters: FakeSamResponse(
+                [sam_entity(cageCode="1YES6")]
+            ),
+        )
+        entity_information._search_sam(
+            ImmutableMultiDict([("samToolsSearch", "1yes6")]),
+            "http://host/",
+            "endpoint",
+        )
+        search_args = [("ueiSAM", "K3B5JE3ZS915"), ("entityEFTIndicator", "")]
+        assert entity_information.find_cached_entity(ImmutableMultiDict(search_args))
+        assert (
+            entity_information.find_cached_entity(
+                ImmutableMultiDict(search_args + extra_args)
+            )
+            is None
+        )
+
+    @staticmethod
+    def test_search_with_own_api_key_is_not_cached(app_context, monkeypatch):
+        monkeypatch.setattr(
+            entity_information,
+            "_call_post_sam_entities_api",
+            lambda endpoint, parameters: FakeSamResponse(
+                [sam_entity(cageCode="1YES6")]
+            ),
+        )
+        entity_information._search_sam(
+            ImmutableMultiDict([("samToolsSearch", "1yes6"), ("api_key", "caller")]),
+            "http://host/",
+            "endpoint",
+        )
+        assert (
+            entity_information.find_cached_entity(
+                ImmutableMultiDict(
+                    [("ueiSAM", "K3B5JE3ZS915"), ("entityEFTIndicator", "")]
+                )
+            )
+            is None
+        )
@@ -0,0 +1,588 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import gzip
+import json
+import zipfile
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import ImmutableMultiDict
+
+from samtools.sam_api import entity_index, entity_information, prefetch, response_cache
+from samtools.sam_api.entity_index import EntityIndex
+from samtools.sam_api.extract_ingestion import (
+    apply_delta,
+    apply_entity_deltas_command,
+    ingest_entity_extract_command,
+    ingest_extract,
+)
+from tests.conftest import sam_entity
+
+
+def _entity(
+    uei_sam,
+    cage_code,
+    eft_indicator=None,
+    status="Active",
+    purpose="Z2",
+    legal_business_name=None,
+    dba_name=None,
+):
+    entity = sam_entity(
+        uei_sam,
+        status=status,
+        eft=eft_indicator,
+        cageCode=cage_code,
+        legalBusinessName=legal_business_name or f"Vendor {uei_sam}",
+        dbaName=dba_name,
+        purposeOfRegistrationCode=purpose,
+    )
+    entity["repsAndCerts"]["certifications"]["fARResponses"].append(
+        {"provisionId": "FAR 52.209-2", "listOfAnswers": []}
+    )
+    return entity
+
+
+EXTRACT_ENTITIES = [
+    _entity("K3B5JE3ZS915", "1YES6"),
+    _entity("K3B5JE3ZS915", "1YES6", eft_indicator="0001"),
+    _entity("QJ8GDNZ7RMC5", "7ABC1", status="Expired", purpose="Z1"),
+    _entity("MN3JLNDKKH38", None),
+]
+
+
+@pytest.fixture
+def extract_path(tmp_path):
+    path = tmp_path / "SAM_PUBLIC_MONTHLY_V2_20221002.json.gz"
+    with gzip.open(path, "wt") as extract_file:
+        json.dump(
+            {"totalRecords": len(EXTRACT_ENTITIES), "entityData": EXTRACT_ENTITIES},
+            extract_file,
+        )
+    return str(path)
+
+
+def _write_delta(tmp_path, date, entities):
+    path = tmp_path / f"SAM_PUBLIC_UTF-8_DAILY_V2_{date}.json"
+    path.write_text(json.dumps({"entityData": entities}))
+    return str(path)
+
+
+def _deleted(uei_sam, eft_indicator=None):
+    return {
+        "samExtractCode": "1",
+        "entityRegistration": {"ueiSAM": uei_sam, "entityEFTIndicator": eft_indicator},
+    }
+
+
+@pytest.fixture
+def index(tmp_path, extract_path):
+    entity_index = EntityIndex(tmp_path / "entity_index.sqlite3")
+    ingest_extract(entity_index, extract_path)
+    return entity_index
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SAM_ENTITY_INDEX_DATABASE=str(tmp_path / "entity_index.sqlite3"),
+        SAM_ENTITY_INDEX_LOCAL_FIRST=True,
+        SAM_ENTITY_INDEX_NAME_SEARCH=True,
+        SAM_ENTITY_INDEX_NAME_SEARCH_LIMIT=100,
+        SAM_TRIM_REPS_AND_CERTS=True,
+    )
+    entity_index.init_app(app)
+    app.cli.add_command(ingest_entity_extract_command)
+    app.cli.add_command(apply_entity_deltas_command)
+    return app
+
+
+class TestEntityIndex:
+    @staticmethod
+    def test_extract_is_loaded(index):
+        stats = index.stats()
+        assert stats["entities"] == 4
+        assert stats["source"] == "SAM_PUBLIC_MONTHLY_V2_20221002.json.gz"
+
+    @staticmethod
+    def test_find_by_uei_returns_parent_and_children(index):
+        data = index.find({"ueiSAM": "k3b5je3zs915"})
+        assert data["totalRecords"] == 2
+        assert [
+            entity["entityRegistration"]["entityEFTIndicator"]
+            for entity in data["entityData"]
+        ] == [None, "0001"]
+
+    @staticmethod
+    def test_find_parent_only(index):
+        data = index.find({"ueiSAM": "K3B5JE3ZS915", "entityEFTIndicator": ""})
+        assert data["totalRecords"] == 1
+
+    @staticmethod
+    def test_find_batch_of_cage_codes(index):
+        data = index.find({"cageCode": "[1YES6~7abc1]", "size": 10})
+        assert {
+            entity["entityRegistration"]["ueiSAM"] for entity in data["entityData"]
+        } == {"K3B5JE3ZS915", "QJ8GDNZ7RMC5"}
+
+    @staticmethod
+    def test_filters(index):
+        data = index.find(
+            {
+                "cageCode": "[1YES6~7ABC1]",
+                "registrationStatus": "E",
+                "purposeOfRegistrationCode": "Z1~Z5",
+            }
+        )
+        assert [
+            entity["entityRegistration"]["ueiSAM"] for entity in data["entityData"]
+        ] == ["QJ8GDNZ7RMC5"]
+
+    @staticmethod
+    def test_reps_and_certs_are_only_trimmed_when_asked(tmp_path, index, extract_path):
+        entity = index.find({"ueiSAM": "MN3JLNDKKH38"})["entityData"][0]
+        far_responses = entity["repsAndCerts"]["certifications"]["fARResponses"]
+        assert len(far_responses) > 1
+
+        trimmed_index = EntityIndex(tmp_path / "trimmed.sqlite3")
+        ingest_extract(trimmed_index, extract_path, entity_information._trim_sam_entity)
+        entity = trimmed_index.find({"ueiSAM": "MN3JLNDKKH38"})["entityData"][0]
+        far_responses = entity["repsAndCerts"]["certifications"]["fARResponses"]
+        assert [response["provisionId"] for response in far_responses] == [
+            "FAR 52.204-26"
+        ]
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "search_parameters",
+        [
+            {"ueiSAM": "[K3B5JE3ZS915~ZZZZZZZZZZZZ]"},
+            {"legalBusinessName": "Vendor"},
+            {"ueiSAM": "K3B5JE3ZS915", "cageCode": "1YES6"},
+            {"ueiSAM": "K3B5JE3ZS915", "registrationStatus": "W"},
+            {"ueiSAM": "K3B5JE3ZS915", "includeSections": {"pointsOfContact"}},
+        ],
+    )
+    def test_searches_the_index_cannot_answer(index, search_parameters):
+        assert index.find(search_parameters) is None
+        assert index.stats()["misses"] == 1
+
+    @staticmethod
+    def test_zip_extract(tmp_path, index):
+        path = tmp_path / "extract.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr(
+                "extract.json", json.dumps({"entityData": EXTRACT_ENTITIES[2:]})
+            )
+        assert ingest_extract(index, str(path)) == 2
+        assert index.find({"ueiSAM": "K3B5JE3ZS915"}) is None
+
+    @staticmethod
+    def test_failed_load_keeps_previous_contents(tmp_path, index):
+        path = tmp_path / "truncated.json"
+        path.write_text(json.dumps({"entityData": EXTRACT_ENTITIES[2:]})[:-10])
+        with pytest.raises(ValueError):
+            ingest_extract(index, str(path))
+        assert index.stats()["entities"] == 4
+        assert index.find({"ueiSAM": "K3B5JE3ZS915"})["totalRecords"] == 2
+
+
+class TestDailyDeltas:
+    @staticmethod
+    def test_upserts_and_deletes(tmp_path, index):
+        delta = _write_delta(
+            tmp_path,
+            "20221003",
+            [
+                _entity("QJ8GDNZ7RMC5", "7ABC1"),
+                _entity("ZQGGHJH74DW7", "8XYZ2"),
+                _deleted("K3B5JE3ZS915", eft_indicator="0001"),
+            ],
+        )
+        assert apply_delta(index, delta) == (2, 1)
+        assert index.high_water_mark == "2022-10-03"
+        assert index.stats()["entities"] == 4
+        assert index.find({"ueiSAM": "K3B5JE3ZS915"})["totalRecords"] == 1
+        assert (
+            index.find({"cageCode": "7ABC1", "registrationStatus": "A"})["totalRecords"]
+            == 1
+        )
+        assert index.find({"ueiSAM": "ZQGGHJH74DW7"})["totalRecords"] == 1
+
+    @staticmethod
+    def test_delta_already_loaded_is_skipped(tmp_path, index):
+        assert index.high_water_mark == "2022-10-02"
+        delta = _write_delta(tmp_path, "20221002", [_deleted("MN3JLNDKKH38")])
+        assert apply_delta(index, delta) is None
+        assert index.find({"ueiSAM": "MN3JLNDKKH38"}) is not None
+
+    @staticmethod
+    def test_delta_without_date_is_refused(tmp_path, index):
+        path = tmp_path / "delta.json"
+        path.write_text(json.dumps({"entityData": []}))
+        with pytest.raises(ValueError):
+            apply_delta(index, str(path))
+
+    @staticmethod
+    def test_readers_see_previous_contents_until_commit(index):
+        seen_during_delta = []
+
+        def delta_entities():
+            yield _deleted("MN3JLNDKKH38")
+            seen_during_delta.append(index.find({"ueiSAM": "MN3JLNDKKH38"}))
+            yield _entity("ZQGGHJH74DW7", "8XYZ2")
+
+        assert index.apply_delta(delta_entities(), "delta", "2022-10-03") == (1, 1)
+        assert seen_during_delta[0]["totalRecords"] == 1
+        assert index.find({"ueiSAM": "MN3JLNDKKH38"}) is None
+
+    @staticmethod
+    def test_failed_delta_is_rolled_back(tmp_path, index):
+        path = tmp_path / "SAM_PUBLIC_UTF-8_DAILY_V2_20221003.json"
+        path.write_text(json.dumps({"entityData": [_deleted("MN3JLNDKKH38")]})[:-3])
+        with pytest.raises(ValueError):
+            apply_delta(index, str(path))
+        assert index.high_water_mark == "2022-10-02"
+        assert index.find({"ueiSAM": "MN3JLNDKKH38"}) is not None
+
+    @staticmethod
+    def test_cli_applies_deltas_in_date_order(tmp_path, app, extract_path):
+        runner = app.test_cli_runner()
+        runner.invoke(args=["ingest-entity-extract", extract_path])
+        newer = _write_delta(tmp_path, "20221004", [_entity("MN3JLNDKKH38", "5NEW5")])
+        older = _write_delta(tmp_path, "20221003", [_deleted("MN3JLNDKKH38")])
+        already_loaded = _write_delta(tmp_path, "20221001", [])
+
+        result = runner.invoke(
+            args=["apply-entity-deltas", newer, already_loaded, older]
+        )
+        lines = result.output.splitlines()
+        assert lines[0].startswith("Skipped SAM_PUBLIC_UTF-8_DAILY_V2_20221001.json")
+        assert lines[1].startswith(
+            "Applied SAM_PUBLIC_UTF-8_DAILY_V2_20221003.json: 0 upserted, 1 deleted in "
+        )
+        assert lines[2].startswith(
+            "Applied SAM_PUBLIC_UTF-8_DAILY_V2_20221004.json: 1 upserted, 0 deleted in "
+        )
+        with app.app_context():
+            data = entity_index.get_entity_index().find({"cageCode": "5NEW5"})
+        assert data["totalRecords"] == 1
+
+
+class TestLocalFirstSearch:
+    @staticmethod
+    def test_cli_and_local_search(app, extract_path, monkeypatch):
+        result = app.test_cli_runner().invoke(
+            args=["ingest-entity-extract", extract_path]
+        )
+        assert "Loaded 4 entities" in result.output
+
+        monkeypatch.setattr(
+            entity_information,
+            "_call_post_sam_entities_api",
+            lambda endpoint, parameters: pytest.fail("SAM must not be called"),
+        )
+        with app.app_context():
+            response = entity_information._search_sam(
+                ImmutableMultiDict([("samToolsSearch", "1yes6")]),
+                "http://host/",
+                "endpoint",
+            )
+        assert response["success"]
+        assert response["totalRecords"] == 2
+        assert response["entityData"][0]["samToolsData"]["eightEightNine"][
+            "isCompliant"
+        ]
+
+    @staticmethod
+    def test_unknown_entity_falls_back_to_sam(app, monkeypatch):
+        sam_searches = []
+
+        def request_sam_entities(parameters, host_url, endpoint, data_adaptors):
+            sam_searches.append(parameters)
+            return {"success": False, "errors": ["error"]}
+
+        monkeypatch.setattr(
+            entity_information, "_request_sam_entities", request_sam_entities
+        )
+        with app.app_context():
+            entity_information._search_sam(
+                ImmutableMultiDict([("samToolsSearch", "9ZZZ9")]),
+                "http://host/",
+                "endpoint",
+            )
+        assert sam_searches[0]["cageCode"] == "9ZZZ9"
+
+
+@pytest.fixture
+def names_index(tmp_path):
+    names_index = EntityIndex(tmp_path / "names.sqlite3", name_search=True)
+    names_index.replace_all(
+        [
+            _entity("ZQGGHJH74DW7", None, legal_business_name="Appleton Paper LLC"),
+            _entity("K3B5JE3ZS915", None, legal_business_name="Apple Inc."),
+            _entity(
+                "QJ8GDNZ7RMC5",
+                None,
+                legal_business_name="Orchard Holdings",
+                dba_name="Apple Orchard",
+            ),
+            _entity("MN3JLNDKKH38", None, legal_business_name="Microsoft Corporation"),
+        ],
+        source="names",
+    )
+    return names_index
+
+
+class TestNameSearch:
+    @staticmethod
+    def test_word_prefixes(names_index):
+        assert names_index.search_names("appl", limit=10) == [
+            "K3B5JE3ZS915",
+            "ZQGGHJH74DW7",
+            "QJ8GDNZ7RMC5",
+        ]
+
+    @staticmethod
+    def test_search_is_cleaned_like_sam_queries(names_index):
+        assert names_index.search_names("apple inc.", limit=10) == ["K3B5JE3ZS915"]
+        assert names_index.search_names("Appleton Paper L.L.C.", limit=10) == [
+            "ZQGGHJH74DW7"
+        ]
+
+    @staticmethod
+    def test_substrings_fill_up_results(names_index):
+        assert names_index.search_names("soft", limit=10) == ["MN3JLNDKKH38"]
+
+    @staticmethod
+    def test_limit(names_index):
+        assert len(names_index.search_names("apple", limit=2)) == 2
+
+    @staticmethod
+    def test_deltas_update_names(names_index):
+        renamed = _entity("MN3JLNDKKH38", None, legal_business_name="Macrohard")
+        names_index.apply_delta(
+            [renamed, _deleted("K3B5JE3ZS915")], source="delta", as_of="2022-10-03"
+        )
+        assert names_index.search_names("microsoft", limit=10) == []
+        assert names_index.search_names("macro", limit=10) == ["MN3JLNDKKH38"]
+        assert "K3B5JE3ZS915" not in names_index.search_names("apple", limit=10)
+
+    @staticmethod
+    def test_name_search_fetches_exact_records(app, names_index, monkeypatch):
+        app.config["SAM_ENTITY_INDEX_LOCAL_FIRST"] = False
+        app.extensions["samtools.entity_index"] = names_index
+        sam_searches = []
+
+        def request_sam_entities(parameters, host_url, endpoint, data_adaptors):
+            sam_searches.append(parameters)
+            return {
+                "entityData": [
+                    {"entityRegistration": {"ueiSAM": "ZQGGHJH74DW7"}},
+                    {"entityRegistration": {"ueiSAM": "K3B5JE3ZS915"}},
+                ],
+                "totalRecords": 2,
+                "success": True,
+            }
+
+        monkeypatch.setattr(
+            entity_information, "_request_sam_entities", request_sam_entities
+        )
+        with app.app_context():
+            response = entity_information._search_sam(
+                ImmutableMultiDict([("samToolsSearch", "apple"), ("size", "2")]),
+                "http://host/",
+                "endpoint",
+            )
+            last_page = entity_information._search_sam(
+                ImmutableMultiDict(
+                    [("samToolsSearch", "apple"), ("size", "2"), ("page", "5")]
+                ),
+                "http://host/",
+                "endpoint",
+            )
+        assert sam_searches == [
+            {
+                "ueiSAM": "[K3B5JE3ZS915~ZQGGHJH74DW7]",
+                "size": "10",
+                "includeSections": {"entityRegistration", "coreData", "repsAndCerts"},
+            }
+        ]
+        assert [
+            entity["entityRegistration"]["ueiSAM"] for entity in response["entityData"]
+        ] == ["K3B5JE3ZS915", "ZQGGHJH74DW7"]
+        assert response["totalRecords"] == 3
+        assert last_page == {"entityData": [], "totalRecords": 3, "success": True}
+
+    @staticmethod
+    def test_name_tables_are_only_created_for_name_search(tmp_path):
+        path = tmp_path / "index.sqlite3"
+        index = EntityIndex(path)
+        index.replace_all([_entity("K3B5JE3ZS915", None)], source="extract")
+        assert index.search_names("vendor", limit=10) == []
+        assert (
+            not index._read_connections.get()
+            .execute("SELECT name FROM sqlite_master WHERE name LIKE 'entity_names%'")
+            .fetchall()
+        )
+
+        assert EntityIndex(path, name_search=True).search_names("vendor", limit=10) == [
+            "K3B5JE3ZS915"
+        ]
+
+    @staticmethod
+    def test_name_search_is_disabled_without_fts5(tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            entity_index,
+            "_NAME_SCHEMA",
+            entity_index._NAME_SCHEMA.replace("trigram", "no_such_tokenizer"),
+        )
+        with pytest.warns(UserWarning, match="name search is disabled"):
+            index = EntityIndex(tmp_path / "index.sqlite3", name_search=True)
+        assert not index.name_search
+        index.replace_all([_entity("K3B5JE3ZS915", None)], source="extract")
+        assert index.search_names("vendor", limit=10) == []
+
+    @staticmethod
+    def test_name_search_pages_by_entity(app, names_index, monkeypatch):
+        app.config["SAM_ENTITY_INDEX_LOCAL_FIRST"] = False
+        app.extensions["samtools.entity_index"] = names_index
+        child = _entity("K3B5JE3ZS915", None, "0001", legal_business_name="Apple Inc.")
+        names_index.apply_delta([child], source="delta", as_of="2022-10-03")
+        records = {
+            (uei_sam, eft_indicator or ""): _entity(uei_sam, None, eft_indicator)
+            for uei_sam, eft_indicator in [
+                ("K3B5JE3ZS915", None),
+                ("K3B5JE3ZS915", "0001"),
+                ("ZQGGHJH74DW7", None),
+                ("QJ8GDNZ7RMC5", None),
+            ]
+        }
+
+        def request_sam_entities(parameters, host_url, endpoint, data_adaptors):
+            ueis = parameters["ueiSAM"].strip("[]").split("~")
+            return {
+                "entityData": [
+                    record
+                    for (uei_sam, _), record in records.items()
+                    if uei_sam in ueis
+                ],
+                "totalRecords": 4,
+                "success": True,
+            }
+
+        monkeypatch.setattr(
+            entity_information, "_request_sam_entities", request_sam_entities
+        )
+        pages = []
+        with app.app_context():
+            for page in ("0", "1"):
+                response = entity_information._search_sam(
+                    ImmutableMultiDict(
+                        [("samToolsSearch", "apple"), ("size", "2"), ("page", page)]
+                    ),
+                    "http://host/",
+                    "endpoint",
+                )
+                assert response["totalRecords"] == 4
+                pages.append(
+                    [
+                        (
+                            entity["entityRegistration"]["ueiSAM"],
+                            entity["entityRegistration"]["entityEFTIndicator"],
+                        )
+                        for entity in response["entityData"]
+                    ]
+                )
+        assert pages == [
+            [("K3B5JE3ZS915", None), ("K3B5JE3ZS915", "0001")],
+            [("ZQGGHJH74DW7", None), ("QJ8GDNZ7RMC5", None)],
+        ]
+
+    @staticmethod
+    def test_next_page_is_prefetched_by_name(app, names_index, monkeypatch):
+        app.config.update(
+            SAM_ENTITY_INDEX_LOCAL_FIRST=False,
+            SAM_RESPONSE_CACHE_SIZE=8,
+            SAM_RESPONSE_CACHE_TTL=60,
+            SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=0,
+            SAM_RESPONSE_CACHE_STALE_IF_ERROR=0,
+            SAM_RESPONSE_CACHE_REFRESH_WORKERS=1,
+            SAM_PREFETCH_WINDOW=60,
+            SAM_PREFETCH_WORKERS=1,
+            SAM_PREFETCH_QUOTA_RESERVE=1,
+        )
+        response_cache.init_app(app)
+        prefetch.init_app(app)
+        app.extensions["samtools.entity_index"] = names_index
+        sam_searches = []
+
+        def request_sam_entities(parameters, host_url, endpoint, data_adaptors):
+            sam_searches.append(parameters)
+            return {
+                "entityData": [
+                    {"entityRegistration": {"ueiSAM": parameters["ueiSAM"]}}
+                ],
+                "totalRecords": 1,
+                "success": True,
+            }
+
+        monkeypatch.setattr(
+            entity_information, "_request_sam_entities", request_sam_entities
+        )
+        with app.app_context():
+            for page in ("0", "1"):
+                response = entity_information.search_sam_v3(
+                    ImmutableMultiDict(
+                        [("samToolsSearch", "apple"), ("size", "1"), ("page", page)]
+                    ),
+                    "http://host/",
+                )
+                prefetch.get_prefetcher().wait()
+            assert prefetch.get_prefetcher().stats()["used"] == 1
+        assert [search["ueiSAM"] for search in sam_searches] == [
+            "K3B5JE3ZS915",
+            "ZQGGHJH74DW7",
+            "QJ8GDNZ7RMC5",
+        ]
+        assert response["entityData"] == [
+            {"entityRegistration": {"ueiSAM": "ZQGGHJH74DW7"}}
+        ]
+        assert response["totalRecords"] == 3
+
+    @staticmethod
+    def test_names_without_local_match_are_searched_in_sam(
+        app, names_index, monkeypatch
+    ):
+        app.extensions["samtools.entity_index"] = names_index
+        sam_searches = []
+
+        def request_sam_entities(parameters, host_url, endpoint, data_adaptors):
+            sam_searches.append(parameters)
+            return {"success": False, "errors": ["error"]}
+
+        monkeypatch.setattr(
+            entity_information, "_request_sam_entities", request_sam_entities
+        )
+        with app.app_context():
+            entity_information._search_sam(
+                ImmutableMultiDict([("samToolsSearch", "zzyzx")]),
+                "http://host/",
+                "endpoint",
+            )
+        assert sam_searches[0]["q"] == "(legalBusinessName:zzyzx* OR dbaName:zzyzx*)"
@@ -152,6 +152,106 @@ class TestDataAdaptors:
                 is False
             )
 
+        @staticmethod
+        @pytest.mark.parametrize(
+            "far_responses, status_text",
+            [
+                ([], "NO REPS & CERTS"),
+                ([{"provisionId": "FAR 52.204-26"}], "NO REPS & CERTS"),
+                (
+                    [
+                        {
+                            "provisionId": "FAR 52.204-26",
+                            "listOfAnswers": [
+                                {"section": "52.204-26.c.1", "answerText": "No"}
+                            ],
+                        }
+                    ],
+                    "OUTDATED FAR (No part (C)(2))",
+                ),
+            ],
+        )
+        def test_incomplete_far_responses(far_responses, status_text):
+            entity = {
+                "repsAndCerts": {"certifications": {"fARResponses": far_responses}}
+            }
+            data_adaptors = DataAdaptors()
+            compliance = data_adaptors.adapt_sam_response_to_889_compliance(entity)
+            assert compliance.status_text == status_text
+
+    class TestIndexFarResponses:
+        @staticmethod
+        def test_no_reps_and_certs():
+            assert DataAdaptors.index_far_responses({"repsAndCerts": {}}) is None
+
+        @staticmethod
+        def test_section_889_provisions():
+            far_responses = [
+                {
+                    "provisionId": f"FAR 52.{provision}",
+                    "listOfAnswers": [
+                        {"section": f"52.{provision}.{section}", "answerText": "No"}
+                        for section in ("a", "b")
+                    ],
+                }
+                for provision in range(200, 230)
+            ] + [
+                {
+                    "provisionId": "FAR 52.204-24",
+                    "listOfAnswers": [
+                        {"section": "52.204-24.d.1", "answerText": "Yes"},
+                        {"section": "52.204-24.d.2", "answerText": "No"},
+                    ],
+                },
+                {
+                    "provisionId": "FAR 52.204-25",
+                    "listOfAnswers": [{"section": "52.204-25.b", "answerText": None}],
+                },
+                {"provisionId": "FAR 52.204-26"},
+            ]
+            entity = {
+                "repsAndCerts": {"certifications": {"fARResponses": far_responses}}
+            }
+            far_index = DataAdaptors.index_far_responses(entity)
+            assert sorted(far_index) == [
+                "FAR 52.204-24",
+                "FAR 52.204-25",
+                "FAR 52.204-26",
+            ]
+            assert far_index["FAR 52.204-24"] == {
+                "52.204-24.d.1": "Yes",
+                "52.204-24.d.2": "No",
+            }
+            assert far_index["FAR 52.204-25"] == {"52.204-25.b": None}
+            assert far_index["FAR 52.204-26"] == {}
+            far_index = DataAdaptors.index_far_responses(entity, provision_ids=None)
+            assert len(far_index) == 33
+            assert far_index["FAR 52.229"] == {"52.229.a": "No", "52.229.b": "No"}
+
+        @staticmethod
+        def test_first_match_wins():
+            far_responses = [
+                {
+                    "provisionId": "FAR 52.204-26",
+                    "listOfAnswers": [
+                        {"section": "52.204-26.c.1", "answerText": "No"},
+                        {"section": "52.204-26.c.1", "answerText": "Yes"},
+                    ],
+                },
+                {
+                    "provisionId": "FAR 52.204-26",
+                    "listOfAnswers": [
+                        {"section": "52.204-26.c.2", "answerText": "Yes"},
+                    ],
+                },
+            ]
+            entity = {
+                "repsAndCerts": {"certifications": {"fARResponses": far_responses}}
+            }
+            assert DataAdaptors.index_far_responses(entity) == {
+                "FAR 52.204-26": {"52.204-26.c.1": "No"}
+            }
+
     class TestAdaptSamResponcesToExclusions:
         @staticmethod
         @pytest.mark.parametrize("exclusion_status_flag", ["N"])
@@ -0,0 +1,136 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import gzip
+import json
+
+import brotli
+import pytest
+from flask import Flask
+
+from samtools import json_responses
+from samtools.json_responses import json_response
+from samtools.sam_api.response_cache import CachedResponse
+
+SEARCH_RESPONSE = {
+    "entityData": [{"entityRegistration": {"ueiSAM": "K3B5JE3ZS915"}}] * 50,
+    "totalRecords": 50,
+    "success": True,
+}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(
+        CACHE_CONTROL={"search": "private, max-age=60"},
+        COMPRESSION_MIN_SIZE=1024,
+    )
+    json_responses.init_app(app)
+
+    @app.route("/search")
+    def search():
+        return json_response(SEARCH_RESPONSE)
+
+    cached_response = CachedResponse(SEARCH_RESPONSE)
+
+    @app.route("/cached")
+    def cached():
+        return json_response(cached_response)
+
+    @app.route("/error")
+    def error():
+        return json_response({"success": False, "errors": ["error"]})
+
+    return app.test_client()
+
+
+class TestJsonResponse:
+    @staticmethod
+    def test_uncompressed_without_accept_encoding(client):
+        response = client.get("/search")
+        assert "Content-Encoding" not in response.headers
+        assert json.loads(response.data) == SEARCH_RESPONSE
+        assert response.headers["Cache-Control"] == "private, max-age=60"
+        assert "Accept-Encoding" in response.headers["Vary"]
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "accept_encoding,content_encoding,decompress",
+        [
+            ("gzip", "gzip", gzip.decompress),
+            ("gzip, deflate, br", "br", brotli.decompress),
+            ("br;q=0.5, gzip", "gzip", gzip.decompress),
+        ],
+    )
+    def test_negotiated_compression(
+        client, accept_encoding, content_encoding, decompress
+    ):
+        response = client.get("/search", headers={"Accept-Encoding": accept_encoding})
+        assert response.headers["Content-Encoding"] == content_encoding
+        assert json.loads(decompress(response.data)) == SEARCH_RESPONSE
+
+    @staticmethod
+    def test_small_responses_are_not_compressed(client):
+        response = client.get("/error", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["Cache-Control"] == "no-store"
+
+    @staticmethod
+    def test_etag_differs_per_encoding(client):
+        plain = client.get("/search")
+        compressed = client.get("/search", headers={"Accept-Encoding": "gzip"})
+        assert plain.headers["ETag"] != compressed.headers["ETag"]
+        assert not plain.headers["ETag"].startswith("W/")
+
+    @staticmethod
+    def test_matching_etag_is_not_modified(client):
+        etag = client.get("/search").headers["ETag"]
+        response = client.get(
+            "/search", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] != etag
+
+    @staticmethod
+    def test_changed_content_is_sent_again(client):
+        response = client.get("/search", headers={"If-None-Match": '"outdated"'})
+        assert response.status_code == 200
+
+    @staticmethod
+    def test_serialized_body_is_reused(client, monkeypatch):
+        client.get("/cached", headers={"Accept-Encoding": "gzip"})
+        monkeypatch.setattr(
+            json_responses,
+            "_serialize",
+            lambda data: pytest.fail("response must not be serialized again"),
+        )
+        response = client.get("/cached", headers={"Accept-Encoding": "gzip"})
+        assert json.loads(gzip.decompress(response.data)) == SEARCH_RESPONSE
+
+    @staticmethod
+    def test_uncached_responses_are_not_kept(client, monkeypatch):
+        serialized = []
+        serialize = json_responses._serialize
+        monkeypatch.setattr(
+            json_responses,
+            "_serialize",
+            lambda data: serialized.append(data) or serialize(data),
+        )
+        client.get("/search")
+        client.get("/search")
+        assert len(serialized) == 2
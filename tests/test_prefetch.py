@@ -0,0 +1,127 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import threading
+
+import pytest
+from werkzeug.datastructures import ImmutableMultiDict
+
+from samtools.sam_api import entity_information, prefetch, quota, response_cache
+from samtools.sam_api.prefetch import Prefetcher
+
+
+@pytest.fixture
+def app_config():
+    return dict(
+        SAM_RESPONSE_CACHE_SIZE=8,
+        SAM_RESPONSE_CACHE_TTL=60,
+        SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=0,
+        SAM_RESPONSE_CACHE_STALE_IF_ERROR=0,
+        SAM_RESPONSE_CACHE_REFRESH_WORKERS=1,
+        SAM_PREFETCH_WINDOW=60,
+        SAM_PREFETCH_WORKERS=1,
+        SAM_PREFETCH_QUOTA_RESERVE=1,
+    )
+
+
+@pytest.fixture
+def app_extensions():
+    return (response_cache.init_app, prefetch.init_app)
+
+
+@pytest.fixture
+def upstream_pages(monkeypatch):
+    pages = []
+
+    def fake_request(search_parameters, host_url, sam_api_endpoint, data_adaptors):
+        pages.append(search_parameters.get("page", "0"))
+        return {"entityData": [], "totalRecords": 25, "success": True}
+
+    monkeypatch.setattr(entity_information, "_request_sam_entities", fake_request)
+    return pages
+
+
+def _search(page):
+    return entity_information.search_sam_v3(
+        ImmutableMultiDict([("samToolsSearch", "grainger"), ("page", page)]),
+        "http://host/",
+    )
+
+
+class TestPrefetcher:
+    @staticmethod
+    def test_prefetched_result_is_taken_once():
+        prefetcher = Prefetcher(window=10, max_workers=1)
+        assert prefetcher.submit("a", lambda: 1)
+        prefetcher.wait()
+        assert not prefetcher.submit("a", lambda: 2)
+        assert prefetcher.take("a") == 1
+        assert prefetcher.take("a") is None
+        assert prefetcher.stats()["used"] == 1
+
+    @staticmethod
+    def test_unused_result_is_dropped_after_window(clock):
+        prefetcher = Prefetcher(window=10, max_workers=1, clock=clock)
+        prefetcher.submit("a", lambda: 1)
+        prefetcher.wait()
+        clock.now = 11
+        assert prefetcher.take("a") is None
+        assert prefetcher.stats()["unused"] == 1
+
+    @staticmethod
+    def test_prefetch_not_started_within_window_is_cancelled(clock):
+        prefetcher = Prefetcher(window=10, max_workers=1, clock=clock)
+        release = threading.Event()
+        prefetcher.submit("busy", release.wait)
+        prefetcher.submit("a", lambda: pytest.fail("prefetch must be cancelled"))
+        clock.now = 11
+        release.set()
+        prefetcher.wait()
+        assert prefetcher.stats()["cancelled"] == 1
+        assert prefetcher.take("a") is None
+
+
+class TestSearchPrefetch:
+    @staticmethod
+    def test_next_page_is_served_from_prefetch(app_context, upstream_pages):
+        _search("0")
+        prefetch.get_prefetcher().wait()
+        assert upstream_pages == ["0", "1"]
+
+        _search("1")
+        prefetch.get_prefetcher().wait()
+        assert upstream_pages == ["0", "1", "2"]
+        assert prefetch.get_prefetcher().stats()["used"] == 1
+
+    @staticmethod
+    def test_last_page_is_not_prefetched(app_context, upstream_pages):
+        _search("2")
+        prefetch.get_prefetcher().wait()
+        assert upstream_pages == ["2"]
+
+    @staticmethod
+    def test_prefetch_keeps_quota_reserve(app_context, upstream_pages, tmp_path):
+        app_context.config.update(
+            SAM_QUOTA_REQUESTS_PER_DAY=2,
+            SAM_QUOTA_REQUESTS_PER_SECOND=10,
+            SAM_QUOTA_MAX_WAIT=0,
+            SAM_QUOTA_DATABASE=str(tmp_path / "quota.sqlite3"),
+        )
+        quota.init_app(app_context)
+        quota.get_quota_scheduler().acquire()
+        _search("0")
+        prefetch.get_prefetcher().wait()
+        assert upstream_pages == ["0"]
@@ -0,0 +1,137 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import sqlite3
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import ImmutableMultiDict
+
+from samtools.sam_api import entity_information, quota
+from samtools.sam_api.quota import QuotaExceededError, QuotaScheduler
+
+
+def _scheduler(tmp_path, clock, requests_per_second=2, requests_per_day=100):
+    return QuotaScheduler(
+        tmp_path / "quota.sqlite3",
+        requests_per_second=requests_per_second,
+        requests_per_day=requests_per_day,
+        max_wait=5,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+
+class TestQuotaScheduler:
+    @staticmethod
+    def test_waits_for_token_when_rate_exceeded(tmp_path, clock):
+        scheduler = _scheduler(tmp_path, clock)
+        for _ in range(3):
+            scheduler.acquire()
+        assert clock.slept == [pytest.approx(0.5)]
+        assert scheduler.stats()["waited"] == 1
+
+    @staticmethod
+    def test_sheds_when_wait_is_too_long(tmp_path, clock):
+        scheduler = QuotaScheduler(
+            tmp_path / "quota.sqlite3",
+            requests_per_second=0.1,
+            requests_per_day=100,
+            max_wait=1,
+            clock=clock,
+            sleep=clock.sleep,
+        )
+        scheduler.acquire()
+        with pytest.raises(QuotaExceededError):
+            scheduler.acquire()
+        assert scheduler.stats()["shed"] == 1
+
+    @staticmethod
+    def test_sheds_when_daily_budget_is_spent(tmp_path, clock):
+        scheduler = _scheduler(
+            tmp_path, clock, requests_per_second=100, requests_per_day=2
+        )
+        scheduler.acquire()
+        scheduler.acquire()
+        with pytest.raises(QuotaExceededError):
+            scheduler.acquire()
+        assert scheduler.stats()["remainingToday"] == 0
+
+    @staticmethod
+    def test_budget_resets_next_day(tmp_path, clock):
+        scheduler = _scheduler(
+            tmp_path, clock, requests_per_second=100, requests_per_day=1
+        )
+        scheduler.acquire()
+        clock.now += 24 * 60 * 60
+        assert scheduler.stats()["remainingToday"] == 1
+        scheduler.acquire()
+
+    @staticmethod
+    @pytest.mark.parametrize("requests_per_second", [0, -1])
+    def test_rate_must_be_positive(tmp_path, clock, requests_per_second):
+        with pytest.raises(ValueError):
+            _scheduler(tmp_path, clock, requests_per_second=requests_per_second)
+
+    @staticmethod
+    def test_usage_is_read_while_a_token_is_taken(tmp_path, clock):
+        scheduler = _scheduler(tmp_path, clock)
+        scheduler.acquire()
+        writer = sqlite3.connect(tmp_path / "quota.sqlite3", isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("UPDATE sam_quota SET used = used + 1")
+        try:
+            assert scheduler.remaining_today() == 99
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+
+    @staticmethod
+    def test_usage_is_shared_between_workers_and_restarts(tmp_path, clock):
+        first_worker = _scheduler(tmp_path, clock, requests_per_second=100)
+        first_worker.acquire()
+        second_worker = _scheduler(tmp_path, clock, requests_per_second=100)
+        second_worker.acquire()
+        assert first_worker.stats()["usedToday"] == 2
+
+
+class TestSearchWithQuota:
+    @staticmethod
+    def test_quota_error_is_returned(tmp_path, monkeypatch):
+        app = Flask(__name__)
+        app.config.update(
+            SAM_API_KEY="test",
+            SAM_QUOTA_REQUESTS_PER_DAY=0,
+            SAM_QUOTA_REQUESTS_PER_SECOND=1,
+            SAM_QUOTA_MAX_WAIT=0,
+            SAM_QUOTA_DATABASE=str(tmp_path / "quota.sqlite3"),
+        )
+        quota.init_app(app)
+        monkeypatch.setattr(
+            entity_information,
+            "get_sam_session",
+            lambda: pytest.fail("SAM must not be called"),
+        )
+        with app.app_context():
+            response = entity_information._search_sam(
+                ImmutableMultiDict([("samToolsSearch", "grainger")]),
+                "http://host/",
+                "endpoint",
+            )
+        assert response == {
+            "success": False,
+            "errors": [entity_information.SAM_QUOTA_ERROR_MESSAGE],
+        }
@@ -0,0 +1,274 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import pytest
+import requests
+from werkzeug.datastructures import ImmutableMultiDict
+
+from samtools.sam_api import entity_information, response_cache
+from samtools.sam_api.response_cache import TTLCache, make_cache_key
+from tests.conftest import FakeSamResponse
+
+
+@pytest.fixture
+def app_config():
+    return dict(
+        SAM_RESPONSE_CACHE_SIZE=8,
+        SAM_RESPONSE_CACHE_TTL=60,
+        SAM_RESPONSE_CACHE_STALE_WHILE_REVALIDATE=30,
+        SAM_RESPONSE_CACHE_STALE_IF_ERROR=600,
+        SAM_RESPONSE_CACHE_REFRESH_WORKERS=1,
+        SAM_API_KEY="tool",
+        SAM_API_CONNECT_TIMEOUT=5,
+        SAM_API_READ_TIMEOUT=5,
+        SAM_TRIM_REPS_AND_CERTS=False,
+    )
+
+
+@pytest.fixture
+def app_extensions():
+    return (response_cache.init_app,)
+
+
+@pytest.fixture
+def clock(clock, app_context):
+    response_cache.get_response_cache()._clock = clock
+    return clock
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    def fake_request(search_parameters, host_url, sam_api_endpoint, data_adaptors):
+        calls.append(search_parameters)
+        return {"entityData": [], "totalRecords": 0, "success": True}
+
+    monkeypatch.setattr(entity_information, "_request_sam_entities", fake_request)
+    return calls
+
+
+class TestTTLCache:
+    @staticmethod
+    def test_hit_and_miss():
+        cache = TTLCache(max_size=2, ttl=10)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @staticmethod
+    def test_expires_after_ttl(clock):
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 10.5
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+
+    @staticmethod
+    def test_evicts_least_recently_used():
+        cache = TTLCache(max_size=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    @staticmethod
+    def test_expired_entry_is_retained_for_max_stale(clock):
+        cache = TTLCache(max_size=2, ttl=10, max_stale=5, clock=clock)
+        cache.set("a", 1)
+        clock.now = 12
+        assert cache.get("a") is None
+        assert cache.get_with_age("a") == (1, 12)
+        assert cache.stats()["staleHits"] == 1
+        clock.now = 15.5
+        assert cache.get_with_age("a") == (None, None)
+        assert cache.stats()["expirations"] == 1
+
+    @staticmethod
+    def test_zero_size_disables_cache():
+        cache = TTLCache(max_size=0, ttl=10)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+class TestMakeCacheKey:
+    @staticmethod
+    def test_api_key_separates_entries():
+        with_key = make_cache_key(
+            {"ueiSAM": "K3B5JE3ZS915", "api_key": "secret"}, "http://host/"
+        )
+        assert with_key == make_cache_key(
+            {"api_key": "secret", "ueiSAM": "K3B5JE3ZS915"}, "http://host/"
+        )
+        assert with_key != make_cache_key({"ueiSAM": "K3B5JE3ZS915"}, "http://host/")
+        assert with_key != make_cache_key(
+            {"ueiSAM": "K3B5JE3ZS915", "api_key": "other"}, "http://host/"
+        )
+        assert "secret" not in repr(with_key)
+
+    @staticmethod
+    def test_include_sections_order_does_not_matter():
+        assert make_cache_key(
+            {"includeSections": {"coreData", "repsAndCerts"}, "q": "a"}, "http://host/"
+        ) == make_cache_key(
+            {"q": "a", "includeSections": {"repsAndCerts", "coreData"}}, "http://host/"
+        )
+
+    @staticmethod
+    def test_host_url_is_part_of_key():
+        assert make_cache_key({"q": "a"}, "http://one/") != make_cache_key(
+            {"q": "a"}, "http://two/"
+        )
+
+
+class TestSearchSamCaching:
+    @staticmethod
+    def test_repeated_search_is_served_from_cache(app_context, upstream_calls):
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        first = entity_information._search_sam(search_args, "http://host/", "endpoint")
+        second = entity_information._search_sam(search_args, "http://host/", "endpoint")
+        assert first is second
+        assert len(upstream_calls) == 1
+
+    @staticmethod
+    def test_bypass_flag_refreshes_entry(app_context, upstream_calls):
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        bypass_args = ImmutableMultiDict(
+            [("samToolsSearch", "grainger"), ("samToolsNoCache", "true")]
+        )
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+        entity_information._search_sam(bypass_args, "http://host/", "endpoint")
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+        assert len(upstream_calls) == 2
+        assert "samToolsNoCache" not in upstream_calls[1]
+
+    @staticmethod
+    def test_api_key_keeps_its_own_entry(app_context, monkeypatch):
+        api_keys = []
+
+        class FakeSession:
+            @staticmethod
+            def post(sam_api_endpoint, headers, params, timeout, stream):
+                api_keys.append(headers["X-api-key"])
+                assert "api_key" not in params
+                return FakeSamResponse([])
+
+        monkeypatch.setattr(entity_information, "get_sam_session", FakeSession)
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        own_key_args = ImmutableMultiDict(
+            [("samToolsSearch", "grainger"), ("api_key", "caller")]
+        )
+        for args in (own_key_args, search_args, own_key_args, search_args):
+            entity_information._search_sam(args, "http://host/", "endpoint")
+        assert api_keys == ["caller", "tool"]
+
+    @staticmethod
+    def test_failed_search_is_not_cached(app_context, monkeypatch):
+        calls = []
+
+        def failing_request(
+            search_parameters, host_url, sam_api_endpoint, data_adaptors
+        ):
+            calls.append(search_parameters)
+            return {"success": False, "errors": ["error"]}
+
+        monkeypatch.setattr(
+            entity_information, "_request_sam_entities", failing_request
+        )
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+        assert len(calls) == 2
+
+
+class TestStaleSearchResponses:
+    @staticmethod
+    def test_stale_response_is_served_while_refreshing(clock, upstream_calls):
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+        clock.now = 75
+        stale = entity_information._search_sam(search_args, "http://host/", "endpoint")
+        assert stale["samToolsData"] == {"isStale": True, "age": 75}
+        response_cache.get_background_refresher().wait()
+        assert len(upstream_calls) == 2
+
+        refreshed = entity_information._search_sam(
+            search_args, "http://host/", "endpoint"
+        )
+        assert "samToolsData" not in refreshed
+        assert response_cache.get_background_refresher().stats()["refreshes"] == 1
+
+    @staticmethod
+    def test_stale_response_replaces_sam_error(clock, monkeypatch):
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        responses = [
+            {"entityData": [], "totalRecords": 0, "success": True},
+            {"success": False, "errors": ["error"]},
+        ]
+        monkeypatch.setattr(
+            entity_information,
+            "_request_sam_entities",
+            lambda *args: responses.pop(0),
+        )
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+        clock.now = 300
+        response = entity_information._search_sam(
+            search_args, "http://host/", "endpoint"
+        )
+        assert response["success"]
+        assert response["samToolsData"] == {"isStale": True, "age": 300}
+
+    @staticmethod
+    def test_stale_response_replaces_connection_error(
+        clock, upstream_calls, monkeypatch
+    ):
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+
+        def unreachable(*args):
+            raise requests.ConnectionError("SAM is down")
+
+        monkeypatch.setattr(entity_information, "_request_sam_entities", unreachable)
+        clock.now = 300
+        response = entity_information._search_sam(
+            search_args, "http://host/", "endpoint"
+        )
+        assert response["samToolsData"]["isStale"]
+
+    @staticmethod
+    def test_response_past_hard_limit_is_not_served(clock, monkeypatch):
+        search_args = ImmutableMultiDict([("samToolsSearch", "grainger")])
+        responses = [
+            {"entityData": [], "totalRecords": 0, "success": True},
+            {"success": False, "errors": ["error"]},
+        ]
+        monkeypatch.setattr(
+            entity_information,
+            "_request_sam_entities",
+            lambda *args: responses.pop(0),
+        )
+        entity_information._search_sam(search_args, "http://host/", "endpoint")
+        clock.now = 700
+        response = entity_information._search_sam(
+            search_args, "http://host/", "endpoint"
+        )
+        assert response == {"success": False, "errors": ["error"]}
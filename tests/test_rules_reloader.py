@@ -0,0 +1,131 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import json
+import os
+
+import pytest
+from flask import Flask
+
+from samtools.compliance import compliance_rules, rules_reloader
+from samtools.compliance.rules_reloader import RulesReloader
+
+
+@pytest.fixture(autouse=True)
+def restore_rules():
+    rules = compliance_rules.get_rules()
+    yield
+    compliance_rules.use_rules(rules)
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / "compliance_rules.json"
+    with open(compliance_rules.RULES_FILE, encoding="utf-8") as rules_file:
+        path.write_text(rules_file.read())
+    return path
+
+
+def _write_no_reps_text(path, status_text):
+    definition = json.loads(path.read_text())
+    definition["statusText"][1]["statusText"] = status_text
+    new_path = path.with_suffix(".new")
+    new_path.write_text(json.dumps(definition))
+    os.replace(new_path, path)
+
+
+class TestRulesReloader:
+    @staticmethod
+    def test_reloads_changed_file(rules_path, clock):
+        reloader = RulesReloader(rules_path, check_interval=5, clock=clock)
+        reloader.load()
+        assert reloader.check() is False
+
+        _write_no_reps_text(rules_path, "NO REPRESENTATIONS")
+        clock.now = 1
+        assert reloader.check() is False
+        assert compliance_rules.EightEightNine().status_text == "NO REPS & CERTS"
+        clock.now = 6
+        assert reloader.check() is True
+        assert compliance_rules.EightEightNine().status_text == "NO REPRESENTATIONS"
+        assert reloader.stats()["reloads"] == 1
+
+    @staticmethod
+    def test_keeps_rules_when_file_is_invalid(rules_path, clock):
+        reloader = RulesReloader(rules_path, check_interval=0, clock=clock)
+        reloader.load()
+        rules = compliance_rules.get_rules()
+
+        rules_path.write_text('{"statusText": []')
+        assert reloader.check() is False
+        assert reloader.check() is False
+        assert compliance_rules.get_rules() is rules
+        stats = reloader.stats()
+        assert stats["failures"] == 1
+        assert stats["lastError"]
+
+        rules_path.unlink()
+        assert reloader.check() is False
+        assert reloader.stats()["failures"] == 2
+
+        with open(compliance_rules.RULES_FILE, encoding="utf-8") as rules_file:
+            rules_path.write_text(rules_file.read().replace("{statusText}", "{0}"))
+        assert reloader.check() is False
+        assert reloader.stats()["failures"] == 3
+        assert compliance_rules.get_rules() is rules
+
+        with open(compliance_rules.RULES_FILE, encoding="utf-8") as rules_file:
+            rules_path.write_text(rules_file.read())
+        _write_no_reps_text(rules_path, "NO REPRESENTATIONS")
+        assert reloader.check() is True
+        assert reloader.stats()["lastError"] is None
+
+    @staticmethod
+    def test_load_raises(tmp_path):
+        reloader = RulesReloader(tmp_path / "missing.json")
+        with pytest.raises(OSError):
+            reloader.load()
+
+
+class TestInitApp:
+    @staticmethod
+    def test_checks_before_requests(rules_path):
+        app = Flask(__name__)
+        app.config["COMPLIANCE_RULES_FILE"] = str(rules_path)
+        app.config["COMPLIANCE_RULES_CHECK_INTERVAL"] = 0
+        rules_reloader.init_app(app)
+
+        @app.route("/status")
+        def status():
+            return compliance_rules.EightEightNine().status_text
+
+        client = app.test_client()
+        assert client.get("/status").data == b"NO REPS & CERTS"
+        _write_no_reps_text(rules_path, "NO REPRESENTATIONS")
+        assert client.get("/status").data == b"NO REPRESENTATIONS"
+        with app.app_context():
+            assert rules_reloader.get_rules_reloader().stats()["reloads"] == 1
+
+    @staticmethod
+    def test_defaults_to_packaged_rules():
+        app = Flask(__name__)
+        app.config["COMPLIANCE_RULES_FILE"] = None
+        app.config["COMPLIANCE_RULES_CHECK_INTERVAL"] = 5
+        rules_reloader.init_app(app)
+        with app.app_context():
+            stats = rules_reloader.get_rules_reloader().stats()
+        assert stats["file"] == compliance_rules.RULES_FILE
+        assert stats["loadedAt"] is not None
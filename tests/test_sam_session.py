@@ -0,0 +1,64 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import pytest
+
+from samtools.sam_api import session
+
+
+@pytest.fixture
+def app_config():
+    return dict(
+        SAM_API_POOL_CONNECTIONS=2,
+        SAM_API_POOL_MAXSIZE=8,
+        SAM_API_KEEP_ALIVE=True,
+        SAM_API_CONNECT_TIMEOUT=3,
+        SAM_API_READ_TIMEOUT=20,
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_sam_session():
+    session._reset_sam_session()
+    yield
+    session._reset_sam_session()
+
+
+class TestSamSession:
+    @staticmethod
+    def test_session_is_reused(app_context):
+        assert session.get_sam_session() is session.get_sam_session()
+
+    @staticmethod
+    def test_pool_size_from_config(app_context):
+        adapter = session.get_sam_session().get_adapter("https://api.sam.gov")
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 8
+
+    @staticmethod
+    def test_timeout_from_config(app_context):
+        assert session.get_sam_timeout() == (3, 20)
+
+    @staticmethod
+    def test_new_session_after_fork(app_context, monkeypatch):
+        parent_session = session.get_sam_session()
+        monkeypatch.setattr(session.os, "getpid", lambda: -1)
+        assert session.get_sam_session() is not parent_session
+
+    @staticmethod
+    def test_keep_alive_disabled():
+        sam_session = session.create_sam_session(1, 1, keep_alive=False)
+        assert sam_session.headers["Connection"] == "close"
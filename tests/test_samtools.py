@@ -19,6 +19,7 @@ import json
 import requests
 
 from samtools import create_app
+from samtools.sam_api import compliance_history
 
 
 @pytest.fixture
@@ -278,3 +279,38 @@ class TestEntitiesSearch:
             data["entityData"][0]["samToolsData"]["exclusions"]["hasExclusions"]
             is False
         )
+
+
+def test_metrics(client):
+    response = client.get("/api/metrics")
+    data = json.loads(response.data)
+    assert "hits" in data["responseCache"]
+    assert data["complianceRules"]["failures"] == 0
+    assert "watched" in data["watchlist"]
+    assert "hitRate" in data["searchParameterCache"]
+
+
+def test_metrics_of_missing_components(my_app):
+    my_app.extensions.pop("samtools.entity_cache")
+    my_app.extensions.pop("samtools.circuit_breaker")
+    data = my_app.test_client().get("/api/metrics").json
+    assert data["entityCache"] is None
+    assert data["circuitBreaker"] is None
+    assert "hits" in data["responseCache"]
+
+
+def test_compliance_history_timeline(my_app, tmp_path):
+    my_app.config.update(
+        SAM_COMPLIANCE_HISTORY=True,
+        SAM_COMPLIANCE_HISTORY_DATABASE=str(tmp_path / "history.sqlite3"),
+    )
+    compliance_history.init_app(my_app)
+    response = my_app.test_client().get("/api/compliance/K3B5JE3ZS915/history")
+    assert response.json == {"history": [], "success": True}
+    assert response.headers["Cache-Control"] == "private, max-age=60"
+
+
+def test_compliance_of_unknown_uei_is_not_cached(client):
+    response = client.get("/api/compliance/AAAAAAAAAAA1")
+    assert response.status_code == 404
+    assert response.headers["Cache-Control"] == "no-store"
@@ -16,7 +16,22 @@
 
 import pytest
 
-from samtools.sam_api.search_preprocessor import get_search_parameter
+from samtools.sam_api.search_preprocessor import (
+    NCAGE_CODE,
+    UEI_SAM,
+    US_CAGE_CODE,
+    WEBSITE,
+    _is_potential_ncage_code,
+    _is_potential_website,
+    _is_sam_unique_entity_id,
+    _is_us_cage_code,
+    _get_cleaned_and_prepared_business_name,
+    _split_and_preserve_quotes,
+    classify_search_input,
+    get_business_name,
+    get_search_parameter,
+    get_search_parameter_cache_stats,
+)
 
 
 class TestSearchPreprocessor:
@@ -293,3 +308,133 @@ class TestSearchPreprocessor:
         assert get_search_parameter("test company. inc.") == {
             "q": "(legalBusinessName:test* company* inc* OR dbaName:test* company* inc*)"
         }
+
+
+class TestGetBusinessName:
+    @staticmethod
+    def test_business_name():
+        assert get_business_name("  thermo   fisher ") == "thermo fisher"
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "search_input", [None, " ", "K3B5JE3ZS915", "12345", "SKCM3", "name.com"]
+    )
+    def test_identifiers_and_websites_are_not_names(search_input):
+        assert get_business_name(search_input) is None
+
+
+class TestClassifySearchInput:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "search_input,identifier_type",
+        [
+            ("K3B5jE3zS915", UEI_SAM),
+            ("2BcD4", US_CAGE_CODE),
+            ("fBhL7", NCAGE_CODE),
+            ("https://www.amazon.com", WEBSITE),
+            ("apple.com/", WEBSITE),
+            ("apple", None),
+            ("2BOD4", None),
+            ("0K3B5JE3ZS91", None),
+        ],
+    )
+    def test_identifier_types(search_input, identifier_type):
+        assert classify_search_input(search_input)[0] == identifier_type
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "ncage_code,countries",
+        [
+            ("advex", ("Jordan",)),
+            ("L1234", ("Canada",)),
+            ("S1234", ("Non-NATO Nations", "Iceland")),
+            ("IAAA1", ("NATO & International Org.",)),
+        ],
+    )
+    def test_ncage_countries(ncage_code, countries):
+        assert classify_search_input(ncage_code) == (NCAGE_CODE, countries)
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "search_input",
+        [
+            "12345\n",
+            "\u0131AAA1",
+            "\u0130AAA1",
+            "\u017f1234",
+            "1\u212aAA1",
+            "1\u0131AA1",
+            "1\u00dfAA1",
+            "K3B5JE3Z\u017f915",
+            "12345\n\n",
+            "a.com",
+            "name.io",
+        ],
+    )
+    def test_same_types_as_regular_expressions(search_input):
+        if _is_sam_unique_entity_id(search_input):
+            expected = UEI_SAM
+        elif _is_us_cage_code(search_input):
+            expected = US_CAGE_CODE
+        elif _is_potential_ncage_code(search_input):
+            expected = NCAGE_CODE
+        elif _is_potential_website(search_input):
+            expected = WEBSITE
+        else:
+            expected = None
+        assert classify_search_input(search_input)[0] == expected
+
+
+class TestBusinessNamePipeline:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "search_input,words",
+        [
+            ('ab"cd "e f"g', ['ab"cd', '"e f"', "g"]),
+            ('"a b', ['"a', "b"]),
+            ("a\tb\xa0c", ["a", "b\xa0c"]),
+            ('""', ['""']),
+        ],
+    )
+    def test_split_and_preserve_quotes(search_input, words):
+        assert _split_and_preserve_quotes(search_input) == words
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "search_input,business_name",
+        [
+            ('"x-y" z', '"x y" z'),
+            ('a-"b c"', 'a "b c"'),
+            ('a "b "c', 'a "b " c'),
+            ("fisher L.L.C. ... inc.", "fisher* inc*"),
+            ('"thermo-fisher llc inc.', '"thermo* fisher* inc*'),
+        ],
+    )
+    def test_quoted_words(search_input, business_name):
+        assert _get_cleaned_and_prepared_business_name(search_input) == business_name
+
+
+class TestSearchParameterCache:
+    @staticmethod
+    def test_repeated_inputs_are_hits():
+        before = get_search_parameter_cache_stats()
+        get_search_parameter("repeated search 1")
+        get_search_parameter("repeated search 1")
+        after = get_search_parameter_cache_stats()
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"] + 1
+        assert 0 < after["hitRate"] < 1
+        assert after["size"] <= after["maxSize"]
+
+    @staticmethod
+    def test_modified_parameters_are_not_cached():
+        search_parameter = get_search_parameter("K3B5JE3ZS915")
+        search_parameter["ueiSAM"] = "modified"
+        search_parameter["extra"] = True
+        assert get_search_parameter("K3B5JE3ZS915") == {"ueiSAM": "K3B5JE3ZS915"}
+
+    @staticmethod
+    def test_raw_inputs_are_distinct_keys():
+        assert get_search_parameter("  12345 ") == {"cageCode": "12345"}
+        assert get_search_parameter("12345") == {"cageCode": "12345"}
+        assert get_search_parameter(None) == {}
@@ -0,0 +1,130 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import fcntl
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from samtools.sam_api.single_flight import FileLockSingleFlight, SingleFlight
+
+
+def _slow_call(calls, result, delay=0.2):
+    def call():
+        calls.append(threading.get_ident())
+        time.sleep(delay)
+        return result
+
+    return call
+
+
+class TestSingleFlight:
+    @staticmethod
+    def test_concurrent_calls_are_collapsed():
+        single_flight = SingleFlight()
+        calls = []
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(single_flight.do, "key", _slow_call(calls, [True, {}]))
+                for _ in range(8)
+            ]
+            results = [future.result() for future in futures]
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert single_flight.stats() == {"leaders": 1, "collapsed": 7}
+
+    @staticmethod
+    def test_different_keys_are_not_collapsed():
+        single_flight = SingleFlight()
+        calls = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for key in ("a", "b"):
+                executor.submit(single_flight.do, key, _slow_call(calls, key))
+        assert len(calls) == 2
+
+    @staticmethod
+    def test_exception_is_shared():
+        single_flight = SingleFlight()
+
+        def failing_call():
+            time.sleep(0.2)
+            raise ConnectionError("SAM is down")
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(single_flight.do, "key", failing_call) for _ in range(3)
+            ]
+            for future in futures:
+                with pytest.raises(ConnectionError):
+                    future.result()
+
+    @staticmethod
+    def test_sequential_calls_are_not_collapsed():
+        single_flight = SingleFlight()
+        calls = []
+        single_flight.do("key", _slow_call(calls, 1, delay=0))
+        single_flight.do("key", _slow_call(calls, 1, delay=0))
+        assert len(calls) == 2
+
+
+class TestFileLockSingleFlight:
+    @staticmethod
+    def test_calls_are_collapsed_across_workers(tmp_path):
+        workers = [FileLockSingleFlight(tmp_path) for _ in range(4)]
+        calls = []
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(worker.do, "key", _slow_call(calls, [True, {"a": 1}]))
+                for worker in workers
+            ]
+            results = [future.result() for future in futures]
+        assert len(calls) == 1
+        assert all(result == [True, {"a": 1}] for result in results)
+        assert sum(worker.stats()["collapsedAcrossWorkers"] for worker in workers) == 3
+
+    @staticmethod
+    def test_old_result_is_not_reused(tmp_path):
+        first_worker = FileLockSingleFlight(tmp_path)
+        second_worker = FileLockSingleFlight(tmp_path)
+        calls = []
+        first_worker.do("key", _slow_call(calls, 1, delay=0))
+        second_worker.do("key", _slow_call(calls, 2, delay=0))
+        assert len(calls) == 2
+
+    @staticmethod
+    def test_lock_wait_is_bounded(tmp_path):
+        worker = FileLockSingleFlight(tmp_path, lock_timeout=0.1)
+        calls = []
+        worker.do("key", _slow_call(calls, 1, delay=0))
+        (lock_path,) = tmp_path.glob("*.lock")
+        with open(lock_path, "a", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            started = time.monotonic()
+            assert worker.do("key", _slow_call(calls, 2, delay=0)) == 2
+            assert time.monotonic() - started < 1
+        assert worker.stats()["lockTimeouts"] == 1
+
+    @staticmethod
+    def test_unused_files_are_removed(tmp_path):
+        worker = FileLockSingleFlight(tmp_path, file_max_age=60)
+        for name in ("old.lock", "old.json", "old.123.tmp"):
+            (tmp_path / name).write_text("")
+            os.utime(tmp_path / name, (time.time() - 120, time.time() - 120))
+        worker.do("key", _slow_call([], 1, delay=0))
+        assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".lock"]
@@ -0,0 +1,70 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import sqlite3
+
+import pytest
+
+from samtools.sam_api import sqlite_store
+
+_SCHEMA = "CREATE TABLE IF NOT EXISTS items (name TEXT PRIMARY KEY);"
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    sqlite_store.create_schema(path, _SCHEMA)
+    return path
+
+
+class TestSqliteStore:
+    @staticmethod
+    def test_transaction_commits(database_path):
+        with sqlite_store.transaction(database_path) as connection:
+            connection.execute("INSERT INTO items VALUES ('a')")
+        reader = sqlite_store.ReadConnections(database_path)
+        assert reader.get().execute("SELECT name FROM items").fetchall() == [("a",)]
+        assert reader.get() is reader.get()
+
+    @staticmethod
+    def test_transaction_rolls_back(database_path):
+        with pytest.raises(KeyError):
+            with sqlite_store.transaction(database_path) as connection:
+                connection.execute("INSERT INTO items VALUES ('a')")
+                raise KeyError("a")
+        with sqlite_store.transaction(
+            database_path, synchronous="NORMAL"
+        ) as connection:
+            assert connection.execute("SELECT COUNT(*) FROM items").fetchone() == (0,)
+
+    @staticmethod
+    def test_read_connections_are_read_only(database_path):
+        connection = sqlite_store.ReadConnections(database_path).get()
+        with pytest.raises(sqlite3.OperationalError):
+            connection.execute("INSERT INTO items VALUES ('a')")
+
+    @staticmethod
+    def test_database_is_in_wal_mode(database_path):
+        connection = sqlite_store.connect(database_path)
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        connection.close()
+
+    @staticmethod
+    def test_hash_and_time():
+        assert sqlite_store.get_hash('{"a":1}') == sqlite_store.get_hash('{"a":1}')
+        assert sqlite_store.get_hash('{"a":1}') != sqlite_store.get_hash('{"a":2}')
+        assert -(2**63) <= sqlite_store.get_hash("") < 2**63
+        assert sqlite_store.format_time(1664800000) == "2022-10-03T12:26:40Z"
@@ -0,0 +1,145 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import json
+
+import pytest
+
+from samtools.sam_api import entity_information
+from samtools.sam_api.streaming import EntityDataDecoder
+
+RESPONSE = {
+    "totalRecords": 2,
+    "entityData": [
+        {
+            "entityRegistration": {
+                "legalBusinessName": 'Crème "Brûlée" {Co} [\\]',
+                "dbaName": None,
+                "ueiSAM": "K3B5JE3ZS915",
+            },
+            "coreData": {"nested": [[], {}, [1, 2.5e3, -3, True, False]]},
+        },
+        {"entityRegistration": {"ueiSAM": "QJ8GDNZ7RMC5"}},
+    ],
+    "links": {"selfLink": "https://api.sam.gov/entity-information/v3/entities"},
+}
+
+
+def _decode(body, chunk_size, transform=None):
+    decoder = EntityDataDecoder(transform=transform)
+    entities = []
+    for start in range(0, len(body), chunk_size):
+        entities.extend(decoder.feed(body[start : start + chunk_size]))
+    entities.extend(decoder.close())
+    return decoder.fields, entities
+
+
+class TestEntityDataDecoder:
+    @staticmethod
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 100000])
+    def test_matches_json_loads(chunk_size):
+        body = json.dumps(RESPONSE, ensure_ascii=False, indent=1).encode("utf-8")
+        fields, entities = _decode(body, chunk_size)
+        assert entities == RESPONSE["entityData"]
+        assert fields == {
+            "totalRecords": RESPONSE["totalRecords"],
+            "links": RESPONSE["links"],
+        }
+
+    @staticmethod
+    def test_entities_are_returned_as_soon_as_complete():
+        body = json.dumps(RESPONSE).encode("utf-8")
+        second_entity_start = body.index(b'{"entityRegistration": {"ueiSAM": "QJ8')
+        decoder = EntityDataDecoder()
+        assert len(decoder.feed(body[:second_entity_start])) == 1
+        assert len(decoder.feed(body[second_entity_start:])) == 1
+        assert decoder.close() == []
+
+    @staticmethod
+    def test_transform_is_applied():
+        body = json.dumps(RESPONSE).encode("utf-8")
+        _, entities = _decode(
+            body, 16, transform=lambda entity: entity["entityRegistration"]["ueiSAM"]
+        )
+        assert entities == ["K3B5JE3ZS915", "QJ8GDNZ7RMC5"]
+
+    @staticmethod
+    def test_truncated_body_raises():
+        body = json.dumps(RESPONSE).encode("utf-8")
+        with pytest.raises(ValueError):
+            _decode(body[:-5], 16)
+
+    @staticmethod
+    def test_number_split_across_chunks():
+        decoder = EntityDataDecoder()
+        decoder.feed(b'{"totalRecords": 12')
+        decoder.feed(b'34, "entityData": []}')
+        decoder.close()
+        assert decoder.fields == {"totalRecords": 1234}
+
+    @staticmethod
+    def test_non_object_body_raises():
+        with pytest.raises(ValueError):
+            _decode(b"[]", 16)
+
+
+class TestReadSamEntitiesData:
+    @staticmethod
+    def test_reps_and_certs_is_only_trimmed_when_asked():
+        far_responses = [
+            {
+                "provisionId": "FAR 52.204-26",
+                "listOfAnswers": [
+                    {"section": "52.204-26.c.1", "answerText": "No"},
+                    {"section": "52.204-26.c.2", "answerText": "No"},
+                ],
+            },
+            {"provisionId": "FAR 52.209-2", "listOfAnswers": []},
+        ]
+        entity = {
+            "entityRegistration": {"ueiSAM": "K3B5JE3ZS915"},
+            "repsAndCerts": {
+                "certifications": {"fARResponses": far_responses},
+                "qualifications": {"architectEngineerResponses": {}},
+            },
+        }
+        body = json.dumps({"totalRecords": 1, "entityData": [entity]}).encode("utf-8")
+
+        data = entity_information._read_sam_entities_data([body])
+        assert data["entityData"] == [entity]
+
+        data = entity_information._read_sam_entities_data(
+            [body], transform=entity_information._trim_sam_entity
+        )
+        assert data["totalRecords"] == 1
+        assert data["entityData"][0]["repsAndCerts"] == {
+            "certifications": {"fARResponses": far_responses[:1]}
+        }
+        compliance = (
+            entity_information.DataAdaptors().adapt_sam_response_to_889_compliance(
+                data["entityData"][0]
+            )
+        )
+        assert compliance.is_compliant
+
+    @staticmethod
+    def test_entity_without_certifications_is_kept():
+        entity = {"entityRegistration": {"ueiSAM": "K3B5JE3ZS915"}, "repsAndCerts": {}}
+        body = json.dumps({"totalRecords": 1, "entityData": [entity]}).encode("utf-8")
+        data = entity_information._read_sam_entities_data(
+            [body], transform=entity_information._trim_sam_entity
+        )
+        assert data["entityData"] == [entity]
@@ -0,0 +1,281 @@
+# ------------------------------------------------------------------------------
+# Copyright 2022 by the U. S. Government as represented by the Administrator of
+# the National Aeronautics and Space Administration.  All Other Rights Reserved.
+
+# The 889 Compliance SAM Tool is licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0.
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+# ------------------------------------------------------------------------------
+
+import json
+
+import pytest
+from flask import Flask
+
+from samtools.sam_api import entity_information, watchlist
+from samtools.sam_api.watchlist import (
+    Watchlist,
+    check_next_batch,
+    get_call_interval,
+    monitor_watchlist_command,
+    run_monitor,
+    watchlist_add_command,
+    watchlist_notifications_command,
+)
+from tests.conftest import FakeSamResponse, sam_entity
+
+UEIS = ["K3B5JE3ZS915", "QJ8GDNZ7RMC5", "ZQGGHJH74DW7"]
+
+
+class FakeStop:
+    """Stop event of run_monitor that moves the clock instead of waiting"""
+
+    def __init__(self, clock, on_wait):
+        self.clock = clock
+        self.waits = []
+        self._on_wait = on_wait
+
+    def is_set(self):
+        return len(self.waits) >= 3
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        self.clock.now += timeout
+        self._on_wait(len(self.waits))
+
+
+def _status(is_selectable=True):
+    return {"isSelectable": is_selectable}
+
+
+@pytest.fixture
+def clock(clock):
+    clock.now = 1664800000.0
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return Watchlist(tmp_path / "watchlist.sqlite3", clock=clock)
+
+
+@pytest.fixture
+def app(tmp_path, clock):
+    app = Flask(__name__)
+    app.config.update(
+        SAM_WATCHLIST_DATABASE=str(tmp_path / "watchlist.sqlite3"),
+        SAM_WATCHLIST_BATCH_SIZE=2,
+        SAM_WATCHLIST_RECHECK_INTERVAL=86400,
+        SAM_WATCHLIST_DAILY_CALLS=3,
+        SAM_WATCHLIST_QUOTA_RESERVE=200,
+        SAM_WATCHLIST_POLL_INTERVAL=60,
+        SAM_TRIM_REPS_AND_CERTS=False,
+    )
+    watchlist.init_app(app)
+    app.extensions["samtools.watchlist"] = Watchlist(
+        app.config["SAM_WATCHLIST_DATABASE"], clock=clock
+    )
+    app.cli.add_command(watchlist_add_command)
+    app.cli.add_command(monitor_watchlist_command)
+    app.cli.add_command(watchlist_notifications_command)
+    return app
+
+
+@pytest.fixture
+def sam_entities(monkeypatch):
+    entities = {uei_sam: sam_entity(uei_sam) for uei_sam in UEIS}
+    calls = []
+
+    def call_sam(endpoint, search_parameters):
+        ueis = search_parameters["ueiSAM"].strip("[]").split("~")
+        calls.append(ueis)
+        return FakeSamResponse(
+            [entities[uei_sam] for uei_sam in ueis if uei_sam in entities]
+        )
+
+    monkeypatch.setattr(entity_information, "_call_post_sam_entities_api", call_sam)
+    entities["calls"] = calls
+    return entities
+
+
+class TestWatchlist:
+    @staticmethod
+    def test_add_and_remove(store):
+        assert store.add(["k3b5je3zs915 ", "QJ8GDNZ7RMC5"]) == 2
+        assert store.add(["K3B5JE3ZS915"]) == 0
+        assert len(store) == 2
+        assert store.remove(["qj8gdnz7rmc5"]) == 1
+        assert len(store) == 1
+
+    @staticmethod
+    def test_add_rejects_other_identifiers(store):
+        with pytest.raises(ValueError):
+            store.add(["K3B5JE3ZS915", "1YES6"])
+        assert len(store) == 0
+
+    @staticmethod
+    def test_never_checked_are_due_first(store, clock):
+        store.add(UEIS)
+        store.record_checks(["QJ8GDNZ7RMC5"], {})
+        clock.now += 60
+        store.record_checks(["K3B5JE3ZS915"], {})
+        assert store.get_due(10, recheck_interval=0) == [
+            "ZQGGHJH74DW7",
+            "QJ8GDNZ7RMC5",
+            "K3B5JE3ZS915",
+        ]
+        assert store.get_due(10, recheck_interval=1) == [
+            "ZQGGHJH74DW7",
+            "QJ8GDNZ7RMC5",
+        ]
+
+    @staticmethod
+    def test_changes_are_notified(store, clock):
+        store.add(UEIS[:2])
+        statuses = {uei_sam: _status() for uei_sam in UEIS[:2]}
+        assert store.record_checks(UEIS[:2], statuses) == 0
+        clock.now += 60
+        assert store.record_checks(UEIS[:2], statuses) == 0
+        clock.now += 60
+        statuses = {"K3B5JE3ZS915": _status(is_selectable=False)}
+        assert store.record_checks(UEIS[:2], statuses) == 2
+
+        notifications = store.get_notifications()
+        assert [
+            (notification["ueiSAM"], notification["previous"], notification["current"])
+            for notification in notifications
+        ] == [
+            ("K3B5JE3ZS915", _status(), _status(is_selectable=False)),
+            ("QJ8GDNZ7RMC5", _status(), None),
+        ]
+        assert notifications[0]["createdAt"] == "2022-10-03T12:28:40Z"
+        store.mark_delivered([notifications[0]["id"]])
+        assert [
+            notification["ueiSAM"] for notification in store.get_notifications()
+        ] == ["QJ8GDNZ7RMC5"]
+
+    @staticmethod
+    def test_stats(store, clock):
+        store.add(UEIS)
+        store.record_checks(UEIS[:1], {})
+        clock.now += 7200
+        store.record_checks(UEIS[1:2], {})
+        assert store.has_never_checked()
+        store.count_call()
+        assert store.stats() == {
+            "watched": 3,
+            "neverChecked": 1,
+            "oldestCheckAge": 7200,
+            "checkedLastHour": 1,
+            "checkedLastDay": 2,
+            "callsToday": 1,
+            "pendingNotifications": 0,
+        }
+
+
+class TestCallInterval:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "watched, daily_calls, interval",
+        [(3000, 1000, 288), (3000, 100, 864), (5, 1000, 86400), (0, 1000, 86400)],
+    )
+    @pytest.mark.parametrize("batch_size", [10, 100])
+    def test_interval(watched, daily_calls, interval, batch_size):
+        config = {
+            "SAM_WATCHLIST_BATCH_SIZE": batch_size,
+            "SAM_WATCHLIST_RECHECK_INTERVAL": 86400,
+            "SAM_WATCHLIST_DAILY_CALLS": daily_calls,
+        }
+        assert get_call_interval(watched, config) == interval
+
+
+class TestMonitor:
+    @staticmethod
+    def test_batches_are_checked_through_sam(app, sam_entities, clock):
+        with app.app_context():
+            store = watchlist.get_watchlist()
+            store.add(UEIS)
+            assert check_next_batch(store) == (2, 0)
+            assert check_next_batch(store) == (1, 0)
+            assert check_next_batch(store) is None
+            assert sam_entities["calls"] == [UEIS[:2], UEIS[2:]]
+
+            store.remove(UEIS[1:])
+            store.add(["MN3JLNDKKH38"])
+            sam_entities["K3B5JE3ZS915"]["entityRegistration"][
+                "exclusionStatusFlag"
+            ] = "Y"
+            clock.now += 86400
+            assert check_next_batch(store) == (2, 1)
+            notification = store.get_notifications()[0]
+            assert notification["ueiSAM"] == "K3B5JE3ZS915"
+            assert notification["current"]["exclusions"]["hasExclusions"] is True
+
+    @staticmethod
+    def test_daily_calls_are_capped(app, sam_entities):
+        app.config["SAM_WATCHLIST_BATCH_SIZE"] = 1
+        with app.app_context():
+            store = watchlist.get_watchlist()
+            store.add(UEIS + ["MN3JLNDKKH38"])
+            results = [check_next_batch(store) for _ in range(4)]
+        assert results == [(1, 0), (1, 0), (1, 0), None]
+        assert len(sam_entities["calls"]) == 3
+
+    @staticmethod
+    def test_batches_fit_in_one_sam_page(app, sam_entities):
+        app.config["SAM_WATCHLIST_BATCH_SIZE"] = 100
+        ueis = [f"U{number:010d}1" for number in range(12)]
+        with app.app_context():
+            store = watchlist.get_watchlist()
+            store.add(ueis)
+            assert check_next_batch(store) == (10, 0)
+            assert check_next_batch(store) == (2, 0)
+        assert sam_entities["calls"] == [ueis[:10], ueis[10:]]
+
+    @staticmethod
+    def test_added_ueis_are_checked_before_the_next_paced_call(
+        app, sam_entities, clock
+    ):
+        def add_after_first_wait(waits):
+            if waits == 1:
+                store.add(UEIS[2:])
+
+        with app.app_context():
+            store = watchlist.get_watchlist()
+            store.add(UEIS[:2])
+            stop = FakeStop(clock, add_after_first_wait)
+            run_monitor(store, stop, clock=clock)
+        assert sam_entities["calls"] == [UEIS[:2], UEIS[2:]]
+        assert stop.waits == [60, 60, 60]
+
+    @staticmethod
+    def test_commands(app, sam_entities, clock):
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=["watchlist-add", *UEIS])
+        assert "Added 3 UEIs" in result.output
+        result = runner.invoke(args=["monitor-watchlist", "--once"])
+        assert "Checked 2 UEIs, 0 notifications" in result.output
+
+        sam_entities["K3B5JE3ZS915"]["entityRegistration"][
+            "registrationStatus"
+        ] = "Expired"
+        runner.invoke(args=["monitor-watchlist", "--once"])
+        clock.now += 86400
+        result = runner.invoke(args=["monitor-watchlist", "--once"])
+        assert "Checked 2 UEIs, 1 notifications" in result.output
+        result = runner.invoke(args=["watchlist-notifications", "--mark-delivered"])
+        notification = json.loads(result.output)
+        assert notification["ueiSAM"] == "K3B5JE3ZS915"
+        assert notification["current"]["registration"] == {
+            "isActive": False,
+            "statusText": "Expired",
+        }
+        result = runner.invoke(args=["watchlist-notifications"])
+        assert result.output == ""